@@ -0,0 +1,2 @@
+from .server import create_app
+__all__ = ['create_app']
@@ -0,0 +1,219 @@
+"""
+HTTP API for the copilot pipeline.
+
+Stateless: conversations live with the client (Streamlit, WhatsApp, IVR),
+so any worker can serve any request. Run with several worker processes:
+    
+    python -m api.server --workers 4 --port 8000
+"""
+import argparse
+import io
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from config import settings
+from modules.pipeline import CopilotPipeline, create_components
+from utils.admission import admission_report
+from utils.cache import cache_report
+from utils.metrics import latency_report
+from utils.singleflight import coalescing_report
+
+logger = logging.getLogger(__name__)
+
+
+class Profile(BaseModel):
+    location: Optional[str] = None
+    crop: Optional[str] = None
+    soil: Optional[str] = None
+    state: Optional[str] = None
+    land_ha: Optional[float] = Field(None, ge=0)
+    category: Optional[str] = None
+
+
+class Turn(BaseModel):
+    role: str
+    content: str
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, max_length=settings.MAX_INPUT_LENGTH)
+    profile: Profile = Profile()
+    history: List[Turn] = []
+    summary: str = ""
+    stream: bool = False
+
+
+class PrefetchRequest(BaseModel):
+    profile: Profile = Profile()
+    language: Optional[str] = None
+
+
+class SoilParams(BaseModel):
+    N: float
+    P: float
+    K: float
+    pH: float
+
+
+class FertilizerRequest(BaseModel):
+    crop: str
+    area_ha: float = Field(1.0, gt=0)
+    soil: Optional[dict] = None
+    location: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+def _sse(events):
+    """Server-sent events framing for pipeline events"""
+    for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+def create_app(components=None):
+    """
+    Build the ASGI application.
+    
+    Args:
+        components (dict): Pre-built pipeline components; built at startup when omitted
+    
+    Returns:
+        FastAPI: Application
+    """
+    @asynccontextmanager
+    async def lifespan(app):
+        # Each worker process loads its own models once
+        app.state.components = components or await run_in_threadpool(
+            create_components,
+            settings.OPENWEATHER_API_KEY,
+            settings.DEEPL_API_KEY,
+            settings.HUGGINGFACE_TOKEN
+        )
+        app.state.pipeline = CopilotPipeline(app.state.components)
+        yield
+    
+    app = FastAPI(title="Farmer Copilot API", version="1.0", lifespan=lifespan)
+    
+    # Blocking handlers are plain functions, so FastAPI runs them in its threadpool
+    
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+    
+    @app.post("/v1/chat")
+    def chat(body: ChatRequest, request: Request):
+        pipeline = request.app.state.pipeline
+        args = (
+            body.message,
+            body.profile.model_dump(),
+            [turn.model_dump() for turn in body.history],
+            body.summary,
+        )
+        if body.stream:
+            return StreamingResponse(_sse(pipeline.stream(*args)), media_type="text/event-stream")
+        return pipeline.answer(*args)
+    
+    @app.post("/v1/prefetch", status_code=202)
+    def prefetch(body: PrefetchRequest, request: Request):
+        scheduled = request.app.state.pipeline.prefetch(body.profile.model_dump(), body.language)
+        return {"scheduled": scheduled}
+    
+    @app.get("/v1/weather")
+    def weather(location: str, request: Request):
+        return request.app.state.components["weather"].get_weather(location)
+    
+    @app.get("/v1/prices")
+    def prices(
+        crop: str,
+        request: Request,
+        location: Optional[str] = None,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        k: int = 3
+    ):
+        where = (lat, lon) if lat is not None and lon is not None else location
+        return request.app.state.components["market"].get_prices(crop, location=where, k=k)
+    
+    @app.get("/v1/soil")
+    def soil(
+        request: Request,
+        location: Optional[str] = None,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None
+    ):
+        where = (lat, lon) if lat is not None and lon is not None else None
+        measured = request.app.state.components["soil"].lookup(where, location)
+        if measured is None:
+            raise HTTPException(status_code=404, detail="No soil card data for this location")
+        return measured
+    
+    @app.post("/v1/fertilizer")
+    def fertilizer(body: FertilizerRequest, request: Request):
+        components = request.app.state.components
+        soil = body.soil
+        if soil is None:
+            where = (body.lat, body.lon) if body.lat is not None and body.lon is not None else None
+            soil = components["soil"].lookup(where, body.location)
+        plan = components["fertilizer"].recommend(body.crop, soil, body.area_ha)
+        if plan is None:
+            raise HTTPException(status_code=404, detail=f"No nutrient targets for crop '{body.crop}'")
+        return plan
+    
+    @app.post("/v1/schemes/match")
+    def match_schemes(profile: Profile, request: Request):
+        return request.app.state.components["schemes"].match(profile.model_dump())
+    
+    @app.post("/v1/crops/recommend")
+    def recommend_crops(soil: SoilParams, request: Request):
+        crop_rag = request.app.state.components["crop_rag"]
+        return {"crops": crop_rag.get_recommendations(soil.model_dump())}
+    
+    @app.post("/v1/disease/detect")
+    def detect_disease(
+        request: Request,
+        image: Optional[UploadFile] = File(None),
+        description: Optional[str] = Form(None),
+        crop: Optional[str] = Form(None)
+    ):
+        detector = request.app.state.components["disease"]
+        if image is None:
+            if not description:
+                raise HTTPException(status_code=422, detail="Send an image or a symptom description")
+            return {"text_candidates": detector.search_symptoms(description, crop)}
+        
+        from PIL import Image
+        try:
+            picture = Image.open(io.BytesIO(image.file.read())).convert("RGB")
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Unreadable image: {e}")
+        return detector.detect(picture, description, crop)
+    
+    @app.get("/v1/metrics")
+    def metrics():
+        return {
+            "latency": latency_report(),
+            "coalescing": coalescing_report(),
+            "cache": cache_report(),
+            "admission": admission_report(),
+        }
+    
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Serve the Farmer Copilot API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    args = parser.parse_args()
+    uvicorn.run("api.server:app", host=args.host, port=args.port, workers=args.workers)
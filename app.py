@@ -4,6 +4,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 import logging
+import uuid
 
 # Load environment variables
 load_dotenv()
@@ -44,8 +45,6 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize session state
-if "conversation_history" not in st.session_state:
-    st.session_state.conversation_history = []
 if "user_location" not in st.session_state:
     st.session_state.user_location = None
 
@@ -61,40 +60,37 @@ except:
 
 # Import modules
 try:
-    from modules.weather import WeatherAPI
-    from modules.market import MarketAPI
-    from modules.crop_rag import CropRAGSystem
-    from modules.disease_detection import DiseaseDetector
-    from modules.llm_engine import FarmerCopilotLLM
-    from nlp.translator import MultilingualProcessor
+    from modules.pipeline import CopilotPipeline, create_components
+    from modules.api_client import CopilotClient
+    from modules.chat_history import ChatTranscript
+    from config import settings
 except ImportError as e:
     st.error(f"Error importing modules: {e}")
     st.stop()
 
-# Initialize components with caching
+# Initialize the copilot backend with caching
 @st.cache_resource
-def initialize_components():
-    """Initialize all components"""
+def initialize_backend():
+    """Remote API client when COPILOT_API_URL is set, else the in-process pipeline"""
     try:
-        weather_api = WeatherAPI(OPENWEATHER_KEY)
-        market_api = MarketAPI()
-        crop_rag = CropRAGSystem()
-        disease_detector = DiseaseDetector()
-        llm = FarmerCopilotLLM(HF_TOKEN)
-        translator = MultilingualProcessor(DEEPL_KEY)
-        
-        return {
-            "weather": weather_api,
-            "market": market_api,
-            "crop_rag": crop_rag,
-            "disease": disease_detector,
-            "llm": llm,
-            "translator": translator
-        }
+        if settings.API_URL:
+            return CopilotClient(settings.API_URL)
+        return CopilotPipeline(create_components(OPENWEATHER_KEY, DEEPL_KEY, HF_TOKEN))
     except Exception as e:
         st.error(f"Failed to initialize components: {e}")
         return None
 
+# Reruns scoped to the chat area where Streamlit supports it
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+# The transcript lives in the conversation store; the session keeps only its id,
+# which the URL carries so a reload resumes the same conversation
+if "transcript" not in st.session_state:
+    st.session_state.transcript = ChatTranscript(st.query_params.get("session"))
+    st.query_params["session"] = st.session_state.transcript.session_id
+if "visible_messages" not in st.session_state:
+    st.session_state.visible_messages = settings.CHAT_RENDER_MESSAGES
+
 # Header
 st.markdown("""
 <div class="header">
@@ -123,17 +119,42 @@ with st.sidebar:
         ["Select", "Black Soil", "Alluvial", "Red Soil", "Laterite"]
     )
     
+    land_ha = st.number_input("🏞️ Land (hectares)", min_value=0.0, step=0.5, value=None)
+    
+    category = st.selectbox(
+        "📋 Category",
+        ["Select", "General", "OBC", "SC", "ST"]
+    )
+    
     language = st.selectbox(
         "🗣️ Language",
-        ["English", "Hindi", "Marathi", "Tamil", "Gujarati"]
+        ["English", "Hindi", "Marathi", "Tamil", "Gujarati", "Kannada", "Telugu", "Bengali"]
     )
     
     st.divider()
     
     if st.button("🔄 Clear History"):
-        st.session_state.conversation_history = []
+        st.session_state.transcript = ChatTranscript()
+        st.query_params["session"] = st.session_state.transcript.session_id
+        st.session_state.visible_messages = settings.CHAT_RENDER_MESSAGES
         st.success("Conversation cleared!")
 
+profile = {
+    "location": location,
+    "crop": current_crop,
+    "soil": soil_type,
+    "land_ha": land_ha,
+    "category": category if category != "Select" else None,
+}
+
+# Warm weather, prices and soil context while the farmer is still typing
+profile_signature = (location, current_crop, soil_type, land_ha, language)
+if st.session_state.get("prefetched_profile") != profile_signature:
+    st.session_state.prefetched_profile = profile_signature
+    backend = initialize_backend()
+    if backend is not None:
+        backend.prefetch(profile, language)
+
 # Main Chat Interface
 col1, col2 = st.columns([3, 1])
 
@@ -144,78 +165,64 @@ with col2:
     if st.button("📸 Upload Image"):
         st.session_state.show_upload = True
 
-# Display chat history
-if st.session_state.conversation_history:
-    st.divider()
-    for msg in st.session_state.conversation_history:
-        if msg["role"] == "user":
-            st.chat_message("user").write(msg["content"])
-        else:
-            st.chat_message("assistant").write(msg["content"])
-    st.divider()
+@fragment
+def chat_area(profile):
+    """Chat history and input; a new message reruns only this function"""
+    transcript = st.session_state.transcript
+    
+    # Only the newest messages are rendered, so reruns cost the same at any length
+    hidden = len(transcript) - st.session_state.visible_messages
+    if hidden > 0 and st.button(f"⬆️ Load earlier messages ({hidden})"):
+        st.session_state.visible_messages += settings.CHAT_RENDER_MESSAGES
+    
+    history, summary = transcript.conversation()
+    if len(transcript):
+        st.divider()
+        if summary:
+            st.caption("Earlier messages have been summarized to keep answers fast.")
+        for msg in transcript.tail(st.session_state.visible_messages):
+            st.chat_message("user" if msg["role"] == "user" else "assistant").write(msg["content"])
+        st.divider()
+    
+    # User Input
+    user_input = st.chat_input("Type your question in any language...", key="chat_input")
+    
+    if user_input:
+        # Show loading
+        with st.spinner("🤔 Analyzing your question..."):
+            try:
+                backend = initialize_backend()
+                
+                if backend is None:
+                    st.error("Components not initialized. Check API keys.")
+                else:
+                    result = backend.answer(
+                        user_input,
+                        profile=profile,
+                        history=history,
+                        summary=summary
+                    )
+                    for alert in result["alerts"]:
+                        st.warning(alert)
+                    
+                    # History comes back with this turn added and older turns summarized
+                    transcript.set_conversation(result["history"], result["summary"])
+                    # Both halves of the exchange share one trace id
+                    trace_id = uuid.uuid4().hex
+                    transcript.append("user", user_input, result["language"], trace_id)
+                    transcript.append("assistant", result["response"], result["language"], trace_id)
+                    st.session_state.visible_messages += 2
+                    
+                    # Display response
+                    st.chat_message("user").write(user_input)
+                    st.chat_message("assistant").write(result["response"])
+            
+            except Exception as e:
+                st.error(f"Error processing query: {str(e)}")
+                logger.error(f"Error: {e}")
 
-# User Input
-user_input = st.chat_input("Type your question in any language...", key="chat_input")
 
-if user_input:
-    # Show loading
-    with st.spinner("🤔 Analyzing your question..."):
-        try:
-            # Initialize components
-            components = initialize_components()
-            
-            if components is None:
-                st.error("Components not initialized. Check API keys.")
-            else:
-                # Detect language
-                detected_lang = components["translator"].detect_language(user_input)
-                
-                # Translate to English
-                query_en = components["translator"].translate_to_english(user_input, detected_lang)
-                
-                # Get weather if location provided
-                context = {}
-                if location:
-                    try:
-                        context["weather"] = components["weather"].get_weather(location)
-                    except:
-                        st.warning("Could not fetch weather data")
-                
-                # Get crop recommendations
-                try:
-                    context["crops"] = components["crop_rag"].get_recommendations({
-                        "N": 200, "P": 40, "K": 300, "pH": 7.2
-                    })
-                except:
-                    pass
-                
-                # Generate response via LLM
-                response_en = components["llm"].generate_response(
-                    query_en,
-                    context,
-                    st.session_state.conversation_history
-                )
-                
-                # Translate back
-                response = components["translator"].translate_response(response_en, detected_lang)
-                
-                # Add to history
-                st.session_state.conversation_history.append({
-                    "role": "user",
-                    "content": user_input
-                })
-                st.session_state.conversation_history.append({
-                    "role": "assistant",
-                    "content": response
-                })
-                
-                # Display response
-                st.chat_message("user").write(user_input)
-                st.chat_message("assistant").write(response)
-                
-        except Exception as e:
-            st.error(f"Error processing query: {str(e)}")
-            logger.error(f"Error: {e}")
+chat_area(profile)
 
 # Footer
 st.divider()
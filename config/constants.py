@@ -88,6 +88,15 @@ CROP_DATA = {
     },
 }
 
+# Regional and transliterated names farmers use for each crop
+CROP_ALIASES = {
+    "wheat": ["gehu", "gehun", "गेहूं", "गेहूँ", "गहू", "ઘઉં", "கோதுமை"],
+    "rice": ["paddy", "chawal", "dhan", "चावल", "धान", "तांदूळ", "भात", "ચોખા", "ડાંગર", "அரிசி", "நெல்"],
+    "cotton": ["kapas", "कपास", "कापूस", "કપાસ", "பருத்தி"],
+    "sugarcane": ["ganna", "गन्ना", "ऊस", "શેરડી", "கரும்பு"],
+    "soybean": ["soya", "soyabean", "सोयाबीन", "सोया", "સોયાબીન", "சோயா"],
+}
+
 # ════════════════════════════════════════════════════════════════════════════
 # DISEASE DATA
 # ════════════════════════════════════════════════════════════════════════════
@@ -256,17 +265,39 @@ FERTILIZERS = {
     },
 }
 
+# Nutrient content as % N, P2O5 and K2O; prices are subsidized MRP per bag
+FERTILIZER_PRODUCTS = {
+    "urea": {"name": "Urea", "hindi_name": "यूरिया", "N": 46, "P": 0, "K": 0, "bag_kg": 45, "price_per_bag": 266.5},
+    "dap": {"name": "DAP", "hindi_name": "डीएपी", "N": 18, "P": 46, "K": 0, "bag_kg": 50, "price_per_bag": 1350},
+    "ssp": {"name": "Single Super Phosphate", "hindi_name": "सिंगल सुपर फॉस्फेट", "N": 0, "P": 16, "K": 0, "bag_kg": 50, "price_per_bag": 480},
+    "mop": {"name": "Muriate of Potash", "hindi_name": "म्यूरेट ऑफ पोटाश", "N": 0, "P": 0, "K": 60, "bag_kg": 50, "price_per_bag": 1700},
+    "npk_10_26_26": {"name": "NPK 10:26:26", "hindi_name": "एनपीके 10:26:26", "N": 10, "P": 26, "K": 26, "bag_kg": 50, "price_per_bag": 1470},
+}
+
+# Recommended dose of N, P2O5 and K2O in kg/ha at medium soil fertility
+CROP_NUTRIENT_TARGETS = {
+    "wheat": {"N": 120, "P": 60, "K": 40},
+    "rice": {"N": 120, "P": 60, "K": 40},
+    "cotton": {"N": 100, "P": 50, "K": 50},
+    "sugarcane": {"N": 250, "P": 115, "K": 115},
+    "soybean": {"N": 30, "P": 60, "K": 40},
+}
+
 # ════════════════════════════════════════════════════════════════════════════
 # GOVERNMENT SCHEMES
 # ════════════════════════════════════════════════════════════════════════════
 
+# "rules" are matched by modules/schemes.py; a missing predicate means no restriction.
+# states: lowercase state names, crops: crop keys, land_ha: [min, max] hectares
+# (None for open-ended), categories: general / obc / sc / st
 GOVERNMENT_SCHEMES = {
     "pm_kisan": {
         "name": "PM Kisan Samman Nidhi",
         "description": "Income support for farmers",
         "amount": "₹6000/year",
-        "eligibility": "All farmers",
+        "eligibility": "All landholding farmers",
         "website": "https://pmkisan.gov.in",
+        "rules": {"land_ha": [0.01, None]},
     },
     "pm_fasal_bima": {
         "name": "Pradhan Mantri Fasal Bima Yojana",
@@ -274,6 +305,7 @@ GOVERNMENT_SCHEMES = {
         "amount": "Variable",
         "eligibility": "All farmers",
         "website": "https://pmfby.gov.in",
+        "rules": {},
     },
     "soil_health": {
         "name": "Soil Health Card Scheme",
@@ -281,6 +313,166 @@ GOVERNMENT_SCHEMES = {
         "amount": "Free",
         "eligibility": "All farmers",
         "website": "https://soilhealth.dac.gov.in",
+        "rules": {},
+    },
+    "kisan_credit_card": {
+        "name": "Kisan Credit Card",
+        "description": "Short-term crop loans at subsidized interest",
+        "amount": "Up to ₹3 lakh at 4% with prompt repayment",
+        "eligibility": "All farmers, including tenants and sharecroppers",
+        "website": "https://www.myscheme.gov.in/schemes/kcc",
+        "rules": {},
+    },
+    "pm_kisan_maandhan": {
+        "name": "PM Kisan Maan Dhan Yojana",
+        "description": "Contributory pension for small and marginal farmers",
+        "amount": "₹3000/month pension after age 60",
+        "eligibility": "Small and marginal farmers with up to 2 ha",
+        "website": "https://maandhan.in",
+        "rules": {"land_ha": [0.01, 2]},
+    },
+    "nfsm": {
+        "name": "National Food Security Mission",
+        "description": "Seed, demonstration and input support for food grains",
+        "amount": "Subsidy on seed, nutrients and machinery",
+        "eligibility": "Rice and wheat growers in NFSM districts",
+        "website": "https://www.nfsm.gov.in",
+        "rules": {"crops": ["rice", "wheat"]},
+    },
+    "namo_shetkari": {
+        "name": "Namo Shetkari Mahasanman Nidhi",
+        "description": "Maharashtra top-up to PM Kisan",
+        "amount": "₹6000/year",
+        "eligibility": "Landholding farmers in Maharashtra",
+        "website": "https://nsmn.mahait.org",
+        "rules": {"states": ["maharashtra"], "land_ha": [0.01, None]},
+    },
+    "ambedkar_krushi_swavalamban": {
+        "name": "Dr. Babasaheb Ambedkar Krushi Swavalamban Yojana",
+        "description": "Wells, pumps and micro-irrigation for SC farmers",
+        "amount": "Up to ₹2.5 lakh",
+        "eligibility": "SC farmers in Maharashtra with 0.4-6 ha",
+        "website": "https://mahadbt.maharashtra.gov.in",
+        "rules": {"states": ["maharashtra"], "categories": ["sc"], "land_ha": [0.4, 6]},
+    },
+    "birsa_munda_krishi_kranti": {
+        "name": "Birsa Munda Krishi Kranti Yojana",
+        "description": "Wells, pumps and micro-irrigation for ST farmers",
+        "amount": "Up to ₹2.5 lakh",
+        "eligibility": "ST farmers in Maharashtra with 0.2-6 ha",
+        "website": "https://mahadbt.maharashtra.gov.in",
+        "rules": {"states": ["maharashtra"], "categories": ["st"], "land_ha": [0.2, 6]},
+    },
+    "kalia": {
+        "name": "KALIA",
+        "description": "Odisha livelihood support for small and marginal farmers",
+        "amount": "₹10000/year",
+        "eligibility": "Small and marginal farmers in Odisha",
+        "website": "https://kalia.odisha.gov.in",
+        "rules": {"states": ["odisha"], "land_ha": [0, 2]},
+    },
+}
+
+# ════════════════════════════════════════════════════════════════════════════
+# MANDI (APMC) DIRECTORY
+# ════════════════════════════════════════════════════════════════════════════
+
+MANDIS = {
+    "lasalgaon": {
+        "name": "Lasalgaon APMC",
+        "district": "Nashik",
+        "state": "Maharashtra",
+        "lat": 20.1500,
+        "lon": 74.2333,
+        "crops": ["wheat", "soybean"],
+    },
+    "nashik": {
+        "name": "Nashik APMC",
+        "district": "Nashik",
+        "state": "Maharashtra",
+        "lat": 19.9975,
+        "lon": 73.7898,
+        "crops": ["wheat", "soybean", "rice"],
+    },
+    "pune": {
+        "name": "Pune Market Yard",
+        "district": "Pune",
+        "state": "Maharashtra",
+        "lat": 18.4967,
+        "lon": 73.8654,
+        "crops": ["wheat", "rice", "soybean"],
+    },
+    "latur": {
+        "name": "Latur APMC",
+        "district": "Latur",
+        "state": "Maharashtra",
+        "lat": 18.4088,
+        "lon": 76.5604,
+        "crops": ["soybean", "wheat"],
+    },
+    "akola": {
+        "name": "Akola APMC",
+        "district": "Akola",
+        "state": "Maharashtra",
+        "lat": 20.7002,
+        "lon": 77.0082,
+        "crops": ["cotton", "soybean"],
+    },
+    "kolhapur": {
+        "name": "Kolhapur APMC",
+        "district": "Kolhapur",
+        "state": "Maharashtra",
+        "lat": 16.7050,
+        "lon": 74.2433,
+        "crops": ["sugarcane", "rice"],
+    },
+    "indore": {
+        "name": "Indore Mandi",
+        "district": "Indore",
+        "state": "Madhya Pradesh",
+        "lat": 22.7196,
+        "lon": 75.8577,
+        "crops": ["soybean", "wheat"],
+    },
+    "rajkot": {
+        "name": "Rajkot APMC",
+        "district": "Rajkot",
+        "state": "Gujarat",
+        "lat": 22.3039,
+        "lon": 70.8022,
+        "crops": ["cotton", "wheat"],
+    },
+    "karnal": {
+        "name": "Karnal Mandi",
+        "district": "Karnal",
+        "state": "Haryana",
+        "lat": 29.6857,
+        "lon": 76.9905,
+        "crops": ["wheat", "rice"],
+    },
+    "khanna": {
+        "name": "Khanna Mandi",
+        "district": "Ludhiana",
+        "state": "Punjab",
+        "lat": 30.7046,
+        "lon": 76.2219,
+        "crops": ["wheat", "rice"],
+    },
+    "muzaffarnagar": {
+        "name": "Muzaffarnagar Mandi",
+        "district": "Muzaffarnagar",
+        "state": "Uttar Pradesh",
+        "lat": 29.4727,
+        "lon": 77.7085,
+        "crops": ["sugarcane", "wheat"],
+    },
+    "guntur": {
+        "name": "Guntur Market Yard",
+        "district": "Guntur",
+        "state": "Andhra Pradesh",
+        "lat": 16.3067,
+        "lon": 80.4365,
+        "crops": ["cotton", "rice"],
     },
 }
 
@@ -323,18 +515,107 @@ CACHE = {
 # ════════════════════════════════════════════════════════════════════════════
 
 LLM_CONFIG = {
+    "backend": "hf",  # hf | local | stub
     "model": "mistralai/Mistral-7B-Instruct-v0.2",
+    "local_model": "Qwen/Qwen2.5-0.5B-Instruct",  # or a .gguf path for llama.cpp
+    "secondary_backend": None,  # backend raced against a slow primary, e.g. "local"
+    "deadline_seconds": 20,  # to the first token; a streaming answer then runs to the end
+    "stall_seconds": 15,  # longest gap between tokens before an answer is abandoned
+    "hedge_default_seconds": 4,  # hedge delay until enough TTFT samples exist
+    "hedge_min_samples": 20,
     "max_tokens": 300,
+    "max_prompt_tokens": 2048,
     "temperature": 0.7,
     "top_p": 0.95,
 }
 
+# Upstream quotas for utils.admission, shared by every process on the host.
+# Units are calls, except DeepL which is charged per character.
+ADMISSION_CONFIG = {
+    "upstreams": {
+        "openweather": {"rate_per_minute": 60, "burst": 20},
+        "deepl": {"rate_per_minute": 10000, "burst": 20000},
+        "hf": {"rate_per_minute": 30, "burst": 10},
+    },
+    "batch_reserve": 0.3,  # share of each bucket batch work may not dip into
+    "wait_seconds": {"interactive": 1.0, "batch": 60.0},  # queueing before degrading
+}
+
+# Periodic jobs run by `python -m modules.scheduler`. A job fires every
+# "every_seconds" or on a five-field "cron" (minute hour day month weekday,
+# local time), delayed by up to "jitter_seconds". "max_instances" caps
+# concurrent runs across scheduler processes; a run due while that many are
+# still going is skipped. "timeout_seconds" bounds how long a crashed run
+# holds its slot.
+SCHEDULER_CONFIG = {
+    "max_workers": 2,
+    "jobs": {
+        "weather_refresh": {"every_seconds": 45 * 60, "jitter_seconds": 120, "max_instances": 1, "timeout_seconds": 600},
+        "market_ingest": {"cron": "15 */4 * * *", "jitter_seconds": 300, "max_instances": 1, "timeout_seconds": 900},
+        "translation_warmup": {"cron": "30 2 * * *", "jitter_seconds": 600, "max_instances": 1, "timeout_seconds": 1800},
+        "kb_snapshot": {"cron": "0 3 * * *", "jitter_seconds": 300, "max_instances": 1, "timeout_seconds": 600},
+        "soil_ingest": {"cron": "0 4 * * 0", "jitter_seconds": 600, "max_instances": 1, "timeout_seconds": 3600},
+        "conversation_evict": {"every_seconds": 6 * 3600, "jitter_seconds": 600, "max_instances": 1, "timeout_seconds": 600},
+    },
+    "warmup_questions": 200,  # most frequent recent non-English questions pre-translated
+    "warmup_days": 7,
+}
+
+RETRIEVAL_CONFIG = {
+    # Multilingual model: Hindi, Marathi, Gujarati and Tamil queries embed
+    # directly against the English index without a translation hop
+    "embedding_model": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+    "multilingual": True,
+    "reranker_model": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    "enable_dense": True,
+    "enable_reranker": False,
+    "lexical_weight": 0.5,  # dense weight is 1 - lexical_weight
+    "crosslingual_lexical_weight": 0.2,  # non-English queries rarely share terms with the index
+    "embedding_batch_size": 32,
+    "embedding_batch_wait_ms": 5,  # how long the batcher waits for concurrent callers
+    "embedding_cache_size": 4096,  # query embeddings kept in the LRU
+    "candidates": 20,  # per retriever, before fusion
+    "rerank_top_n": 10,
+    "rerank_budget_ms": 50,
+}
+
 DISEASE_DETECTION_CONFIG = {
     "model": "efficientnet-b4",
     "input_size": 224,
     "confidence_threshold": 0.7,
 }
 
+FERTILIZER_CONFIG = {
+    # Soil test (kg/ha available) below the first bound is rated low, above the second high
+    "ratings": {"N": (280, 560), "P": (10, 25), "K": (110, 280)},
+    # Dose multiplier from low to high fertility, interpolated in between
+    "adjustment": (1.25, 0.75),
+    # Product that supplies each nutrient, applied P, then K, then N tops up
+    "mix": {"P": "dap", "K": "mop", "N": "urea"},
+}
+
+CROP_SUITABILITY_CONFIG = {
+    # Score falls from 1 at the edge of a crop's pH range to 0 this many units outside it
+    "ph_tolerance": 1.5,
+    # Share of the score from pH and from N/P/K fertility (rated with FERTILIZER_CONFIG)
+    "weights": {"pH": 0.5, "nutrients": 0.5},
+}
+
+SOIL_HEALTH_CONFIG = {
+    "geohash_precision": 5,  # ~5 km cells; two coarser levels are stored as fallbacks
+    "fallback_levels": 2,
+    "chunk_rows": 100000,  # rows aggregated per vectorized pass during ingestion
+    "min_samples": 3,  # cells with fewer valid samples are not used
+    # Plausible Soil Health Card values; anything outside is treated as a data-entry error
+    "ranges": {
+        "N": (0, 1500),  # available N, kg/ha
+        "P": (0, 400),  # available P, kg/ha
+        "K": (0, 3000),  # available K, kg/ha
+        "pH": (3.0, 10.5),
+        "OC": (0.0, 5.0),  # organic carbon, %
+    },
+}
+
 # ════════════════════════════════════════════════════════════════════════════
 # CONSTANTS CLASS FOR EASY ACCESS
 # ════════════════════════════════════════════════════════════════════════════
@@ -350,10 +631,14 @@ class CONSTANTS:
 
     # Data
     CROP_DATA = CROP_DATA
+    CROP_ALIASES = CROP_ALIASES
     DISEASES = DISEASES
     SOIL_TYPES = SOIL_TYPES
     FERTILIZERS = FERTILIZERS
+    FERTILIZER_PRODUCTS = FERTILIZER_PRODUCTS
+    CROP_NUTRIENT_TARGETS = CROP_NUTRIENT_TARGETS
     SCHEMES = GOVERNMENT_SCHEMES
+    MANDIS = MANDIS
 
     # UI
     UI_STRINGS = UI_STRINGS
@@ -362,29 +647,37 @@ class CONSTANTS:
     # Configuration
     CACHE_SETTINGS = CACHE
     LLM_CONFIG = LLM_CONFIG
+    ADMISSION = ADMISSION_CONFIG
+    SCHEDULER = SCHEDULER_CONFIG
+    RETRIEVAL_CONFIG = RETRIEVAL_CONFIG
     DISEASE_DETECTION = DISEASE_DETECTION_CONFIG
+    SOIL_HEALTH = SOIL_HEALTH_CONFIG
+    FERTILIZER = FERTILIZER_CONFIG
+    CROP_SUITABILITY = CROP_SUITABILITY_CONFIG
 
     @staticmethod
     def get_crop_info(crop_name: str) -> dict:
         """Get crop information by name"""
-        crop_key = crop_name.lower().replace(" ", "_")
-        return CROP_DATA.get(crop_key, {})
+        from modules.knowledge_base import get_knowledge_base
+        record = get_knowledge_base().crop(crop_name)
+        return record.to_dict() if record else {}
 
     @staticmethod
     def get_disease_info(disease_name: str) -> dict:
         """Get disease information by name"""
-        disease_key = disease_name.lower().replace(" ", "_")
-        return DISEASES.get(disease_key, {})
+        from modules.knowledge_base import get_knowledge_base
+        record = get_knowledge_base().disease(disease_name)
+        return record.to_dict() if record else {}
 
     @staticmethod
     def get_soil_info(soil_type: str) -> dict:
         """Get soil type information"""
-        soil_key = soil_type.lower().replace(" ", "_")
-        return SOIL_TYPES.get(soil_key, {})
+        from modules.knowledge_base import get_knowledge_base
+        record = get_knowledge_base().soil(soil_type)
+        return record.to_dict() if record else {}
 
     @staticmethod
     def get_suitable_crops(soil_type: str) -> list:
         """Get crops suitable for soil type"""
-        soil_key = soil_type.lower().replace(" ", "_")
-        soil_info = SOIL_TYPES.get(soil_key, {})
-        return soil_info.get("suitable_crops", [])
+        from modules.knowledge_base import get_knowledge_base
+        return list(get_knowledge_base().crops_for_soil(soil_type))
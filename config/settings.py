@@ -105,22 +105,59 @@ class Settings:
         self.FAISS_INDEX_PATH = os.path.join(self.DATA_DIR, "faiss_index.bin")
         self.CROPS_KB_PATH = os.path.join(self.DATA_DIR, "crops_kb.json")
         self.DISEASES_DB_PATH = os.path.join(self.DATA_DIR, "diseases.json")
+        self.KB_SNAPSHOT_DIR = os.path.join(self.DATA_DIR, "kb_snapshot")
+        self.LOCALES_DIR = os.path.join(self.DATA_DIR, "locales")
+        self.SOIL_STORE_DIR = os.path.join(self.DATA_DIR, "soil_store")
+        # Soil Health Card exports dropped here are ingested by the scheduler
+        self.SOIL_HEALTH_INBOX_DIR = os.path.join(self.DATA_DIR, "soil_health_cards")
+        self.SCHEDULER_DB_PATH = os.path.join(self.DATA_DIR, "scheduler.db")
 
     def _load_feature_flags(self):
         """Load feature flags and application settings"""
         # Debug mode (only affects local, not HF)
         self.DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
+        # Copilot API service; when set, the Streamlit UI is a thin client of it
+        self.API_URL = os.getenv("COPILOT_API_URL", "")
+
         # API Rate Limits & Caching
         self.WEATHER_CACHE_HOURS = 1
         self.MARKET_CACHE_HOURS = 4
         self.DISEASE_DETECTION_CACHE_HOURS = 24
+        self.TRANSLATION_CACHE_HOURS = 24 * 30
+        self.RESPONSE_CACHE_HOURS = 1
+        self.PROFILE_CONTEXT_CACHE_MINUTES = 10
+        # How often running workers look for a soil store rebuilt by the scheduler
+        self.SOIL_STORE_RELOAD_SECONDS = 60
+        # Last good weather, served when the OpenWeather budget is spent
+        self.WEATHER_STALE_HOURS = 24
+
+        # Shared cache backend: memory://, sqlite:///path, shm://, redis://host:port/db,
+        # or a comma-separated list of URLs to shard keys across. The default is
+        # also what an unavailable Redis falls back to
+        self.DEFAULT_CACHE_URL = "sqlite://" + os.path.join(self.DATA_DIR, "cache", "shared.db")
+        self.CACHE_URL = os.getenv("COPILOT_CACHE_URL", self.DEFAULT_CACHE_URL)
+
+        # Upstream quota buckets shared across processes; empty keeps them per process
+        self.ADMISSION_DB_PATH = os.getenv(
+            "COPILOT_ADMISSION_DB",
+            os.path.join(self.DATA_DIR, "cache", "admission.db")
+        )
+
+        # CPU threads for local models. torch's thread pool is process-wide,
+        # so the embedder and a local LLM share this one budget
+        self.MODEL_THREADS = int(os.getenv("COPILOT_MODEL_THREADS", "4"))
 
         # Chat Settings
         self.MAX_CONVERSATION_HISTORY = 10
         self.MAX_INPUT_LENGTH = 500
         self.LLM_MAX_TOKENS = 300
         self.LLM_TEMPERATURE = 0.7
+        # Conversation log shared by every worker; idle sessions are evicted
+        self.CONVERSATION_DB_PATH = os.path.join(self.DATA_DIR, "conversations.db")
+        self.CONVERSATION_TTL_DAYS = 30
+        # Messages rendered per "load earlier" step in the chat area
+        self.CHAT_RENDER_MESSAGES = 10
 
         # Streamlit Settings
         self.STREAMLIT_PAGE_LAYOUT = "wide"
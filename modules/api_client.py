@@ -0,0 +1,65 @@
+import json
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class CopilotClient:
+    """HTTP client for the API service; same answer()/stream() shape as CopilotPipeline"""
+    
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+    
+    def answer(self, message, profile=None, history=None, summary=""):
+        """Answer one farmer message through POST /v1/chat"""
+        response = self.session.post(
+            f"{self.base_url}/v1/chat",
+            json=self._payload(message, profile, history, summary, stream=False),
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def stream(self, message, profile=None, history=None, summary=""):
+        """Yield {"event", "data"} dicts from the server-sent event stream"""
+        with self.session.post(
+            f"{self.base_url}/v1/chat",
+            json=self._payload(message, profile, history, summary, stream=True),
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: ") and event:
+                    yield {"event": event, "data": json.loads(line[len("data: "):])}
+                    event = None
+    
+    def prefetch(self, profile, language=None):
+        """Ask the service to warm a profile's context; never raises"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/v1/prefetch",
+                json={"profile": profile or {}, "language": language},
+                timeout=2
+            )
+            response.raise_for_status()
+            return response.json().get("scheduled", False)
+        except Exception as e:
+            logger.warning(f"Prefetch request failed: {e}")
+            return False
+    
+    @staticmethod
+    def _payload(message, profile, history, summary, stream):
+        return {
+            "message": message,
+            "profile": profile or {},
+            "history": history or [],
+            "summary": summary or "",
+            "stream": stream,
+        }
@@ -0,0 +1,330 @@
+"""
+Bulk advisory generation for district-wide SMS / WhatsApp broadcasts.
+
+Farmers are grouped by (district grid cell, crop, language). Weather, disease
+risk, mandi prices and crop suggestions are computed once per group, one
+advisory per group is generated and translated in a process pool, and the
+results stream to JSONL with one line per farmer:
+    
+    python -m modules.bulk_advisory roster.csv --output advisories.jsonl --workers 4
+
+The roster is CSV or JSONL with farmer_id, location, crop, language and soil
+columns; optional lat / lon columns skip the district lookup.
+"""
+import argparse
+import csv
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from config import settings
+from modules.crop_rag import CropRAGSystem
+from modules.disease_risk import DiseaseRiskEngine
+from modules.fertilizer import NUTRIENTS, FertilizerCalculator
+from modules.knowledge_base import get_knowledge_base
+from modules.market import MarketAPI
+from modules.soil_health import get_soil_store, soil_params
+from modules.weather import WeatherAPI
+from utils.admission import BATCH, set_default_priority
+from utils.geo import grid_cell
+
+logger = logging.getLogger(__name__)
+
+# About 55 km: farmers in one cell share weather and mandis
+CELL_DEG = 0.5
+
+ADVISORY_QUESTION = (
+    "Write a short advisory for this week, under 60 words and suitable for SMS, "
+    "for {crop} farmers near {location}{soil}. Mention weather, disease risk, fertilizer and prices."
+)
+
+
+class StageTimer:
+    """Items processed and seconds spent per pipeline stage"""
+    
+    def __init__(self):
+        self.stages = {}
+    
+    def add(self, stage, items, seconds):
+        entry = self.stages.setdefault(stage, {"items": 0, "seconds": 0.0})
+        entry["items"] += items
+        entry["seconds"] += seconds
+    
+    def report(self):
+        return {
+            stage: {
+                "items": entry["items"],
+                "seconds": round(entry["seconds"], 3),
+                "items_per_second": round(entry["items"] / entry["seconds"], 1) if entry["seconds"] else None,
+            }
+            for stage, entry in self.stages.items()
+        }
+
+
+def read_roster(path):
+    """Yield farmer rows from a CSV or JSONL roster"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if str(path).endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def language_name(language):
+    """Roster language code or name -> the name the translator expects"""
+    value = str(language or "en").strip()
+    names = settings.SUPPORTED_LANGUAGES
+    if value.lower() in names:
+        return names[value.lower()]
+    for name in names.values():
+        if name.lower() == value.lower():
+            return name
+    return "English"
+
+
+def group_roster(rows, market):
+    """
+    Group farmers by (district cell, crop, language).
+    
+    Returns:
+        dict: group key -> {"location", "lat", "lon", "crop", "language", "farmers", "soils"}
+    """
+    groups = {}
+    for number, row in enumerate(rows):
+        location = (row.get("location") or "").strip()
+        crop = (row.get("crop") or "").strip().title()
+        language = language_name(row.get("language"))
+        if row.get("lat") not in (None, "") and row.get("lon") not in (None, ""):
+            point = (float(row["lat"]), float(row["lon"]))
+        else:
+            point = market._resolve_location(location)
+        # Unknown places still group by their normalized name
+        cell = grid_cell(point[0], point[1], CELL_DEG) if point else " ".join(location.lower().split())
+        
+        group = groups.setdefault((cell, crop, language), {
+            "location": location,
+            "lat": point[0] if point else None,
+            "lon": point[1] if point else None,
+            "crop": crop,
+            "language": language,
+            "farmers": [],
+            "soils": Counter(),
+        })
+        # Rows without an id are told apart by their position in the roster
+        group["farmers"].append(row.get("farmer_id") or row.get("phone") or str(number))
+        soil = (row.get("soil") or "").strip()
+        if soil:
+            group["soils"][soil] += 1
+    return groups
+
+
+def build_contexts(groups, weather_api, market, risk_engine, crop_rag, fertilizer, timer):
+    """Weather, risk, prices, crop suggestions and fertilizer plans, computed once per group"""
+    # Weather: one lookup per distinct place, fetched concurrently
+    start = time.perf_counter()
+    places = {g["location"] for g in groups.values() if g["location"]}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        weather = dict(zip(places, pool.map(weather_api.get_weather, places)))
+    timer.add("weather", len(places), time.perf_counter() - start)
+    
+    # Risk: every place x crop in one vectorized pass
+    start = time.perf_counter()
+    crops = sorted({g["crop"].lower() for g in groups.values()})
+    risk_rows = {}
+    for row in risk_engine.risk_table(weather, crops):
+        risk_rows.setdefault((row["location"], row["crop"]), []).append(row)
+    timer.add("risk", len(groups), time.perf_counter() - start)
+    
+    # Prices: nearest mandis per group, fetched concurrently
+    start = time.perf_counter()
+    keys = list(groups)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        prices = list(pool.map(lambda key: _group_prices(market, groups[key]), keys))
+    contexts = {
+        key: {
+            "weather": weather.get(groups[key]["location"]) or {},
+            "market": market_prices,
+            "disease_risk": risk_rows.get((groups[key]["location"], groups[key]["crop"].lower()), []),
+        }
+        for key, market_prices in zip(keys, prices)
+    }
+    timer.add("prices", len(groups), time.perf_counter() - start)
+    
+    # Soil card averages per group; suggestions are shared by groups with equal soil
+    start = time.perf_counter()
+    soil_store = get_soil_store()
+    suggestions = {}
+    for key, group in groups.items():
+        soil = soil_store.lookup((group["lat"], group["lon"]) if group["lat"] is not None else None, group["location"])
+        params = soil_params(soil)
+        signature = tuple(sorted(params.items()))
+        if signature not in suggestions:
+            suggestions[signature] = crop_rag.get_recommendations(params)
+        contexts[key]["crops"] = suggestions[signature]
+        if soil:
+            contexts[key]["soil"] = soil
+    timer.add("recommend", len(groups), time.perf_counter() - start)
+    
+    # Fertilizer plans for every group in one vectorized call
+    start = time.perf_counter()
+    keys = list(groups)
+    measured = [
+        [(contexts[key].get("soil") or {}).get(n, float("nan")) for n in NUTRIENTS]
+        for key in keys
+    ]
+    doses = fertilizer.doses([groups[key]["crop"] for key in keys], measured)
+    for i, key in enumerate(keys):
+        plan = fertilizer.plan(doses, i)
+        if plan:
+            plan["crop"] = groups[key]["crop"]
+            plan["soil_tested"] = "soil" in contexts[key]
+            contexts[key]["fertilizer"] = plan
+    timer.add("fertilizer", len(groups), time.perf_counter() - start)
+    return contexts
+
+
+def _group_prices(market, group):
+    where = (group["lat"], group["lon"]) if group["lat"] is not None else group["location"]
+    return market.get_prices(group["crop"], location=where)
+
+
+def _soil_clause(soils):
+    # The group's most common soil type, when the roster records one
+    soil, _ = max(soils.items(), key=lambda item: item[1], default=("", 0))
+    if not soil:
+        return ""
+    # Roster values are often the app's labels, e.g. "Black Soil"
+    record = get_knowledge_base().soil(soil)
+    name = (record.name if record else soil).lower()
+    return f" on {name}" if name.endswith("soil") else f" on {name} soil"
+
+
+_worker = {}
+
+
+def _init_worker(hf_token, deepl_key, backend):
+    # Each pool process loads its own LLM client and translator once
+    set_default_priority(BATCH)
+    from modules.llm_engine import FarmerCopilotLLM
+    from nlp.translator import MultilingualProcessor
+    _worker["llm"] = FarmerCopilotLLM(hf_token, backend=backend)
+    _worker["translator"] = MultilingualProcessor(deepl_key)
+
+
+def _generate(task):
+    start = time.perf_counter()
+    advisory_en = _worker["llm"].generate_response(task["question"], task["context"], [])
+    generated = time.perf_counter()
+    advisory = _worker["translator"].translate_response(advisory_en, task["language"])
+    # Languages DeepL can't translate, and failed translations, come back in English
+    language = task["language"] if advisory != advisory_en else "English"
+    return {
+        "key": task["key"],
+        "advisory": advisory,
+        "language": language,
+        "untranslated": language != task["language"],
+        "advisory_en": advisory_en,
+        "generate_seconds": generated - start,
+        "translate_seconds": time.perf_counter() - generated,
+    }
+
+
+def run_batch(roster_path, output_path, workers=4, backend=None):
+    """
+    Generate advisories for a roster and stream them to JSONL.
+    
+    Args:
+        roster_path (str): CSV or JSONL roster
+        output_path (str): JSONL output, one line per farmer
+        workers (int): Generation / translation processes
+        backend (str): LLM backend name, defaults to LLM_CONFIG["backend"]
+    
+    Returns:
+        dict: Totals and per-stage throughput
+    """
+    batch_start = time.perf_counter()
+    # Broadcasts queue behind interactive chat for every upstream quota
+    set_default_priority(BATCH)
+    timer = StageTimer()
+    weather_api = WeatherAPI(settings.OPENWEATHER_API_KEY)
+    market = MarketAPI()
+    risk_engine = DiseaseRiskEngine()
+    crop_rag = CropRAGSystem()
+    fertilizer = FertilizerCalculator()
+    
+    start = time.perf_counter()
+    groups = group_roster(read_roster(roster_path), market)
+    farmers = sum(len(g["farmers"]) for g in groups.values())
+    timer.add("group", farmers, time.perf_counter() - start)
+    logger.info(f"{farmers} farmers in {len(groups)} advisory groups")
+    
+    contexts = build_contexts(groups, weather_api, market, risk_engine, crop_rag, fertilizer, timer)
+    
+    # Group keys hold tuples; tasks carry a JSON-friendly id instead
+    keys = list(groups)
+    tasks = [
+        {
+            "key": i,
+            "question": ADVISORY_QUESTION.format(
+                crop=groups[key]["crop"],
+                location=groups[key]["location"],
+                soil=_soil_clause(groups[key]["soils"])
+            ),
+            "context": contexts[key],
+            "language": groups[key]["language"],
+        }
+        for i, key in enumerate(keys)
+    ]
+    
+    written = 0
+    pool_start = time.perf_counter()
+    with open(output_path, "w", encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(settings.HUGGINGFACE_TOKEN, settings.DEEPL_API_KEY, backend)
+    ) as pool:
+        for future in as_completed([pool.submit(_generate, task) for task in tasks]):
+            result = future.result()
+            group = groups[keys[result["key"]]]
+            timer.add("generate", 1, result["generate_seconds"])
+            timer.add("translate", 1, result["translate_seconds"])
+            
+            start = time.perf_counter()
+            for farmer_id in group["farmers"]:
+                out.write(json.dumps({
+                    "farmer_id": farmer_id,
+                    "location": group["location"],
+                    "crop": group["crop"],
+                    "language": result["language"],
+                    "untranslated": result["untranslated"],
+                    "group": result["key"],
+                    "advisory": result["advisory"],
+                }, ensure_ascii=False) + "\n")
+            written += len(group["farmers"])
+            timer.add("write", len(group["farmers"]), time.perf_counter() - start)
+    
+    wall = time.perf_counter() - batch_start
+    return {
+        "farmers": farmers,
+        "groups": len(groups),
+        "written": written,
+        "workers": workers,
+        "generation_wall_seconds": round(time.perf_counter() - pool_start, 3),
+        "wall_seconds": round(wall, 3),
+        "farmers_per_second": round(written / wall, 1) if wall else None,
+        "stages": timer.report(),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Generate advisories for a farmer roster")
+    parser.add_argument("roster", help="CSV or JSONL roster")
+    parser.add_argument("--output", default="advisories.jsonl", help="JSONL output path")
+    parser.add_argument("--workers", type=int, default=4, help="Generation processes")
+    parser.add_argument("--backend", default=None, help="LLM backend (hf, local, stub)")
+    args = parser.parse_args()
+    print(json.dumps(run_batch(args.roster, args.output, args.workers, args.backend), indent=2))
@@ -0,0 +1,39 @@
+import logging
+import uuid
+from modules.conversation_store import get_conversation_store
+
+logger = logging.getLogger(__name__)
+
+
+class ChatTranscript:
+    """One session's chat, read from and appended to the conversation store"""
+    
+    def __init__(self, session_id=None, store=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.store = store or get_conversation_store()
+    
+    def __len__(self):
+        return self.store.count(self.session_id)
+    
+    def append(self, role, content, language=None, trace_id=None):
+        """Add one message to the end of the transcript"""
+        return self.store.append(self.session_id, role, content, language, trace_id)
+    
+    def tail(self, n):
+        """
+        Last messages of the transcript.
+        
+        Args:
+            n (int): Number of messages
+        
+        Returns:
+            list: Up to n message dicts, oldest first; older turns stay on disk
+        """
+        return self.store.page(self.session_id, n) if n > 0 else []
+    
+    def conversation(self):
+        """(history, summary) to pass to the pipeline for the next turn"""
+        return self.store.get_state(self.session_id)
+    
+    def set_conversation(self, history, summary):
+        self.store.set_state(self.session_id, history, summary)
@@ -0,0 +1,300 @@
+"""
+Persistent conversation store: one append-only turn log per session in SQLite.
+
+Turns are stored compactly (compressed text, its language, a timestamp
+and a 16-byte trace id) in a table clustered by (session, seq), so reading
+the newest page of a session touches a few B-tree pages and nothing is held
+in process memory between calls. Sessions idle longer than the TTL are
+evicted as writes come in, or on demand:
+    
+    python -m modules.conversation_store --evict
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    _zstd_compress = zstandard.ZstdCompressor(level=3)
+    _zstd_decompress = zstandard.ZstdDecompressor()
+except ImportError:
+    zstandard = None
+    logger.warning("zstandard not installed; conversation text will be zlib-compressed")
+
+# First byte of every stored blob says how the rest is encoded
+RAW, ZLIB, ZSTD = b"r", b"d", b"z"
+
+# Short texts grow when compressed; store them as-is
+MIN_COMPRESS_BYTES = 64
+
+ROLES = ("user", "assistant")
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    "id TEXT PRIMARY KEY, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+    "turns INTEGER NOT NULL DEFAULT 0, state BLOB)",
+    "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)",
+    "CREATE TABLE IF NOT EXISTS turns ("
+    "session_id TEXT NOT NULL, seq INTEGER NOT NULL, role INTEGER NOT NULL, "
+    "language TEXT, created_at REAL NOT NULL, trace_id BLOB, text BLOB NOT NULL, "
+    "PRIMARY KEY (session_id, seq)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS turns_created ON turns (created_at)",
+)
+
+
+def encode_text(text):
+    """UTF-8 text -> tagged, compressed blob"""
+    raw = text.encode("utf-8")
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return RAW + raw
+    if zstandard is not None:
+        return ZSTD + _zstd_compress.compress(raw)
+    return ZLIB + zlib.compress(raw, 6)
+
+
+def decode_text(blob):
+    """Inverse of encode_text, whichever codec wrote the blob"""
+    blob = bytes(blob)
+    tag, body = blob[:1], blob[1:]
+    if tag == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Turn was stored zstd-compressed; install zstandard to read it")
+        body = _zstd_decompress.decompress(body)
+    elif tag == ZLIB:
+        body = zlib.decompress(body)
+    return body.decode("utf-8")
+
+
+class ConversationStore:
+    """Append-only conversation log per session, with TTL eviction"""
+    
+    # Evict idle sessions once per this many appends
+    EVICT_EVERY = 1000
+    
+    def __init__(self, path=None, ttl_days=None):
+        self.path = path or settings.CONVERSATION_DB_PATH
+        self.ttl = (ttl_days if ttl_days is not None else settings.CONVERSATION_TTL_DAYS) * 86400
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._conn()
+        # WAL lets every Streamlit / API worker read while one of them appends
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Bounded page cache (KiB), whatever the number of sessions on disk
+            conn.execute("PRAGMA cache_size=-2048")
+            self._local.conn = conn
+        return conn
+    
+    def append(self, session_id, role, text, language=None, trace_id=None):
+        """
+        Append one turn to a session's log, creating the session if needed.
+        
+        Args:
+            session_id (str): Session id
+            role (str): "user" or "assistant"
+            text (str): Message text
+            language (str): Language of the text, e.g. "Hindi"
+            trace_id (str): Hex id tying the turn to request logs; generated if None
+        
+        Returns:
+            int: Sequence number of the turn within the session
+        """
+        now = time.time()
+        trace = uuid.UUID(hex=trace_id) if trace_id else uuid.uuid4()
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, so two workers never claim one seq
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO sessions (id, created_at, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO NOTHING",
+                (session_id, now, now)
+            )
+            seq = conn.execute("SELECT turns FROM sessions WHERE id = ?", (session_id,)).fetchone()[0]
+            conn.execute(
+                "INSERT INTO turns (session_id, seq, role, language, created_at, trace_id, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, seq, ROLES.index(role), language, now, trace.bytes, encode_text(text))
+            )
+            conn.execute(
+                "UPDATE sessions SET turns = turns + 1, updated_at = ? WHERE id = ?", (now, session_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+        return seq
+    
+    def count(self, session_id):
+        """Number of turns in a session, 0 for unknown or evicted sessions"""
+        row = self._conn().execute(
+            "SELECT turns FROM sessions WHERE id = ? AND updated_at > ?", (session_id, time.time() - self.ttl)
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def page(self, session_id, limit, before=None):
+        """
+        One page of a session's turns, read lazily from disk.
+        
+        Args:
+            session_id (str): Session id
+            limit (int): Maximum number of turns
+            before (int): Only turns with seq below this; None for the newest
+        
+        Returns:
+            list: Turn dicts ("seq", "role", "content", "language", "ts",
+            "trace_id"), oldest first
+        """
+        rows = self._conn().execute(
+            "SELECT seq, role, language, created_at, trace_id, text FROM turns "
+            "WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+            (session_id, before if before is not None else 2 ** 62, limit)
+        ).fetchall()
+        return [
+            {
+                "seq": seq,
+                "role": ROLES[role],
+                "content": decode_text(text),
+                "language": language,
+                "ts": created_at,
+                "trace_id": uuid.UUID(bytes=bytes(trace)).hex if trace else None,
+            }
+            for seq, role, language, created_at, trace, text in reversed(rows)
+        ]
+    
+    def frequent_questions(self, since, limit=100, scan=50000, exclude_language="English"):
+        """
+        Most asked user questions since a time, e.g. to pre-translate them.
+        
+        Args:
+            since (float): Timestamp lower bound
+            limit (int): Questions to return
+            scan (int): Most recent user turns to look at
+            exclude_language (str): Language to leave out
+        
+        Returns:
+            list: (text, language, count) tuples, most frequent first
+        """
+        rows = self._conn().execute(
+            "SELECT language, text FROM turns WHERE created_at > ? AND role = 0 "
+            "AND COALESCE(language, '') != ? ORDER BY created_at DESC LIMIT ?",
+            (since, exclude_language, scan)
+        )
+        counts = Counter()
+        for language, text in rows:
+            counts[(" ".join(decode_text(text).split()), language)] += 1
+        return [(text, language, count) for (text, language), count in counts.most_common(limit)]
+    
+    def get_state(self, session_id):
+        """Pipeline (history, summary) saved with set_state, or empty ones"""
+        row = self._conn().execute(
+            "SELECT state FROM sessions WHERE id = ? AND updated_at > ?", (session_id, time.time() - self.ttl)
+        ).fetchone()
+        if not row or row[0] is None:
+            return [], ""
+        state = json.loads(decode_text(row[0]))
+        return state["history"], state["summary"]
+    
+    def set_state(self, session_id, history, summary):
+        """Store the compacted history and summary the pipeline expects next turn"""
+        now = time.time()
+        state = encode_text(json.dumps({"history": history, "summary": summary}, ensure_ascii=False))
+        self._conn().execute(
+            "INSERT INTO sessions (id, created_at, updated_at, state) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (session_id, now, now, state)
+        )
+    
+    def delete(self, session_id):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def evict(self, now=None):
+        """
+        Delete sessions idle longer than the TTL, with their turns.
+        
+        Returns:
+            int: Number of sessions evicted
+        """
+        cutoff = (now or time.time()) - self.ttl
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM sessions WHERE updated_at <= ?", (cutoff,)
+            )]
+            conn.executemany("DELETE FROM turns WHERE session_id = ?", [(s,) for s in expired])
+            conn.execute("DELETE FROM sessions WHERE updated_at <= ?", (cutoff,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle conversations")
+        return len(expired)
+    
+    def stats(self):
+        conn = self._conn()
+        sessions, turns = conn.execute("SELECT COUNT(*), COALESCE(SUM(turns), 0) FROM sessions").fetchone()
+        return {
+            "path": self.path,
+            "sessions": sessions,
+            "turns": turns,
+            "bytes": os.path.getsize(self.path),
+            "codec": "zstd" if zstandard is not None else "zlib",
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """Get the process-wide conversation store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore()
+    return _store
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Inspect or evict the conversation store")
+    parser.add_argument("--evict", action="store_true", help="Delete sessions idle longer than the TTL")
+    args = parser.parse_args()
+    
+    store = get_conversation_store()
+    if args.evict:
+        store.evict()
+    print(json.dumps(store.stats(), indent=2))
@@ -2,6 +2,10 @@ import json
 import logging
 import numpy as np
 from pathlib import Path
+from config.constants import CROP_NUTRIENT_TARGETS, CROP_SUITABILITY_CONFIG, FERTILIZER_CONFIG
+from modules.fertilizer import NUTRIENTS
+from modules.knowledge_base import get_knowledge_base
+from modules.retrieval import HybridRetriever, build_documents
 
 logger = logging.getLogger(__name__)
 
@@ -9,56 +13,86 @@ class CropRAGSystem:
     """RAG for crop recommendations"""
     
     def __init__(self):
-        self.crops_db = self._load_crops_db()
+        self.kb = get_knowledge_base()
+        self.crops_db = self.kb.crops
+        self.retriever = HybridRetriever(build_documents(self.kb))
+        
+        # One row per crop: pH range and how much of each nutrient it draws
+        self.crop_keys = tuple(self.crops_db)
+        self.ph_range = np.array(
+            [[self.crops_db[key].ph_min, self.crops_db[key].ph_max] for key in self.crop_keys], dtype=np.float64
+        )
+        targets = np.array(
+            [[CROP_NUTRIENT_TARGETS.get(key, {}).get(n, np.nan) for n in NUTRIENTS] for key in self.crop_keys],
+            dtype=np.float64
+        )
+        # Demand relative to the hungriest crop; crops without targets get the average
+        demand = targets / np.nanmax(targets, axis=0)
+        self.demand = np.where(np.isnan(demand), np.nanmean(demand, axis=0), demand)
+        
+        ratings = FERTILIZER_CONFIG["ratings"]
+        self.low = np.array([ratings[n][0] for n in NUTRIENTS], dtype=np.float64)
+        self.high = np.array([ratings[n][1] for n in NUTRIENTS], dtype=np.float64)
+    
+    def retrieve(self, query, k=3, language=None):
+        """Knowledge base passages for a query, with per-stage timings"""
+        return self.retriever.search(query, k, language)
     
-    def _load_crops_db(self):
-        """Load crops knowledge base"""
-        db = {
-            "wheat": {
-                "name": "Wheat",
-                "season": "Rabi",
-                "temp_optimal": (15, 25),
-                "rainfall_mm": 400,
-                "yield_kg_ha": 4500,
-                "price_per_quintal": 2200
-            },
-            "rice": {
-                "name": "Rice",
-                "season": "Kharif",
-                "temp_optimal": (20, 35),
-                "rainfall_mm": 1200,
-                "yield_kg_ha": 5500,
-                "price_per_quintal": 2500
-            },
-            "cotton": {
-                "name": "Cotton",
-                "season": "Kharif",
-                "temp_optimal": (20, 30),
-                "rainfall_mm": 700,
-                "yield_kg_ha": 20,
-                "price_per_quintal": 5500
-            },
-            "soybean": {
-                "name": "Soybean",
-                "season": "Kharif",
-                "temp_optimal": (20, 30),
-                "rainfall_mm": 500,
-                "yield_kg_ha": 2000,
-                "price_per_quintal": 4200
-            }
-        }
-        return db
+    def supports_language(self, language):
+        """True when retrieval can run on the untranslated question"""
+        return self.retriever.supports_language(language)
+    
+    def suitability(self, soil_params):
+        """
+        Score every crop against a soil test.
+        
+        pH inside a crop's range scores fully and fades out within the
+        configured tolerance; N/P/K shortfalls count in proportion to how
+        much of that nutrient the crop needs.
+        
+        Args:
+            soil_params (dict): "N", "P", "K" in kg/ha and "pH"; missing values count as medium
+        
+        Returns:
+            np.ndarray: Suitability 0-100 per crop, in crop_keys order
+        """
+        config = CROP_SUITABILITY_CONFIG
+        ph = soil_params.get("pH")
+        if ph is None:
+            ph_fit = np.ones(len(self.crop_keys))
+        else:
+            outside = np.maximum(self.ph_range[:, 0] - ph, 0.0) + np.maximum(ph - self.ph_range[:, 1], 0.0)
+            ph_fit = np.clip(1.0 - outside / config["ph_tolerance"], 0.0, 1.0)
+        
+        soil = np.array([soil_params.get(n, np.nan) for n in NUTRIENTS], dtype=np.float64)
+        fertility = np.clip((soil - self.low) / (self.high - self.low), 0.0, 1.0)
+        fertility = np.where(np.isnan(fertility), 0.5, fertility)
+        shortfall = (self.demand * (1.0 - fertility)).sum(axis=1) / self.demand.sum(axis=1)
+        
+        weights = config["weights"]
+        score = weights["pH"] * ph_fit + weights["nutrients"] * (1.0 - shortfall)
+        return np.round(100.0 * score / (weights["pH"] + weights["nutrients"]))
     
     def get_recommendations(self, soil_params):
-        """Get crop recommendations"""
+        """
+        Crops ranked by how well they suit a soil test.
+        
+        Args:
+            soil_params (dict): "N", "P", "K" in kg/ha and "pH"
+        
+        Returns:
+            list: Top 5 dicts with "crop", "suitability" (0-100), "yield" and "price"
+        """
+        scores = self.suitability(soil_params)
         recommendations = []
         
-        for crop_name, crop_data in self.crops_db.items():
+        for key, score in zip(self.crop_keys, scores.tolist()):
+            crop_data = self.crops_db[key]
             recommendations.append({
-                "crop": crop_data["name"],
-                "suitability": 85,
-                "yield": crop_data["yield_kg_ha"],
-                "price": crop_data["price_per_quintal"]
+                "crop": crop_data.name,
+                "suitability": int(score),
+                "yield": crop_data.yield_kg_ha,
+                "price": crop_data.price_per_quintal
             })
         
         return sorted(recommendations, key=lambda x: x["suitability"], reverse=True)[:5]
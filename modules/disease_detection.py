@@ -15,16 +15,27 @@ class DiseaseDetector:
     
     def __init__(self):
         self.model = None
+        self.symptom_search = None
     
-    def detect(self, image):
+    def search_symptoms(self, description, crop=None, k=3):
+        """Rank diseases from a text description; cheap pre-filter before the image model"""
+        if self.symptom_search is None:
+            from modules.symptom_search import SymptomSearch
+            self.symptom_search = SymptomSearch()
+        return self.symptom_search.search(description, crop, k)
+    
+    def detect(self, image, description=None, crop=None):
         """Detect disease from image"""
         try:
             # Placeholder - implement actual model loading
-            return {
+            result = {
                 "disease": "Powdery Mildew",
                 "confidence": 0.94,
                 "recommendation": "Use Sulfur dust spray"
             }
+            if description:
+                result["text_candidates"] = self.search_symptoms(description, crop)
+            return result
         except Exception as e:
             logger.error(f"Disease detection error: {e}")
             return {"error": str(e)}
@@ -0,0 +1,129 @@
+import logging
+import numpy as np
+from modules.knowledge_base import DISEASE_CONDITION_FIELDS, get_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# How far outside a favourable range the risk fades to zero
+TEMPERATURE_MARGIN_C = 5.0
+HUMIDITY_MARGIN_PCT = 15.0
+
+RISK_LEVELS = ((0.7, "High"), (0.4, "Medium"), (0.0, "Low"))
+
+
+def risk_level(score):
+    """Map a 0-1 risk score to High / Medium / Low"""
+    for threshold, level in RISK_LEVELS:
+        if score >= threshold:
+            return level
+    return "Low"
+
+
+class DiseaseRiskEngine:
+    """Vectorized disease risk from weather against conditions_favorable ranges"""
+    
+    def __init__(self, kb=None):
+        self.kb = kb or get_knowledge_base()
+        self.disease_keys = self.kb.disease_keys
+        
+        bounds = np.asarray(self.kb.columns["disease_conditions"], dtype=np.float64)
+        field = {name: i for i, name in enumerate(DISEASE_CONDITION_FIELDS)}
+        self.temp_lo = bounds[:, field["temperature_min"]]
+        self.temp_hi = bounds[:, field["temperature_max"]]
+        self.hum_lo = bounds[:, field["humidity_min"]]
+        self.hum_hi = bounds[:, field["humidity_max"]]
+        # Diseases without complete ranges are never scored
+        self.scorable = ~np.isnan(bounds).any(axis=1)
+        
+        # crop x disease host mask
+        crops = set(self.kb.crops)
+        for disease in self.kb.diseases.values():
+            crops.update(disease.affected_crops or ())
+        self.crop_keys = tuple(sorted(crops))
+        self.crop_index = {key: i for i, key in enumerate(self.crop_keys)}
+        self.host_mask = np.zeros((len(self.crop_keys), len(self.disease_keys)), dtype=bool)
+        for d, key in enumerate(self.disease_keys):
+            for crop in self.kb.diseases[key].affected_crops or ():
+                self.host_mask[self.crop_index[crop], d] = True
+    
+    def score(self, temperatures, humidities):
+        """
+        Weather-only risk for every snapshot and disease.
+        
+        Args:
+            temperatures (array-like): (W,) temperatures in °C
+            humidities (array-like): (W,) relative humidity in %
+        
+        Returns:
+            np.ndarray: (W, D) scores in [0, 1]
+        """
+        temps = np.asarray(temperatures, dtype=np.float64)[:, None]
+        hums = np.asarray(humidities, dtype=np.float64)[:, None]
+        temp_fit = self._fit(temps, self.temp_lo, self.temp_hi, TEMPERATURE_MARGIN_C)
+        hum_fit = self._fit(hums, self.hum_lo, self.hum_hi, HUMIDITY_MARGIN_PCT)
+        return np.where(self.scorable, temp_fit * hum_fit, 0.0)
+    
+    def score_pairs(self, temperatures, humidities, crops):
+        """
+        Risk for every (weather snapshot x crop x disease) in one pass.
+        
+        Returns:
+            np.ndarray: (W, C, D) scores, zero where the crop is not a host
+        """
+        rows = [self.crop_index.get(str(crop).lower()) for crop in crops]
+        mask = np.stack([
+            self.host_mask[r] if r is not None else np.zeros(len(self.disease_keys), dtype=bool)
+            for r in rows
+        ]) if rows else np.zeros((0, len(self.disease_keys)), dtype=bool)
+        return self.score(temperatures, humidities)[:, None, :] * mask[None, :, :]
+    
+    def risk_table(self, weather_by_location, crops=None, min_score=0.4):
+        """
+        Per-location risk table for every cached weather snapshot.
+        
+        Args:
+            weather_by_location (dict): location -> weather dict with temp and humidity
+            crops (list): Crop keys to evaluate, defaults to every known host crop
+            min_score (float): Rows below this score are dropped
+        
+        Returns:
+            list: Rows {"location", "crop", "disease", "risk", "level"}, highest risk first
+        """
+        valid = {
+            loc: w for loc, w in weather_by_location.items()
+            if w and "error" not in w and w.get("temp") is not None and w.get("humidity") is not None
+        }
+        if not valid:
+            return []
+        
+        locations = list(valid)
+        crops = list(crops) if crops else list(self.crop_keys)
+        scores = self.score_pairs(
+            [valid[loc]["temp"] for loc in locations],
+            [valid[loc]["humidity"] for loc in locations],
+            crops
+        )
+        
+        rows = []
+        for w, c, d in zip(*np.nonzero(scores >= min_score)):
+            risk = float(scores[w, c, d])
+            rows.append({
+                "location": locations[w],
+                "crop": crops[c],
+                "disease": self.kb.diseases[self.disease_keys[d]].name,
+                "risk": round(risk, 2),
+                "level": risk_level(risk),
+            })
+        return sorted(rows, key=lambda row: row["risk"], reverse=True)
+    
+    def for_weather(self, weather, crop, min_score=0.4):
+        """Risk rows for one farmer's weather and crop"""
+        if not weather or "error" in weather:
+            return []
+        return self.risk_table({weather.get("location", ""): weather}, [crop.lower()], min_score)
+    
+    @staticmethod
+    def _fit(values, lo, hi, margin):
+        # 1 inside [lo, hi], fading linearly to 0 at margin outside it
+        distance = np.maximum(lo - values, 0.0) + np.maximum(values - hi, 0.0)
+        return np.clip(1.0 - distance / margin, 0.0, 1.0)
@@ -0,0 +1,151 @@
+import logging
+import numpy as np
+from config.constants import CROP_NUTRIENT_TARGETS, FERTILIZER_CONFIG, FERTILIZER_PRODUCTS
+from modules.knowledge_base import get_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# Doses are N, P2O5 and K2O in kg/ha throughout
+NUTRIENTS = ("N", "P", "K")
+
+
+class FertilizerCalculator:
+    """Vectorized nutrient gap and product dosage from crop targets and soil tests"""
+    
+    def __init__(self, products=FERTILIZER_PRODUCTS, targets=CROP_NUTRIENT_TARGETS, config=FERTILIZER_CONFIG, kb=None):
+        self.kb = kb or get_knowledge_base()
+        self.config = config
+        self.products = products
+        
+        self.crop_keys = tuple(targets)
+        self.crop_index = {key: i for i, key in enumerate(self.crop_keys)}
+        self.targets = np.array([[targets[key][n] for n in NUTRIENTS] for key in self.crop_keys], dtype=np.float64)
+        
+        # Fraction of each nutrient per kg of product, and rupees per kg
+        self.content = {
+            key: np.array([product[n] for n in NUTRIENTS], dtype=np.float64) / 100.0
+            for key, product in products.items()
+        }
+        self.price_per_kg = {key: product["price_per_bag"] / product["bag_kg"] for key, product in products.items()}
+        
+        ratings = config["ratings"]
+        self.low = np.array([ratings[n][0] for n in NUTRIENTS], dtype=np.float64)
+        self.high = np.array([ratings[n][1] for n in NUTRIENTS], dtype=np.float64)
+    
+    def crop_rows(self, crops):
+        """Target row per crop name, -1 for crops without targets"""
+        # Rosters repeat a handful of crops; resolve each distinct name once
+        names, inverse = np.unique(np.asarray(crops, dtype=str), return_inverse=True)
+        resolved = np.full(len(names), -1, dtype=np.int64)
+        for i, name in enumerate(names.tolist()):
+            key = name.strip().lower()
+            if key not in self.crop_index:
+                record = self.kb.crop(name) if key else None
+                key = record.key if record else key
+            resolved[i] = self.crop_index.get(key, -1)
+        return resolved[inverse.reshape(-1)]
+    
+    def requirements(self, crops, soil=None):
+        """
+        Soil-test adjusted nutrient needs.
+        
+        Args:
+            crops (list): F crop names
+            soil (array-like): (F, 3) available N, P, K in kg/ha, NaN where not tested
+        
+        Returns:
+            np.ndarray: (F, 3) N, P2O5, K2O needs in kg/ha, NaN rows for unknown crops
+        """
+        rows = self.crop_rows(crops)
+        need = np.where((rows >= 0)[:, None], self.targets[np.maximum(rows, 0)], np.nan)
+        if soil is not None:
+            soil = np.asarray(soil, dtype=np.float64).reshape(len(rows), len(NUTRIENTS))
+            low_factor, high_factor = self.config["adjustment"]
+            # Linear from the low-fertility to the high-fertility multiplier, flat outside
+            position = np.clip((soil - self.low) / (self.high - self.low), 0.0, 1.0)
+            factor = low_factor + position * (high_factor - low_factor)
+            need = need * np.where(np.isnan(soil), 1.0, factor)
+        return need
+    
+    def doses(self, crops, soil=None, area_ha=1.0):
+        """
+        Product quantities and costs for any number of farmers at once.
+        
+        Args:
+            crops (list): F crop names
+            soil (array-like): (F, 3) available N, P, K in kg/ha, NaN where not tested
+            area_ha (float | array-like): Area per farmer in hectares
+        
+        Returns:
+            dict: "need" and "supplied" (F, 3) kg/ha, "kg" and "cost" per
+            product (F,) for the area, and "total_cost" (F,)
+        """
+        need = self.requirements(crops, soil)
+        remaining = np.nan_to_num(need)
+        supplied = np.zeros_like(remaining)
+        per_ha = {}
+        
+        # Phosphorus and potassium sources first; the N product tops up what they leave
+        for nutrient in ("P", "K", "N"):
+            key = self.config["mix"][nutrient]
+            content = self.content[key]
+            kg = np.maximum(remaining[:, NUTRIENTS.index(nutrient)], 0.0) / content[NUTRIENTS.index(nutrient)]
+            delivered = kg[:, None] * content
+            per_ha[key] = per_ha.get(key, 0.0) + kg
+            supplied += delivered
+            remaining -= delivered
+        
+        area = np.broadcast_to(np.asarray(area_ha, dtype=np.float64), (len(need),))
+        kg = {key: per_ha[key] * area for key in per_ha}
+        cost = {key: kg[key] * self.price_per_kg[key] for key in kg}
+        return {
+            "need": need,
+            "supplied": supplied,
+            "kg": kg,
+            "cost": cost,
+            "total_cost": sum(cost.values()),
+            "area_ha": area,
+        }
+    
+    def plan(self, doses, i):
+        """One farmer's row of a doses() result as a readable plan, None for unknown crops"""
+        if np.isnan(doses["need"][i]).any():
+            return None
+        products = []
+        for key, kg in doses["kg"].items():
+            if kg[i] > 0.5:
+                product = self.products[key]
+                products.append({
+                    "product": product["name"],
+                    "kg": round(float(kg[i])),
+                    "bags": round(float(kg[i]) / product["bag_kg"], 1),
+                    "cost": round(float(doses["cost"][key][i])),
+                })
+        return {
+            "area_ha": float(doses["area_ha"][i]),
+            "need": {n: round(float(v)) for n, v in zip(NUTRIENTS, doses["need"][i])},
+            "products": products,
+            "total_cost": round(float(doses["total_cost"][i])),
+        }
+    
+    def recommend(self, crop, soil=None, area_ha=1.0):
+        """
+        Fertilizer plan for one farmer.
+        
+        Args:
+            crop (str): Crop name
+            soil (dict): Measured "N", "P", "K" in kg/ha, e.g. a SoilStore.lookup() result
+            area_ha (float): Field area in hectares
+        
+        Returns:
+            dict: {"crop", "area_ha", "need", "products", "total_cost"}, or None
+            when the crop has no nutrient targets
+        """
+        measured = None
+        if soil:
+            measured = [[soil.get(n, np.nan) for n in NUTRIENTS]]
+        plan = self.plan(self.doses([crop], measured, area_ha), 0)
+        if plan is not None:
+            plan["crop"] = crop
+            plan["soil_tested"] = bool(soil)
+        return plan
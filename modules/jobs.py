@@ -0,0 +1,88 @@
+"""
+Periodic jobs run by modules.scheduler.
+
+Each job takes the result of its previous successful run (None the first
+time) and returns a JSON-serializable result, which the scheduler persists.
+"""
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from config.constants import CROP_DATA, MANDIS, SCHEDULER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SOIL_EXPORT_PATTERNS = ("*.csv", "*.xlsx")
+
+
+def weather_refresh(last_result=None):
+    """Re-fetch weather for every mandi district before the cached readings expire"""
+    from modules.weather import WeatherAPI
+    weather_api = WeatherAPI(settings.OPENWEATHER_API_KEY)
+    # The sidebar asks for "District, State", so warm that spelling
+    places = sorted({f"{m['district']}, {m['state']}" for m in MANDIS.values()})
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        readings = list(pool.map(weather_api.refresh, places))
+    failed = [place for place, reading in zip(places, readings) if "error" in reading]
+    return {"places": len(places), "failed": failed}
+
+
+def market_ingest(last_result=None):
+    """Scrape fresh mandi prices for every knowledge-base crop"""
+    from modules.market import MarketAPI
+    market = MarketAPI()
+    rows = {crop: len(market.refresh(crop)) for crop in CROP_DATA}
+    return {"crops": len(rows), "empty": [crop for crop, count in rows.items() if not count]}
+
+
+def translation_warmup(last_result=None):
+    """Pre-translate the questions farmers asked most this week into the translation cache"""
+    from modules.conversation_store import get_conversation_store
+    from nlp.translator import MultilingualProcessor
+    translator = MultilingualProcessor(settings.DEEPL_API_KEY)
+    if translator.translator is None:
+        return {"translated": 0, "skipped": "no DeepL key"}
+    
+    since = time.time() - SCHEDULER_CONFIG["warmup_days"] * 86400
+    questions = get_conversation_store().frequent_questions(since, SCHEDULER_CONFIG["warmup_questions"])
+    for text, language, _ in questions:
+        # Already-cached questions return from the cache without a DeepL call
+        translator.translate_to_english(text, language)
+    return {"translated": len(questions)}
+
+
+def kb_snapshot(last_result=None):
+    """Rebuild the knowledge base snapshot when its sources changed"""
+    from modules.kb_snapshot import build_snapshot, is_current
+    # The snapshot records its own source fingerprints; a fresh scheduler
+    # host must not rebuild a current snapshot under live readers
+    if is_current():
+        return {"rebuilt": False}
+    build_snapshot()
+    return {"rebuilt": True}
+
+
+def soil_ingest(last_result=None):
+    """Rebuild the soil store from the Soil Health Card inbox when its files changed"""
+    from modules.kb_snapshot import fingerprint
+    from modules.soil_health import ingest
+    paths = sorted(
+        path
+        for pattern in SOIL_EXPORT_PATTERNS
+        for path in glob.glob(os.path.join(settings.SOIL_HEALTH_INBOX_DIR, pattern))
+    )
+    if not paths:
+        return {"files": 0, "rebuilt": False}
+    sources = fingerprint(paths)
+    if last_result and last_result.get("sources") == sources and os.path.exists(settings.SOIL_STORE_DIR):
+        return dict(last_result, rebuilt=False)
+    manifest = ingest(paths)
+    return {"files": len(paths), "sources": sources, "keys": manifest["keys"], "rebuilt": True}
+
+
+def conversation_evict(last_result=None):
+    """Drop conversations idle past their TTL"""
+    from modules.conversation_store import get_conversation_store
+    return {"evicted": get_conversation_store().evict()}
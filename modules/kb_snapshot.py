@@ -0,0 +1,204 @@
+"""
+Versioned binary snapshot of the knowledge base.
+
+Build after editing data/*.json or config/constants.py:
+    
+    python -m modules.kb_snapshot
+
+The snapshot directory holds records.msgpack (records plus a manifest of
+source fingerprints) and one .npy file per numeric column, memory-mapped on
+load. A snapshot whose fingerprints no longer match is ignored and the JSON
+sources are parsed instead.
+"""
+import argparse
+import logging
+import os
+import shutil
+import numpy as np
+from config import settings
+from modules.knowledge_base import KnowledgeBase, build_columns, load_sources
+
+try:
+    import msgpack
+except ImportError:  # snapshot support is optional
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+RECORDS_FILE = "records.msgpack"
+
+# Required fields and accepted types per record kind
+SCHEMA = {
+    "crops": {
+        "name": str,
+        "season": str,
+        "temp_min": (int, float),
+        "temp_max": (int, float),
+        "rainfall_mm": (int, float),
+        "yield_kg_ha": (int, float),
+        "price_per_quintal": (int, float),
+    },
+    "diseases": {
+        "name": str,
+        "description": str,
+        "affected_crops": list,
+        "symptoms": list,
+        "treatment": list,
+        "prevention": list,
+    },
+    "soils": {
+        "name": str,
+        "suitable_crops": list,
+        "ph_range": (list, tuple),
+    },
+}
+
+
+def source_paths():
+    """Files whose changes make a snapshot stale"""
+    import config.constants
+    return [settings.CROPS_KB_PATH, settings.DISEASES_DB_PATH, config.constants.__file__]
+
+
+def fingerprint(paths):
+    """(path, size, mtime_ns) for every existing source file"""
+    prints = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            prints.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return prints
+
+
+def validate_sources(sources):
+    """
+    Check merged sources against SCHEMA.
+    
+    Raises:
+        ValueError: Listing every missing or mistyped field
+    """
+    errors = []
+    for kind, fields in SCHEMA.items():
+        for key, record in sources[kind].items():
+            for field, expected in fields.items():
+                value = record.get(field)
+                if value is None:
+                    errors.append(f"{kind}.{key}: missing '{field}'")
+                elif not isinstance(value, expected) or isinstance(value, bool):
+                    errors.append(f"{kind}.{key}: '{field}' has type {type(value).__name__}")
+    
+    for key, disease in sources["diseases"].items():
+        conditions = disease.get("conditions_favorable") or {}
+        for low, high in (("temperature_min", "temperature_max"), ("humidity_min", "humidity_max")):
+            if low in conditions and high in conditions and conditions[low] > conditions[high]:
+                errors.append(f"diseases.{key}: {low} > {high}")
+    
+    if errors:
+        raise ValueError("Knowledge base validation failed:\n  " + "\n  ".join(errors))
+
+
+def build_snapshot(output_dir=None):
+    """
+    Validate the sources and write a snapshot.
+    
+    Args:
+        output_dir (str): Snapshot directory, defaults to settings.KB_SNAPSHOT_DIR
+    
+    Returns:
+        str: Path of the written snapshot directory
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack is required to build a knowledge base snapshot")
+    
+    output_dir = output_dir or settings.KB_SNAPSHOT_DIR
+    sources = load_sources()
+    validate_sources(sources)
+    columns = build_columns(sources)
+    
+    # Readers memory-map the columns, so never rewrite them in place: build a
+    # staging directory and swap it in whole. Unlinked files stay valid for
+    # processes that still map them.
+    staging = output_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in columns.items():
+        np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+    
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "sources": fingerprint(source_paths()),
+        "columns": sorted(columns),
+        "records": sources,
+    }
+    with open(os.path.join(staging, RECORDS_FILE), "wb") as f:
+        f.write(msgpack.packb(payload, use_bin_type=True))
+    
+    previous = output_dir.rstrip(os.sep) + ".old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, previous)
+    os.replace(staging, output_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    
+    logger.info(f"Knowledge base snapshot written to {output_dir}")
+    return output_dir
+
+
+def is_current(snapshot_dir=None):
+    """True when a snapshot exists and was built from the current sources"""
+    records_path = os.path.join(snapshot_dir or settings.KB_SNAPSHOT_DIR, RECORDS_FILE)
+    if msgpack is None or not os.path.exists(records_path):
+        return False
+    try:
+        with open(records_path, "rb") as f:
+            payload = msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+    except Exception as e:
+        logger.warning(f"Could not read knowledge base snapshot: {e}")
+        return False
+    return payload.get("version") == SNAPSHOT_VERSION and payload.get("sources") == fingerprint(source_paths())
+
+
+def load_snapshot(snapshot_dir=None):
+    """
+    Load the snapshot if it is present, current and readable.
+    
+    Args:
+        snapshot_dir (str): Snapshot directory, defaults to settings.KB_SNAPSHOT_DIR
+    
+    Returns:
+        KnowledgeBase: Loaded knowledge base, or None to fall back to JSON
+    """
+    snapshot_dir = snapshot_dir or settings.KB_SNAPSHOT_DIR
+    records_path = os.path.join(snapshot_dir, RECORDS_FILE)
+    if msgpack is None or not os.path.exists(records_path):
+        return None
+    
+    try:
+        with open(records_path, "rb") as f:
+            payload = msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+        
+        if payload.get("version") != SNAPSHOT_VERSION:
+            logger.info("Knowledge base snapshot has an old version, using JSON sources")
+            return None
+        if payload.get("sources") != fingerprint(source_paths()):
+            logger.info("Knowledge base snapshot is stale, using JSON sources")
+            return None
+        
+        columns = {
+            name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r")
+            for name in payload["columns"]
+        }
+        return KnowledgeBase(payload["records"], columns=columns)
+    except Exception as e:
+        logger.warning(f"Could not load knowledge base snapshot: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the knowledge base snapshot")
+    parser.add_argument("--output", help="Snapshot directory", default=None)
+    args = parser.parse_args()
+    build_snapshot(args.output)
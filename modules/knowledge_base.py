@@ -0,0 +1,264 @@
+import json
+import logging
+import threading
+from types import MappingProxyType
+import numpy as np
+from config import settings
+from config.constants import CROP_ALIASES, CROP_DATA, DISEASES, SOIL_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns kept as NumPy arrays alongside the records
+CROP_NUMERIC_FIELDS = (
+    "temp_min", "temp_max", "rainfall_mm", "ph_min", "ph_max",
+    "yield_kg_ha", "price_per_quintal", "duration_days",
+)
+DISEASE_CONDITION_FIELDS = ("temperature_min", "temperature_max", "humidity_min", "humidity_max")
+
+
+def normalize_name(name):
+    """Canonical lookup form: lowercase words separated by single spaces"""
+    return " ".join(str(name).lower().replace("_", " ").split())
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class _Record:
+    """Immutable slotted record; unknown source fields are ignored"""
+    
+    __slots__ = ("_view",)
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, _freeze(fields.get(name)))
+        view = {name: getattr(self, name) for name in self.__slots__}
+        object.__setattr__(self, "_view", MappingProxyType(view))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+    
+    def as_dict(self):
+        """Read-only mapping view for dict-style callers"""
+        return self._view
+    
+    def to_dict(self):
+        """Plain mutable copy, lists and dicts all the way down"""
+        return _thaw(self._view)
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.key!r})"
+
+
+class CropRecord(_Record):
+    __slots__ = (
+        "key", "name", "scientific_name", "hindi_name", "season", "duration_days",
+        "temp_min", "temp_max", "rainfall_mm", "ph_min", "ph_max", "yield_kg_ha",
+        "price_per_quintal", "water_requirement_mm", "aliases",
+    )
+
+
+class DiseaseRecord(_Record):
+    __slots__ = (
+        "key", "id", "name", "hindi_name", "scientific_name", "description", "severity",
+        "affected_crops", "symptoms", "conditions_favorable", "treatment", "prevention",
+        "organic_methods", "chemical_methods", "cost_estimate", "loss_if_untreated",
+    )
+
+
+class SoilRecord(_Record):
+    __slots__ = (
+        "key", "name", "hindi_name", "characteristics", "suitable_crops", "ph_range",
+        "drainage", "water_holding",
+    )
+
+
+def load_sources(crops_path=None, diseases_path=None):
+    """
+    Merge config/constants.py with the JSON knowledge base files.
+    
+    JSON entries win field-by-field for diseases (they carry conditions,
+    chemicals and costs); constants win for crops.
+    
+    Returns:
+        dict: {"crops": {...}, "diseases": {...}, "soils": {...}}
+    """
+    crops_json = _read_json(crops_path or settings.CROPS_KB_PATH).get("crops", {})
+    diseases_json = _read_json(diseases_path or settings.DISEASES_DB_PATH)
+    
+    crops = {}
+    for key in {**crops_json, **CROP_DATA}:
+        raw = crops_json.get(key, {})
+        merged = {
+            "name": raw.get("name"),
+            "scientific_name": raw.get("scientific_name"),
+            "season": raw.get("season"),
+            "duration_days": raw.get("duration_days"),
+            "temp_min": (raw.get("temperature_optimal") or [None, None])[0],
+            "temp_max": (raw.get("temperature_optimal") or [None, None])[1],
+            "rainfall_mm": raw.get("rainfall_required_mm"),
+            "ph_min": (raw.get("soil_ph") or [None, None])[0],
+            "ph_max": (raw.get("soil_ph") or [None, None])[1],
+            "yield_kg_ha": raw.get("expected_yield_kg_per_ha"),
+            "price_per_quintal": raw.get("price_per_quintal"),
+        }
+        merged.update(CROP_DATA.get(key, {}))
+        merged["aliases"] = list(CROP_ALIASES.get(key, []))
+        crops[key] = merged
+    
+    diseases = {}
+    for key in {**DISEASES, **diseases_json}:
+        diseases[key] = {**DISEASES.get(key, {}), **diseases_json.get(key, {})}
+    
+    soils = {key: dict(value) for key, value in SOIL_TYPES.items()}
+    
+    return {"crops": crops, "diseases": diseases, "soils": soils}
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"Knowledge base file not found: {path}")
+        return {}
+
+
+def build_columns(sources):
+    """
+    Numeric columns for vectorized callers, NaN where a value is missing.
+    
+    Returns:
+        dict: {"crop_numeric": (C, len(CROP_NUMERIC_FIELDS)),
+               "disease_conditions": (D, len(DISEASE_CONDITION_FIELDS))}
+    """
+    def number(value):
+        return np.nan if value is None else float(value)
+    
+    crop_rows = [
+        [number(crop.get(field)) for field in CROP_NUMERIC_FIELDS]
+        for crop in sources["crops"].values()
+    ]
+    disease_rows = [
+        [number((disease.get("conditions_favorable") or {}).get(field)) for field in DISEASE_CONDITION_FIELDS]
+        for disease in sources["diseases"].values()
+    ]
+    return {
+        "crop_numeric": np.array(crop_rows, dtype=np.float64).reshape(-1, len(CROP_NUMERIC_FIELDS)),
+        "disease_conditions": np.array(disease_rows, dtype=np.float64).reshape(-1, len(DISEASE_CONDITION_FIELDS)),
+    }
+
+
+class KnowledgeBase:
+    """Crops, diseases and soils as frozen records with secondary indexes"""
+    
+    def __init__(self, sources, columns=None):
+        self.crops = {k: CropRecord(key=k, **v) for k, v in sources["crops"].items()}
+        self.diseases = {k: DiseaseRecord(key=k, **v) for k, v in sources["diseases"].items()}
+        self.soils = {k: SoilRecord(key=k, **v) for k, v in sources["soils"].items()}
+        
+        # Row i of each column array belongs to the i-th crop / disease key
+        self.crop_keys = tuple(self.crops)
+        self.disease_keys = tuple(self.diseases)
+        self.columns = columns if columns is not None else build_columns(sources)
+        
+        # Secondary indexes
+        self.crops_by_soil = {}
+        self.crops_by_season = {}
+        self.diseases_by_crop = {}
+        self.aliases = {}
+        
+        for soil in self.soils.values():
+            self.crops_by_soil[soil.key] = soil.suitable_crops or ()
+        for crop in self.crops.values():
+            if crop.season:
+                season = crop.season.lower()
+                self.crops_by_season[season] = self.crops_by_season.get(season, ()) + (crop.key,)
+        for disease in self.diseases.values():
+            for crop_key in disease.affected_crops or ():
+                self.diseases_by_crop[crop_key] = self.diseases_by_crop.get(crop_key, ()) + (disease.key,)
+        
+        # Name, Hindi name and alias lookup; earlier kinds win on collisions
+        for kind, records in (("crop", self.crops), ("disease", self.diseases), ("soil", self.soils)):
+            for record in records.values():
+                names = [record.key, record.name, record.hindi_name]
+                names += list(getattr(record, "aliases", None) or ())
+                for name in names:
+                    if name:
+                        self.aliases.setdefault((kind, normalize_name(name)), record.key)
+        
+        logger.info(
+            f"Knowledge base loaded: {len(self.crops)} crops, "
+            f"{len(self.diseases)} diseases, {len(self.soils)} soils"
+        )
+    
+    def _get(self, kind, records, name):
+        if not name:
+            return None
+        key = self.aliases.get((kind, normalize_name(name)))
+        return records.get(key) if key else None
+    
+    def crop(self, name):
+        """Crop by key, English name, Hindi name or alias"""
+        return self._get("crop", self.crops, name)
+    
+    def disease(self, name):
+        """Disease by key, English name or Hindi name"""
+        return self._get("disease", self.diseases, name)
+    
+    def soil(self, name):
+        """Soil type by key, English name or Hindi name"""
+        return self._get("soil", self.soils, name)
+    
+    def crops_for_soil(self, soil_name):
+        """Crop keys suited to a soil type"""
+        soil = self.soil(soil_name)
+        return self.crops_by_soil.get(soil.key, ()) if soil else ()
+    
+    def crops_for_season(self, season):
+        """Crop keys grown in a season"""
+        return self.crops_by_season.get(str(season).lower(), ())
+    
+    def diseases_for_crop(self, crop_name):
+        """Disease keys affecting a crop"""
+        crop = self.crop(crop_name)
+        key = crop.key if crop else normalize_name(crop_name)
+        return self.diseases_by_crop.get(key, ())
+
+
+_kb = None
+_kb_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """
+    Process-wide knowledge base, loaded once on first use.
+    
+    The binary snapshot is used when it is current; otherwise the JSON
+    sources are parsed.
+    
+    Returns:
+        KnowledgeBase: Shared instance
+    """
+    global _kb
+    if _kb is None:
+        with _kb_lock:
+            if _kb is None:
+                from modules.kb_snapshot import load_snapshot
+                _kb = load_snapshot()
+                if _kb is None:
+                    _kb = KnowledgeBase(load_sources())
+    return _kb
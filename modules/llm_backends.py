@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import threading
+from config import settings
+from config.constants import LLM_CONFIG
+from utils.threads import pin_torch_threads
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackend:
+    """Common interface for text generation backends"""
+    
+    name = "base"
+    
+    def generate(self, prompt, max_new_tokens, temperature, top_p):
+        """Return the full completion for a prompt"""
+        return "".join(self.stream(prompt, max_new_tokens, temperature, top_p))
+    
+    def stream(self, prompt, max_new_tokens, temperature, top_p, stop=None):
+        """
+        Yield the completion in chunks as they are produced.
+        
+        Setting the stop event, or closing the generator, ends generation
+        as soon as the backend can notice it.
+        """
+        yield self.generate(prompt, max_new_tokens, temperature, top_p)
+
+
+class HFInferenceBackend(LLMBackend):
+    """HuggingFace hosted Inference API"""
+    
+    name = "hf"
+    
+    def __init__(self, hf_token, model):
+        from huggingface_hub import InferenceClient
+        self.client = InferenceClient(model=model, token=hf_token)
+    
+    def generate(self, prompt, max_new_tokens, temperature, top_p):
+        return self.client.text_generation(
+            prompt,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p
+        )
+    
+    def stream(self, prompt, max_new_tokens, temperature, top_p, stop=None):
+        tokens = self.client.text_generation(
+            prompt,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stream=True
+        )
+        try:
+            for token in tokens:
+                if stop is not None and stop.is_set():
+                    return
+                yield token
+        finally:
+            # Drops the HTTP stream instead of reading it to the end
+            tokens.close()
+
+
+class LocalCPUBackend(LLMBackend):
+    """Small quantized instruct model running on local CPU"""
+    
+    name = "local"
+    
+    def __init__(self, model, threads=None):
+        self.model_name = model
+        self.threads = threads
+        self._lock = threading.Lock()
+        
+        if model.endswith(".gguf"):
+            # llama.cpp bindings for GGUF quantized weights
+            from llama_cpp import Llama
+            self.engine = "llama_cpp"
+            self.llm = Llama(model_path=model, n_threads=threads, verbose=False)
+        else:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+            pin_torch_threads()
+            self.engine = "transformers"
+            self.tokenizer = AutoTokenizer.from_pretrained(model)
+            self.model = torch.quantization.quantize_dynamic(
+                AutoModelForCausalLM.from_pretrained(model).eval(),
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+    
+    def stream(self, prompt, max_new_tokens, temperature, top_p, stop=None):
+        # One generation at a time; the model already uses every CPU thread
+        with self._lock:
+            if self.engine == "llama_cpp":
+                chunks = self.llm(
+                    prompt,
+                    max_tokens=max_new_tokens,
+                    temperature=temperature,
+                    top_p=top_p,
+                    stream=True
+                )
+                try:
+                    for chunk in chunks:
+                        if stop is not None and stop.is_set():
+                            return
+                        yield chunk["choices"][0]["text"]
+                finally:
+                    # llama.cpp generates lazily; closing stops it at the next token
+                    chunks.close()
+                return
+            
+            from transformers import StoppingCriteriaList, TextIteratorStreamer
+            # generate() runs in its own thread; it checks this event after every token
+            stop = stop or threading.Event()
+            inputs = self.tokenizer(prompt, return_tensors="pt")
+            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            worker = threading.Thread(
+                target=self.model.generate,
+                kwargs=dict(
+                    **inputs,
+                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([_stop_criteria(stop)]),
+                    max_new_tokens=max_new_tokens,
+                    do_sample=temperature > 0,
+                    temperature=temperature,
+                    top_p=top_p
+                ),
+                daemon=True
+            )
+            worker.start()
+            try:
+                for text in streamer:
+                    if stop.is_set():
+                        break
+                    yield text
+            finally:
+                # A cancelled or abandoned stream must not leave generate() running
+                # once the lock is released
+                stop.set()
+                worker.join()
+
+
+def _stop_criteria(stop):
+    """transformers StoppingCriteria that ends generation once an event is set"""
+    from transformers import StoppingCriteria
+    
+    class StopOnEvent(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return stop.is_set()
+    
+    return StopOnEvent()
+
+
+class StubBackend(LLMBackend):
+    """Deterministic offline backend for tests and benchmarks"""
+    
+    name = "stub"
+    
+    def stream(self, prompt, max_new_tokens, temperature, top_p, stop=None):
+        question = prompt.rsplit("Farmer question:", 1)[-1].replace("Advisor:", "").strip()
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        words = f"[stub {digest}] Advice for: {question}".split(" ")
+        for i, word in enumerate(words[:max_new_tokens]):
+            if stop is not None and stop.is_set():
+                return
+            yield word if i == 0 else " " + word
+
+
+def create_backend(name=None, hf_token=None, config=LLM_CONFIG):
+    """
+    Build the backend selected in LLM_CONFIG.
+    
+    Args:
+        name (str): "hf", "local" or "stub"; defaults to config["backend"]
+        hf_token (str): HuggingFace token for the hosted backend
+        config (dict): LLM configuration
+    
+    Returns:
+        LLMBackend: Backend instance
+    """
+    name = name or config.get("backend", "hf")
+    if name == "hf":
+        return HFInferenceBackend(hf_token, config["model"])
+    if name == "local":
+        return LocalCPUBackend(config["local_model"], settings.MODEL_THREADS)
+    if name == "stub":
+        return StubBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -1,48 +1,252 @@
-from huggingface_hub import InferenceClient
+import hashlib
 import logging
+import queue
+import threading
+import time
+from config import settings
+from config.constants import LLM_CONFIG
+from modules.llm_backends import create_backend
+from modules.prompt_builder import PromptBuilder
+from utils.admission import admit
+from utils.cache import get_cache
+from utils.metrics import get_tracker
+from utils.singleflight import get_flight
 
 logger = logging.getLogger(__name__)
 
+
+class _Attempt:
+    """One backend call streaming into a queue from a worker thread"""
+    
+    def __init__(self, backend, prompt, notify):
+        self.backend = backend
+        self.chunks = queue.Queue()
+        self.first_token = threading.Event()
+        self.done = threading.Event()
+        self.cancelled = False
+        # Tells the backend to stop generating, not just this thread to stop reading
+        self.stop = threading.Event()
+        self.error = None
+        self._notify = notify
+        threading.Thread(target=self._run, args=(prompt,), daemon=True).start()
+    
+    @property
+    def answered(self):
+        return self.first_token.is_set() or (self.done.is_set() and self.error is None)
+    
+    def cancel(self):
+        """Drop the rest of the answer and stop the backend generating it"""
+        self.cancelled = True
+        self.stop.set()
+    
+    def _run(self, prompt):
+        ttft = get_tracker(f"llm.{self.backend.name}.ttft")
+        total = get_tracker(f"llm.{self.backend.name}.total")
+        start = time.monotonic()
+        stream = self.backend.stream(
+            prompt,
+            LLM_CONFIG["max_tokens"],
+            LLM_CONFIG["temperature"],
+            LLM_CONFIG["top_p"],
+            stop=self.stop
+        )
+        try:
+            for chunk in stream:
+                if not self.first_token.is_set():
+                    ttft.record(time.monotonic() - start)
+                    self.first_token.set()
+                    self._notify.set()
+                if self.cancelled:
+                    return
+                self.chunks.put(chunk)
+            total.record(time.monotonic() - start)
+        except Exception as e:
+            logger.warning(f"LLM backend '{self.backend.name}' failed: {e}")
+            self.error = e
+            total.record_error()
+        finally:
+            # Closing runs the backend's cleanup now, so a local model has
+            # stopped and released its lock before the next request queues on it
+            stream.close()
+            self.done.set()
+            self.chunks.put(None)
+            self._notify.set()
+
+
 class FarmerCopilotLLM:
-    """LLM integration via HuggingFace"""
+    """LLM integration through a pluggable backend"""
     
-    def __init__(self, hf_token):
+    def __init__(self, hf_token, backend=None, secondary=None):
         try:
-            self.client = InferenceClient(
-                model="mistralai/Mistral-7B-Instruct-v0.2",
-                token=hf_token
-            )
+            self.backend = create_backend(backend, hf_token)
         except Exception as e:
             logger.error(f"LLM initialization failed: {e}")
-            self.client = None
+            self.backend = None
+        
+        # Optional second backend raced against a slow primary
+        self.secondary = None
+        secondary = secondary or LLM_CONFIG.get("secondary_backend")
+        if secondary:
+            try:
+                self.secondary = create_backend(secondary, hf_token)
+            except Exception as e:
+                logger.warning(f"Secondary LLM backend unavailable: {e}")
+        
+        # Count prompt tokens with the tokenizer of the model actually serving
+        model = LLM_CONFIG["model"]
+        if self.backend is not None and self.backend.name == "local" and self.backend.engine == "transformers":
+            model = LLM_CONFIG["local_model"]
+        self.prompt_builder = PromptBuilder(hf_token, model=model)
+        # Identical prompts across workers reuse a complete answer
+        self.cache = get_cache("llm_response", settings.RESPONSE_CACHE_HOURS * 3600)
     
-    def generate_response(self, query, context, history):
-        """Generate LLM response"""
-        if not self.client:
+    def generate_response(self, query, context, history, summary="", deadline_seconds=None):
+        """Generate LLM response; identical prompts share one call and its cached answer"""
+        if not self.backend:
             return "LLM service unavailable. Please check API key."
         
         try:
-            # Build prompt
-            system_prompt = """You are an expert agricultural advisor for Indian farmers.
-            Provide practical, actionable advice in simple language.
-            Explain WHAT, HOW, WHEN, WHERE, and WHY.
-            Always prioritize farmer safety."""
-            
-            # Build message
-            if context.get("weather"):
-                system_prompt += f"\n\nCurrent weather: {context['weather']['description']}, {context['weather']['temp']}°C"
-            
-            prompt = f"{system_prompt}\n\nFarmer question: {query}"
-            
-            # Generate
-            response = self.client.text_generation(
-                prompt,
-                max_new_tokens=300,
-                temperature=0.7
-            )
-            
-            return response if response else "Unable to generate response"
-            
+            prompt = self.prompt_builder.build(query, context, history, summary)
+            key = (self.backend.name, hashlib.sha1(prompt.encode("utf-8")).hexdigest())
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            deadline = time.monotonic() + (deadline_seconds or LLM_CONFIG["deadline_seconds"])
+            return get_flight("llm").do(key, self._generate_and_cache, key, prompt, query, context, deadline)
         except Exception as e:
             logger.error(f"LLM generation error: {e}")
             return f"Error generating response: {str(e)}"
+    
+    def _generate_and_cache(self, key, prompt, query, context, deadline):
+        outcome = {}
+        response = "".join(self._hedged_stream(prompt, query, context, deadline, outcome))
+        # Fallback, stalled and empty answers are not worth sharing
+        if outcome.get("complete"):
+            self.cache.set(key, response)
+        return response
+    
+    def stream_response(self, query, context, history, summary="", deadline_seconds=None):
+        """Yield the response in chunks, hedging slow calls and honouring a first-token deadline"""
+        if not self.backend:
+            yield "LLM service unavailable. Please check API key."
+            return
+        
+        try:
+            prompt = self.prompt_builder.build(query, context, history, summary)
+            deadline = time.monotonic() + (deadline_seconds or LLM_CONFIG["deadline_seconds"])
+            yield from self._hedged_stream(prompt, query, context, deadline)
+        except Exception as e:
+            logger.error(f"LLM generation error: {e}")
+            yield f"Error generating response: {str(e)}"
+    
+    def latency_stats(self):
+        """Per-backend time-to-first-token and total latency statistics"""
+        names = [b.name for b in (self.backend, self.secondary) if b is not None]
+        return {
+            name: {
+                "ttft": get_tracker(f"llm.{name}.ttft").snapshot(),
+                "total": get_tracker(f"llm.{name}.total").snapshot(),
+            }
+            for name in names
+        }
+    
+    def _hedge_delay(self, backend):
+        """Observed p95 time-to-first-token, or the configured default"""
+        tracker = get_tracker(f"llm.{backend.name}.ttft")
+        if len(tracker.samples) < LLM_CONFIG["hedge_min_samples"]:
+            return LLM_CONFIG["hedge_default_seconds"]
+        return tracker.percentile(95)
+    
+    def _hedged_stream(self, prompt, query, context, deadline, outcome=None):
+        # Hosted backends draw on a rate budget; when it is spent, degrade to the template
+        primary, secondary = self.backend, self.secondary
+        if not admit(primary.name):
+            primary, secondary = secondary, None
+            if primary is None or not admit(primary.name):
+                logger.warning("LLM rate budget exhausted, serving the retrieval-only answer")
+                yield self._fallback_response(query, context)
+                return
+        
+        notify = threading.Event()
+        attempts = [_Attempt(primary, prompt, notify)]
+        hedge_at = time.monotonic() + self._hedge_delay(primary)
+        winner = None
+        
+        while True:
+            winner = next((a for a in attempts if a.answered), None)
+            now = time.monotonic()
+            if winner is not None or now >= deadline:
+                break
+            
+            # Duplicate to the secondary once the primary is slower than its p95
+            can_hedge = secondary is not None and len(attempts) == 1
+            if can_hedge and (now >= hedge_at or attempts[0].done.is_set()):
+                if admit(secondary.name):
+                    logger.info(f"Hedging LLM request to '{secondary.name}'")
+                    attempts.append(_Attempt(secondary, prompt, notify))
+                else:
+                    secondary = None
+                continue
+            if not can_hedge and all(a.done.is_set() for a in attempts):
+                break
+            
+            wake_at = min(deadline, hedge_at) if can_hedge else deadline
+            notify.wait(max(0.0, wake_at - now))
+            notify.clear()
+        
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+        
+        if winner is None:
+            yield self._fallback_response(query, context)
+            return
+        
+        # The deadline only bounds the wait for a first token; a half-told
+        # dosage is worse than a slow one, so the winner is read to the end
+        produced = False
+        try:
+            while True:
+                try:
+                    chunk = winner.chunks.get(timeout=LLM_CONFIG["stall_seconds"])
+                except queue.Empty:
+                    logger.warning(f"LLM backend '{winner.backend.name}' stalled mid-answer")
+                    chunk, winner.error = None, TimeoutError("stalled")
+                if chunk is None:
+                    break
+                produced = produced or bool(chunk.strip())
+                yield chunk
+        finally:
+            # Finished, stalled, or the client went away: stop generating
+            winner.cancel()
+        
+        if winner.error is not None:
+            # Say plainly that the answer broke off and give what is known
+            yield ("\n\n" if produced else "") + self._fallback_response(query, context)
+        elif not produced:
+            yield "Unable to generate response"
+        elif outcome is not None:
+            outcome["complete"] = True
+    
+    def _fallback_response(self, query, context):
+        """Retrieval-only answer used when no backend answers before the deadline"""
+        lines = ["Our advisor is taking longer than usual. Here is what we know right now:"]
+        
+        weather = context.get("weather") or {}
+        if "description" in weather:
+            lines.append(
+                f"- Weather: {weather['description']}, {weather['temp']}°C, humidity {weather['humidity']}%"
+            )
+        
+        market = context.get("market") or {}
+        for m in market.get("nearest_markets") or []:
+            lines.append(
+                f"- {market['crop']} at {m['market']} ({m['distance_km']} km): ₹{m['price_per_quintal']}/quintal"
+            )
+        
+        crops = context.get("crops") or []
+        if crops:
+            lines.append("- Suitable crops: " + ", ".join(c["crop"] for c in crops))
+        
+        lines.append("Please ask again in a moment for detailed advice.")
+        return "\n".join(lines)
@@ -1,26 +1,188 @@
 import requests
 import logging
+import math
+import threading
+from datetime import datetime
 from bs4 import BeautifulSoup
+from config import settings
+from config.constants import CROP_DATA, MANDIS
+from utils.cache import get_cache
+from utils.geo import KM_PER_DEGREE, grid_cell, haversine_km
+from utils.singleflight import get_flight
 
 logger = logging.getLogger(__name__)
 
+# How long an empty AGMARK scrape is cached before trying again
+AGMARK_RETRY_SECONDS = 300
+
+# Columns of the AGMARK price grid, in page order
+AGMARK_COLUMNS = (
+    "sl_no", "district", "market", "commodity", "variety", "grade",
+    "min_price", "max_price", "modal_price", "date",
+)
+
+
+def _market_name(name):
+    """AGMARK and MANDIS spell market names differently; compare on this"""
+    words = name.lower().replace("(", " ").replace(")", " ").split()
+    return " ".join(w for w in words if w not in ("apmc", "mandi", "market", "yard", "f&v"))
+
+
+class MandiIndex:
+    """Grid spatial index over mandi coordinates, partitioned by crop"""
+    
+    def __init__(self, markets=None, cell_deg=1.0):
+        self.cell_deg = cell_deg
+        self.markets = {}
+        self.prices = {}
+        # crop -> {(row, col): set(market_id)}
+        self._grids = {}
+        # crop -> (min_row, max_row, min_col, max_col), dropped on change
+        self._extents = {}
+        # (market name, district) as AGMARK reports them -> market_id
+        self._names = {}
+        self._max_abs_lat = 0.0
+        self._lock = threading.RLock()
+        
+        for market_id, market in (markets or {}).items():
+            self.upsert_market(market_id, market)
+    
+    def upsert_market(self, market_id, market):
+        """Add or move a market without rebuilding the index"""
+        with self._lock:
+            if market_id in self.markets:
+                self._unlink(market_id)
+            
+            market = dict(market)
+            market["crops"] = [c.lower() for c in market.get("crops", [])]
+            self.markets[market_id] = market
+            self._names[(_market_name(market["name"]), market["district"].lower())] = market_id
+            self._max_abs_lat = max(self._max_abs_lat, abs(market["lat"]))
+            
+            cell = grid_cell(market["lat"], market["lon"], self.cell_deg)
+            for crop in market["crops"]:
+                self._grids.setdefault(crop, {}).setdefault(cell, set()).add(market_id)
+                self._extents.pop(crop, None)
+    
+    def remove_market(self, market_id):
+        """Drop a market and its prices"""
+        with self._lock:
+            if market_id in self.markets:
+                self._unlink(market_id)
+                del self.markets[market_id]
+                self.prices.pop(market_id, None)
+    
+    def find(self, name, district):
+        """market_id of a market as named in AGMARK rows, or None"""
+        return self._names.get((_market_name(name), district.strip().lower()))
+    
+    def update_price(self, market_id, crop, price_per_quintal, updated=None):
+        """Record the latest modal price of a crop at a market"""
+        with self._lock:
+            self.prices.setdefault(market_id, {})[crop.lower()] = {
+                "price_per_quintal": price_per_quintal,
+                "last_updated": updated or datetime.now().isoformat(),
+            }
+    
+    def nearest(self, lat, lon, crop, k=3):
+        """Return the k nearest markets trading a crop as (distance_km, market_id)"""
+        crop = crop.lower()
+        with self._lock:
+            grid = self._grids.get(crop)
+            if not grid or k <= 0:
+                return []
+            
+            row0, col0 = grid_cell(lat, lon, self.cell_deg)
+            min_row, max_row, min_col, max_col = self._extent(crop)
+            max_ring = max(row0 - min_row, max_row - row0, col0 - min_col, max_col - col0)
+            # Narrowest cell edge in km: anything beyond ring r is at least r cells away
+            cell_km = self.cell_deg * KM_PER_DEGREE * math.cos(
+                math.radians(min(89.0, max(self._max_abs_lat, abs(lat)) + self.cell_deg))
+            )
+            
+            found = []
+            for ring in range(max_ring + 1):
+                for cell in self._ring_cells(row0, col0, ring):
+                    for market_id in grid.get(cell, ()):
+                        market = self.markets[market_id]
+                        found.append((haversine_km(lat, lon, market["lat"], market["lon"]), market_id))
+                
+                if len(found) >= k:
+                    found.sort()
+                    if found[k - 1][0] <= ring * cell_km:
+                        break
+            
+            found.sort()
+            return found[:k]
+    
+    def _extent(self, crop):
+        extent = self._extents.get(crop)
+        if extent is None:
+            cells = self._grids[crop]
+            rows = [cell[0] for cell in cells]
+            cols = [cell[1] for cell in cells]
+            extent = (min(rows), max(rows), min(cols), max(cols))
+            self._extents[crop] = extent
+        return extent
+    
+    def _unlink(self, market_id):
+        market = self.markets[market_id]
+        self._names.pop((_market_name(market["name"]), market["district"].lower()), None)
+        cell = grid_cell(market["lat"], market["lon"], self.cell_deg)
+        for crop in market["crops"]:
+            bucket = self._grids.get(crop, {}).get(cell)
+            if bucket:
+                bucket.discard(market_id)
+                if not bucket:
+                    del self._grids[crop][cell]
+                    if not self._grids[crop]:
+                        del self._grids[crop]
+            self._extents.pop(crop, None)
+    
+    @staticmethod
+    def _ring_cells(row0, col0, ring):
+        if ring == 0:
+            yield (row0, col0)
+            return
+        for col in range(col0 - ring, col0 + ring + 1):
+            yield (row0 - ring, col)
+            yield (row0 + ring, col)
+        for row in range(row0 - ring + 1, row0 + ring):
+            yield (row, col0 - ring)
+            yield (row, col0 + ring)
+
+
 class MarketAPI:
     """Market price integration"""
     
-    def __init__(self):
+    def __init__(self, markets=None):
         self.enam_url = "https://enam.gov.in"
         self.agmark_url = "https://agmarknet.gov.in"
+        self.index = MandiIndex(markets if markets is not None else MANDIS)
+        # Shared with the other worker processes
+        self.cache = get_cache("market", settings.MARKET_CACHE_HOURS * 3600)
     
-    def get_prices(self, crop, location=None):
-        """Get market prices"""
+    def get_prices(self, crop, location=None, k=3):
+        """Get market prices, with the nearest mandis when location is known"""
         try:
-            # Try AGMARK scrape
-            prices = self._scrape_agmark(crop)
-            return {
+            # Try AGMARK scrape, once per crop across workers while cached
+            key = " ".join(str(crop).lower().split())
+            prices = self.cache.get(key)
+            if prices is None:
+                prices = get_flight("market").do(key, self._scrape_and_cache, key, crop)
+            # Rows may come from another worker's scrape; keep this index current too
+            self.apply_prices(crop, prices)
+            result = {
                 "crop": crop,
                 "prices": prices,
                 "source": "AGMARK"
             }
+            
+            coords = self._resolve_location(location)
+            if coords:
+                result["nearest_markets"] = self.get_nearest_markets(crop, coords[0], coords[1], k)
+            
+            return result
         except Exception as e:
             logger.error(f"Market data error: {e}")
             return {
@@ -29,14 +191,109 @@ class MarketAPI:
                 "prices": []
             }
     
+    def refresh(self, crop):
+        """Scrape and cache prices for a crop even if cached ones exist"""
+        key = " ".join(str(crop).lower().split())
+        prices = get_flight("market").do(key, self._scrape_and_cache, key, crop)
+        self.apply_prices(crop, prices)
+        return prices
+    
+    def apply_prices(self, crop, rows):
+        """
+        Record scraped modal prices on the mandis they belong to.
+        
+        Args:
+            crop (str): Crop the rows are for
+            rows (list): AGMARK rows with "market", "district", "modal_price" and "date"
+        
+        Returns:
+            int: Number of rows matched to a known mandi
+        """
+        crop_key = crop.lower().replace(" ", "_")
+        matched = 0
+        for row in rows:
+            market_id = self.index.find(row.get("market", ""), row.get("district", ""))
+            if market_id is None or row.get("modal_price") is None:
+                continue
+            self.index.update_price(market_id, crop_key, row["modal_price"], row.get("date"))
+            matched += 1
+        return matched
+    
+    def get_nearest_markets(self, crop, lat, lon, k=3):
+        """k nearest mandis trading the crop with their latest price and distance"""
+        crop_key = crop.lower().replace(" ", "_")
+        fallback = CROP_DATA.get(crop_key, {}).get("price_per_quintal")
+        
+        results = []
+        for distance, market_id in self.index.nearest(lat, lon, crop_key, k):
+            market = self.index.markets[market_id]
+            latest = self.index.prices.get(market_id, {}).get(crop_key, {})
+            results.append({
+                "market_id": market_id,
+                "market": market["name"],
+                "district": market["district"],
+                "state": market["state"],
+                "distance_km": round(distance, 1),
+                "price_per_quintal": latest.get("price_per_quintal", fallback),
+                "last_updated": latest.get("last_updated"),
+            })
+        return results
+    
+    def _resolve_location(self, location):
+        """Accept (lat, lon), a weather dict with coordinates or a district name"""
+        if not location:
+            return None
+        if isinstance(location, (tuple, list)) and len(location) == 2:
+            return float(location[0]), float(location[1])
+        if isinstance(location, dict) and "lat" in location and "lon" in location:
+            return float(location["lat"]), float(location["lon"])
+        if isinstance(location, str):
+            district = location.split(",")[0].strip().lower()
+            points = [
+                (m["lat"], m["lon"]) for m in self.index.markets.values()
+                if m["district"].lower() == district
+            ]
+            if points:
+                return (
+                    sum(p[0] for p in points) / len(points),
+                    sum(p[1] for p in points) / len(points),
+                )
+        return None
+    
+    def _scrape_and_cache(self, key, crop):
+        prices = self._scrape_agmark(crop)
+        # An empty scrape may be an outage; retry it sooner than a real result
+        self.cache.set(key, prices, None if prices else AGMARK_RETRY_SECONDS)
+        return prices
+    
     def _scrape_agmark(self, crop):
         """Scrape AGMARK prices"""
         try:
             response = requests.get(self.agmark_url, timeout=5)
             soup = BeautifulSoup(response.content, 'html.parser')
-            
-            prices = []
-            # Simple parsing - adapt based on actual HTML structure
-            return prices
+            return self._parse_agmark(soup)
         except:
             return []
+    
+    @staticmethod
+    def _parse_agmark(soup):
+        """Rows of the AGMARK price grid as dicts, prices in Rs/quintal"""
+        table = soup.find("table", id="cphBody_GridPriceData")
+        if table is None:
+            return []
+        
+        prices = []
+        for tr in table.find_all("tr"):
+            cells = [td.get_text(strip=True) for td in tr.find_all("td")]
+            if len(cells) != len(AGMARK_COLUMNS):
+                continue
+            row = dict(zip(AGMARK_COLUMNS, cells))
+            try:
+                for column in ("min_price", "max_price", "modal_price"):
+                    row[column] = float(row[column].replace(",", ""))
+                row["date"] = datetime.strptime(row["date"], "%d %b %Y").date().isoformat()
+            except ValueError:
+                continue
+            del row["sl_no"]
+            prices.append(row)
+        return prices
@@ -0,0 +1,307 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from modules.crop_rag import CropRAGSystem
+from modules.disease_detection import DiseaseDetector
+from modules.disease_risk import DiseaseRiskEngine
+from modules.fertilizer import FertilizerCalculator
+from modules.llm_engine import FarmerCopilotLLM
+from modules.market import MarketAPI
+from modules.prompt_builder import compact_history
+from modules.schemes import SchemeMatcher
+from modules.soil_health import get_soil_store, soil_params
+from modules.weather import WeatherAPI
+from nlp.intent_router import IntentRouter
+from nlp.localization import get_localizer
+from nlp.translator import MultilingualProcessor
+from utils.cache import get_cache
+from utils.metrics import get_tracker
+from utils.singleflight import get_flight
+
+logger = logging.getLogger(__name__)
+
+
+def create_components(openweather_key=None, deepl_key=None, hf_token=None):
+    """
+    Build every pipeline component once per process.
+    
+    Args:
+        openweather_key (str): OpenWeather API key
+        deepl_key (str): DeepL API key
+        hf_token (str): Hugging Face token
+    
+    Returns:
+        dict: Component name -> instance
+    """
+    weather = WeatherAPI(openweather_key)
+    market = MarketAPI()
+    return {
+        "weather": weather,
+        "market": market,
+        "crop_rag": CropRAGSystem(),
+        "disease": DiseaseDetector(),
+        "llm": FarmerCopilotLLM(hf_token),
+        "translator": MultilingualProcessor(deepl_key),
+        "router": IntentRouter(weather=weather, market=market),
+        "risk": DiseaseRiskEngine(),
+        "soil": get_soil_store(),
+        "fertilizer": FertilizerCalculator(),
+        "schemes": SchemeMatcher(),
+    }
+
+
+class CopilotPipeline:
+    """One chat turn: route, gather context, answer, translate and compact history"""
+    
+    def __init__(self, components):
+        self.components = components
+        self.profile_cache = get_cache("profile_context", settings.PROFILE_CONTEXT_CACHE_MINUTES * 60)
+        self.prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+    
+    def answer(self, message, profile=None, history=None, summary=""):
+        """
+        Answer one farmer message.
+        
+        Stateless: the caller owns the conversation and passes it back in.
+        
+        Args:
+            message (str): Farmer's question in any supported language
+            profile (dict): Optional "location", "crop" and "soil" from the sidebar,
+                and "state", "land_ha" and "category" for scheme eligibility
+            history (list): Previous {"role", "content"} turns
+            summary (str): Summary of turns already folded out of history
+        
+        Returns:
+            dict: {"response", "language", "intent", "alerts", "history", "summary"}
+        """
+        for event in self._events(message, profile, history, summary, stream_llm=False):
+            if event["event"] == "done":
+                return event["data"]
+    
+    def stream(self, message, profile=None, history=None, summary=""):
+        """
+        Answer one farmer message as a sequence of events.
+        
+        Yields:
+            dict: {"event": "alert" | "delta" | "done", "data": ...}; "delta"
+            events carry response text, the final "done" event carries the
+            same dict answer() returns
+        """
+        yield from self._events(message, profile, history, summary, stream_llm=True)
+    
+    def _events(self, message, profile, history, summary, stream_llm):
+        profile = profile or {}
+        history = list(history or [])
+        location = profile.get("location") or None
+        crop = profile.get("crop") or "Select"
+        components = self.components
+        alerts = []
+        
+        language = components["translator"].detect_language(message)
+        
+        # Structured questions are answered locally without the LLM
+        route = components["router"].route(message)
+        response = components["router"].respond(route, location=location, crop=crop, language=language)
+        
+        if response is not None:
+            yield {"event": "delta", "data": response}
+        else:
+            # Only the LLM prompt needs English; translate while the context is gathered
+            translation_pool = ThreadPoolExecutor(max_workers=1)
+            translation = translation_pool.submit(
+                components["translator"].translate_to_english, message, language
+            )
+            translation_pool.shutdown(wait=False)
+            
+            context = self._context(message, language, route, profile, translation, alerts)
+            for alert in alerts:
+                yield {"event": "alert", "data": alert}
+            
+            llm = components["llm"]
+            query_en = translation.result()
+            if stream_llm and language == "English":
+                parts = []
+                for chunk in llm.stream_response(query_en, context, history, summary):
+                    parts.append(chunk)
+                    yield {"event": "delta", "data": chunk}
+                response = "".join(parts)
+            else:
+                # Translation needs the whole answer; identical prompts share one call
+                response_en = llm.generate_response(query_en, context, history, summary)
+                response = components["translator"].translate_response(response_en, language)
+                yield {"event": "delta", "data": response}
+        
+        history += [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response},
+        ]
+        # Keep only recent turns verbatim, fold the rest into the summary
+        history, summary = compact_history(history, summary, settings.MAX_CONVERSATION_HISTORY)
+        
+        yield {
+            "event": "done",
+            "data": {
+                "response": response,
+                "language": language,
+                "intent": route["intent"],
+                "alerts": alerts,
+                "history": history,
+                "summary": summary,
+            },
+        }
+    
+    def prefetch(self, profile, language=None):
+        """
+        Warm the profile's context in the background before the first question.
+        
+        Called when the sidebar profile changes, so weather, prices, soil,
+        fertilizer and crop suggestions are cached by the time the farmer
+        has typed a question.
+        
+        Args:
+            profile (dict): Sidebar profile, as passed to answer()
+            language (str): Selected answer language
+        
+        Returns:
+            bool: True when a warm-up was scheduled
+        """
+        profile = profile or {}
+        if not profile.get("location") and (profile.get("crop") or "Select") == "Select":
+            return False
+        if self.profile_cache.get(self._profile_key(profile)) is not None:
+            return False
+        self.prefetch_pool.submit(self._warm, profile, language)
+        return True
+    
+    def _warm(self, profile, language):
+        start = time.perf_counter()
+        try:
+            self.profile_context(profile)
+            # Loads every locale's templates and glossary on first use
+            get_localizer().language_code(language or "English")
+        except Exception as e:
+            logger.warning(f"Prefetch failed: {e}")
+        get_tracker("pipeline.prefetch").record(time.perf_counter() - start)
+    
+    def profile_context(self, profile):
+        """
+        Context that depends only on the profile, not on the question.
+        
+        Cached across workers for a few minutes; concurrent builds for one
+        profile (a prefetch and the first question) share a single build.
+        
+        Args:
+            profile (dict): "location", "crop" and "land_ha"
+        
+        Returns:
+            dict: Any of "weather", "market", "disease_risk", "soil",
+            "fertilizer" and "crops"; treat as read-only
+        """
+        key = self._profile_key(profile)
+        context = self.profile_cache.get(key)
+        if context is None:
+            context = get_flight("profile_context").do(key, self._build_profile_context, key, profile)
+        return context
+    
+    @staticmethod
+    def _profile_key(profile):
+        return (
+            " ".join(str(profile.get("location") or "").lower().split()),
+            str(profile.get("crop") or "Select").lower(),
+            # Fertilizer quantities scale with the farm
+            float(profile.get("land_ha") or 1.0),
+        )
+    
+    def _build_profile_context(self, key, profile):
+        """Weather, prices, risk, soil, fertilizer and crop suggestions"""
+        components = self.components
+        location = profile.get("location") or None
+        crop = profile.get("crop") or "Select"
+        context = {}
+        
+        # Get weather if location provided
+        if location:
+            try:
+                weather = components["weather"].get_weather(location)
+                # Failures come back as an error dict with placeholder readings; leave them out
+                if "error" in weather:
+                    logger.warning(f"Weather lookup failed: {weather['error']}")
+                else:
+                    context["weather"] = weather
+            except Exception as e:
+                logger.warning(f"Weather lookup failed: {e}")
+        
+        # Get nearest mandi prices for the selected crop
+        if crop != "Select":
+            try:
+                weather = context.get("weather") or {}
+                context["market"] = components["market"].get_prices(
+                    crop,
+                    location=(weather["lat"], weather["lon"]) if "lat" in weather else location
+                )
+            except Exception as e:
+                logger.warning(f"Price lookup failed: {e}")
+        
+        # Score disease risk for the crop under current weather
+        if crop != "Select" and context.get("weather"):
+            try:
+                context["disease_risk"] = components["risk"].for_weather(context["weather"], crop)
+            except Exception as e:
+                logger.warning(f"Risk scoring failed: {e}")
+        
+        # Soil card averages for the farmer's cell, village or district
+        weather = context.get("weather") or {}
+        soil = components["soil"].lookup(weather if "lat" in weather else None, location)
+        if soil:
+            context["soil"] = soil
+        
+        # Dosage from crop targets and the measured soil, so the answer quotes real numbers
+        if crop != "Select":
+            plan = components["fertilizer"].recommend(crop, soil, area_ha=profile.get("land_ha") or 1.0)
+            if plan:
+                context["fertilizer"] = plan
+        
+        # Get crop recommendations
+        try:
+            context["crops"] = components["crop_rag"].get_recommendations(soil_params(soil))
+        except Exception as e:
+            logger.warning(f"Crop recommendations failed: {e}")
+        
+        # A failed weather lookup is retried on the next question rather than cached
+        if "weather" in context or not location:
+            self.profile_cache.set(key, context)
+        return context
+    
+    def _context(self, message, language, route, profile, translation, alerts):
+        """Profile context plus the passages, disease and schemes this question needs"""
+        components = self.components
+        crop = profile.get("crop") or "Select"
+        context = dict(self.profile_context(profile))
+        
+        if profile.get("location") and "weather" not in context:
+            alerts.append("Could not fetch weather data")
+        for risk in context.get("disease_risk") or []:
+            if risk["level"] == "High":
+                alerts.append(f"⚠️ High {risk['disease']} risk for {crop} in current weather")
+        
+        # Disease named or matched from described symptoms
+        if route["entities"]["disease"]:
+            context["disease_candidates"] = [route["entities"]["disease"]]
+        
+        # Schemes the farmer's profile qualifies for
+        if route["intent"] == "scheme":
+            context["schemes"] = components["schemes"].match(profile)
+        
+        # Retrieve knowledge base passages, in the farmer's language when supported
+        try:
+            crop_rag = components["crop_rag"]
+            if crop_rag.supports_language(language):
+                retrieval = crop_rag.retrieve(message, language=language)
+            else:
+                retrieval = crop_rag.retrieve(translation.result())
+            context["documents"] = retrieval["results"]
+        except Exception as e:
+            logger.warning(f"Retrieval failed: {e}")
+        
+        return context
@@ -0,0 +1,187 @@
+import logging
+import re
+from functools import lru_cache
+from config.constants import LLM_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """You are an expert agricultural advisor for Indian farmers.
+Provide practical, actionable advice in simple language.
+Explain WHAT, HOW, WHEN, WHERE, and WHY.
+Always prioritize farmer safety."""
+
+
+def compact_history(history, summary, max_turns, summary_max_chars=1200):
+    """
+    Keep the last max_turns messages verbatim and fold older ones into the summary.
+    
+    Returns:
+        tuple: (recent_history, summary)
+    """
+    if len(history) <= max_turns:
+        return list(history), summary
+    
+    overflow = history[:len(history) - max_turns]
+    lines = [line for line in summary.split("\n") if line] if summary else []
+    for msg in overflow:
+        speaker = "Farmer" if msg["role"] == "user" else "Advisor"
+        lines.append(f"{speaker}: {_first_sentence(msg['content'])}")
+    
+    # Oldest summary lines go first once the summary itself is over budget
+    while lines and sum(len(line) + 1 for line in lines) > summary_max_chars:
+        lines.pop(0)
+    
+    return list(history[-max_turns:]), "\n".join(lines)
+
+
+def _first_sentence(text, max_chars=160):
+    text = " ".join(text.split())
+    match = re.match(r"(.+?[.?!।])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3] + "..."
+
+
+class PromptBuilder:
+    """Token-budgeted prompt assembly, stable sections first for prefix reuse"""
+    
+    def __init__(self, hf_token=None, model=None, max_prompt_tokens=None):
+        self.model = model or LLM_CONFIG["model"]
+        self.max_prompt_tokens = max_prompt_tokens or LLM_CONFIG["max_prompt_tokens"]
+        self.tokenizer = None
+        try:
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model, token=hf_token)
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable, estimating token counts: {e}")
+        
+        self.count_tokens = lru_cache(maxsize=4096)(self._count_tokens)
+    
+    def _count_tokens(self, text):
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        # Roughly four characters per token for English text
+        return len(text) // 4 + 1
+    
+    def build(self, query, context=None, history=None, summary=""):
+        """
+        Assemble the prompt within max_prompt_tokens.
+        
+        Layout: system prompt, retrieved context, conversation summary,
+        recent turns, question. Context and summary are capped at a share
+        of the budget; recent turns fill the rest, newest first.
+        """
+        question = f"Farmer question: {query}\nAdvisor:"
+        budget = self.max_prompt_tokens - self.count_tokens(SYSTEM_PROMPT) - self.count_tokens(question)
+        
+        context_text = self.format_context(context or {})
+        context_text = self._truncate(context_text, max(0, budget // 2))
+        budget -= self.count_tokens(context_text)
+        
+        summary_text = ""
+        if summary:
+            header = "Earlier in this conversation:\n"
+            # Keep the most recent part of the summary when it has to be cut
+            summary_budget = max(0, budget // 3 - self.count_tokens(header))
+            summary_text = header + self._truncate(summary, summary_budget, keep_tail=True)
+        budget -= self.count_tokens(summary_text)
+        
+        turns = []
+        for msg in reversed(history or []):
+            speaker = "Farmer" if msg["role"] == "user" else "Advisor"
+            line = f"{speaker}: {msg['content']}"
+            cost = self.count_tokens(line)
+            if cost > budget:
+                break
+            turns.append(line)
+            budget -= cost
+        turns.reverse()
+        
+        sections = [SYSTEM_PROMPT, context_text, summary_text, "\n".join(turns), question]
+        return "\n\n".join(section for section in sections if section)
+    
+    def format_context(self, context):
+        """Render retrieved context in a fixed order"""
+        parts = []
+        
+        weather = context.get("weather")
+        if weather and "description" in weather:
+            parts.append(
+                f"Current weather: {weather['description']}, {weather['temp']}°C, "
+                f"humidity {weather['humidity']}%"
+            )
+        
+        soil = context.get("soil")
+        if soil:
+            values = ", ".join(
+                f"{name} {soil[name]}{unit}"
+                for name, unit in (("N", " kg/ha"), ("P", " kg/ha"), ("K", " kg/ha"), ("pH", ""), ("OC", "%"))
+                if name in soil
+            )
+            parts.append(f"Soil test averages nearby ({soil['samples']} cards): {values}")
+        
+        plan = context.get("fertilizer")
+        if plan:
+            lines = [
+                f"- {p['product']}: {p['kg']} kg ({p['bags']} bags, ₹{p['cost']})"
+                for p in plan["products"]
+            ]
+            basis = "soil test" if plan.get("soil_tested") else "standard dose"
+            parts.append(
+                f"Fertilizer for {plan['area_ha']} ha of {plan['crop']} ({basis}, "
+                f"N {plan['need']['N']} / P2O5 {plan['need']['P']} / K2O {plan['need']['K']} kg/ha):\n"
+                + "\n".join(lines) + f"\nTotal ₹{plan['total_cost']}"
+            )
+        
+        market = context.get("market") or {}
+        nearest = market.get("nearest_markets") or []
+        if nearest:
+            lines = [
+                f"- {m['market']} ({m['distance_km']} km): ₹{m['price_per_quintal']}/quintal"
+                for m in nearest
+            ]
+            parts.append(f"Nearest mandi prices for {market['crop']}:\n" + "\n".join(lines))
+        
+        risks = context.get("disease_risk") or []
+        if risks:
+            lines = [f"- {r['disease']} on {r['crop']}: {r['level']} ({r['risk']})" for r in risks]
+            parts.append("Disease risk from current weather:\n" + "\n".join(lines))
+        
+        candidates = context.get("disease_candidates") or []
+        if candidates:
+            names = [c.replace("_", " ").title() for c in candidates]
+            parts.append("Likely disease from the farmer's description: " + ", ".join(names))
+        
+        crops = context.get("crops") or []
+        if crops:
+            parts.append("Suggested crops: " + ", ".join(c["crop"] for c in crops))
+        
+        schemes = context.get("schemes") or {}
+        if schemes.get("eligible"):
+            lines = [f"- {s['name']}: {s['amount']} ({s['website']})" for s in schemes["eligible"]]
+            parts.append("Government schemes the farmer is eligible for:\n" + "\n".join(lines))
+        if schemes.get("needs_info"):
+            lines = [
+                f"- {s['name']}: {s['eligibility']} (ask for {', '.join(f.replace('_ha', '') for f in s['missing'])})"
+                for s in schemes["needs_info"]
+            ]
+            parts.append("Schemes that depend on details not yet known:\n" + "\n".join(lines))
+        
+        documents = context.get("documents") or []
+        if documents:
+            lines = [f"- {d['title']}: {d['text']}" for d in documents]
+            parts.append("Reference notes:\n" + "\n".join(lines))
+        
+        return "\n\n".join(parts)
+    
+    def _truncate(self, text, max_tokens, keep_tail=False):
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        if self.tokenizer is not None:
+            ids = self.tokenizer.encode(text, add_special_tokens=False)
+            ids = ids[-max_tokens:] if keep_tail else ids[:max_tokens]
+            return self.tokenizer.decode(ids)
+        return text[-max_tokens * 4:] if keep_tail else text[:max_tokens * 4]
@@ -0,0 +1,214 @@
+import logging
+import time
+from config.constants import FERTILIZERS, GOVERNMENT_SCHEMES, RETRIEVAL_CONFIG
+from modules.knowledge_base import get_knowledge_base
+from nlp.bm25 import BM25Index
+from nlp.embeddings import get_embedding_service, is_english
+from nlp.text import analyze
+from utils.metrics import get_tracker
+
+logger = logging.getLogger(__name__)
+
+
+def build_documents(kb=None):
+    """
+    Flatten the knowledge base into retrievable text documents.
+    
+    Returns:
+        list: {"id", "title", "text"} dicts
+    """
+    kb = kb or get_knowledge_base()
+    docs = []
+    
+    for crop in kb.crops.values():
+        docs.append({
+            "id": f"crop:{crop.key}",
+            "title": crop.name,
+            "text": (
+                f"{crop.name} ({crop.scientific_name}, {crop.hindi_name}), {crop.season} season, "
+                f"{crop.duration_days} days. Optimal temperature {crop.temp_min}-{crop.temp_max}°C, "
+                f"rainfall {crop.rainfall_mm} mm, soil pH {crop.ph_min}-{crop.ph_max}. "
+                f"Expected yield {crop.yield_kg_ha} kg/ha, price ₹{crop.price_per_quintal}/quintal."
+            ),
+        })
+    
+    for disease in kb.diseases.values():
+        sections = [
+            disease.hindi_name,
+            disease.description,
+            "Symptoms: " + "; ".join(disease.symptoms or ()),
+            "Treatment: " + "; ".join(disease.treatment or ()),
+            "Chemical control: " + "; ".join(disease.chemical_methods or ()),
+            "Organic control: " + "; ".join(disease.organic_methods or ()),
+            "Prevention: " + "; ".join(disease.prevention or ()),
+        ]
+        docs.append({
+            "id": f"disease:{disease.key}",
+            "title": disease.name,
+            "text": " ".join(section for section in sections if section),
+        })
+    
+    for soil in kb.soils.values():
+        docs.append({
+            "id": f"soil:{soil.key}",
+            "title": soil.name,
+            "text": (
+                f"{soil.name}: {', '.join(soil.characteristics or ())}. "
+                f"Suitable crops: {', '.join(soil.suitable_crops or ())}. Drainage {soil.drainage}."
+            ),
+        })
+    
+    for key, nutrient in FERTILIZERS.items():
+        docs.append({
+            "id": f"fertilizer:{key}",
+            "title": nutrient["name"],
+            "text": (
+                f"{nutrient['name']} sources: {', '.join(nutrient['sources'])}. "
+                f"Benefits: {', '.join(nutrient['benefits'])}. "
+                f"Deficiency signs: {', '.join(nutrient['deficiency_signs'])}."
+            ),
+        })
+    
+    for key, scheme in GOVERNMENT_SCHEMES.items():
+        docs.append({
+            "id": f"scheme:{key}",
+            "title": scheme["name"],
+            "text": (
+                f"{scheme['name']}: {scheme['description']}. Amount {scheme['amount']}. "
+                f"Eligibility: {scheme['eligibility']}. {scheme['website']}"
+            ),
+        })
+    
+    return docs
+
+
+class HybridRetriever:
+    """BM25 + FAISS retrieval with score fusion and a budgeted cross-encoder rerank"""
+    
+    def __init__(self, documents, config=RETRIEVAL_CONFIG):
+        self.config = config
+        self.documents = documents
+        
+        # Lexical stage
+        self.bm25 = BM25Index()
+        for i, doc in enumerate(documents):
+            self.bm25.add(i, [(analyze(doc["title"]), 2.0), (analyze(doc["text"]), 1.0)])
+        self.bm25.build()
+        
+        # Dense stage (optional)
+        self.embedder = None
+        self.faiss_index = None
+        if config.get("enable_dense"):
+            try:
+                import faiss
+                self.embedder = get_embedding_service(config["embedding_model"])
+                if self.embedder.available:
+                    vectors = self.embedder.encode(
+                        [f"{d['title']}. {d['text']}" for d in documents],
+                        cache=False
+                    )
+                    self.faiss_index = faiss.IndexFlatIP(vectors.shape[1])
+                    self.faiss_index.add(vectors)
+            except Exception as e:
+                logger.warning(f"Dense retrieval disabled: {e}")
+        self.multilingual = bool(config.get("multilingual")) and self.faiss_index is not None
+        
+        # Reranker (optional)
+        self.reranker = None
+        if config.get("enable_reranker"):
+            try:
+                from sentence_transformers import CrossEncoder
+                self.reranker = CrossEncoder(config["reranker_model"], device="cpu")
+            except Exception as e:
+                logger.warning(f"Reranker disabled: {e}")
+    
+    def supports_language(self, language):
+        """True when queries in this language can be searched untranslated"""
+        return is_english(language) or self.multilingual
+    
+    def search(self, query, k=5, language=None):
+        """
+        Retrieve the top-k documents for a query.
+        
+        Args:
+            query (str): Question text, English or any language supports_language() accepts
+            k (int): Number of results
+            language (str): Query language; non-English queries lean on the dense scores
+        
+        Returns:
+            dict: {"results": [doc dicts with "score"], "timings_ms": {stage: ms}}
+        """
+        timings = {}
+        n = self.config["candidates"]
+        
+        start = time.perf_counter()
+        lexical = dict(self.bm25.search(analyze(query), n))
+        timings["lexical"] = self._record("lexical", start)
+        
+        dense = {}
+        if self.faiss_index is not None:
+            start = time.perf_counter()
+            scores, ids = self.faiss_index.search(self.embedder.encode([query]), min(n, len(self.documents)))
+            dense = {int(i): float(s) for i, s in zip(ids[0], scores[0]) if i >= 0}
+            timings["dense"] = self._record("dense", start)
+        
+        start = time.perf_counter()
+        weight = self.config["lexical_weight"]
+        if not is_english(language):
+            weight = self.config.get("crosslingual_lexical_weight", weight)
+        fused = self._fuse(lexical, dense, weight)
+        timings["fusion"] = self._record("fusion", start)
+        
+        if self.reranker is not None and fused:
+            start = time.perf_counter()
+            fused = self._rerank(query, fused)
+            timings["rerank"] = self._record("rerank", start)
+        
+        results = [dict(self.documents[i], score=round(score, 4)) for i, score in fused[:k]]
+        return {"results": results, "timings_ms": timings}
+    
+    def _fuse(self, lexical, dense, weight):
+        """Convex combination of min-max normalized lexical and dense scores"""
+        weight = weight if dense else 1.0
+        lex_norm = self._normalize(lexical)
+        dense_norm = self._normalize(dense)
+        fused = {
+            i: weight * lex_norm.get(i, 0.0) + (1 - weight) * dense_norm.get(i, 0.0)
+            for i in set(lexical) | set(dense)
+        }
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    
+    def _rerank(self, query, fused):
+        """Rerank as much of the top-N as the latency budget allows"""
+        budget_s = self.config["rerank_budget_ms"] / 1000.0
+        # Observed per-pair cost decides how many pairs fit in the budget
+        per_pair = get_tracker("retrieval.rerank_per_pair").percentile(95)
+        top_n = self.config["rerank_top_n"]
+        if per_pair:
+            top_n = max(0, min(top_n, int(budget_s / per_pair)))
+        if top_n < 2:
+            return fused
+        
+        head, tail = fused[:top_n], fused[top_n:]
+        start = time.perf_counter()
+        scores = self.reranker.predict([(query, self.documents[i]["text"]) for i, _ in head])
+        get_tracker("retrieval.rerank_per_pair").record((time.perf_counter() - start) / len(head))
+        
+        reranked = sorted(zip((i for i, _ in head), scores), key=lambda item: item[1], reverse=True)
+        # Keep fused scores so reranked and unreranked results stay comparable
+        head_scores = sorted((s for _, s in head), reverse=True)
+        return [(i, s) for (i, _), s in zip(reranked, head_scores)] + tail
+    
+    @staticmethod
+    def _normalize(scores):
+        if not scores:
+            return {}
+        lo, hi = min(scores.values()), max(scores.values())
+        span = hi - lo
+        return {i: (s - lo) / span if span else 1.0 for i, s in scores.items()}
+    
+    @staticmethod
+    def _record(stage, start):
+        elapsed = time.perf_counter() - start
+        get_tracker(f"retrieval.{stage}").record(elapsed)
+        return round(elapsed * 1000, 3)
@@ -0,0 +1,371 @@
+"""
+Background job scheduler, run as its own process so periodic work never
+shares a GIL with interactive turns:
+    
+    python -m modules.scheduler                      # run until stopped
+    python -m modules.scheduler --list               # jobs, next runs, last results
+    python -m modules.scheduler --run weather_refresh
+
+Jobs and their triggers are configured in SCHEDULER_CONFIG. Last-run state
+lives in SQLite, so a restart resumes the schedule instead of re-running
+everything, and concurrent-run limits hold across scheduler processes.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import settings
+from config.constants import SCHEDULER_CONFIG
+from utils.admission import BATCH, set_default_priority
+from utils.metrics import get_tracker
+
+logger = logging.getLogger(__name__)
+
+# Longest the loop sleeps, so clock changes and stop requests are noticed promptly
+MAX_SLEEP_SECONDS = 60
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        body, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if body == "*":
+            start, end = low, high
+        elif "-" in body:
+            start, end = (int(v) for v in body.split("-", 1))
+        else:
+            start = int(body)
+            end = high if step > 1 else start
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"Cron field '{field}' out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class IntervalTrigger:
+    """Fires every fixed number of seconds"""
+    
+    def __init__(self, seconds):
+        self.seconds = float(seconds)
+    
+    def next_after(self, ts):
+        return ts + self.seconds
+    
+    def first_run(self, last_start, now):
+        # Never run before: run now, e.g. to warm caches on a fresh host
+        return now if last_start is None else self.next_after(last_start)
+    
+    def __str__(self):
+        return f"every {self.seconds:g}s"
+
+
+class CronTrigger:
+    """Five-field cron expression: minute hour day month weekday, in local time"""
+    
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        self.minutes = _parse_cron_field(parts[0], 0, 59)
+        self.hours = _parse_cron_field(parts[1], 0, 23)
+        self.days = _parse_cron_field(parts[2], 1, 31)
+        self.months = _parse_cron_field(parts[3], 1, 12)
+        # 0 and 7 are both Sunday
+        self.weekdays = frozenset(d % 7 for d in _parse_cron_field(parts[4], 0, 7))
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+    
+    def _day_matches(self, dt):
+        day = dt.day in self.days
+        weekday = dt.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        # Like cron: when both day fields are restricted, either one matching is enough
+        return day or weekday
+    
+    def next_after(self, ts):
+        """First matching minute strictly after a timestamp"""
+        dt = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Skip whole months, days and hours that cannot match
+        limit = dt + timedelta(days=4 * 366)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+        raise ValueError(f"Cron expression never fires: '{self.expression}'")
+    
+    def first_run(self, last_start, now):
+        # A slot missed while the scheduler was down runs once, now
+        return self.next_after(last_start if last_start is not None else now)
+    
+    def __str__(self):
+        return f"cron '{self.expression}'"
+
+
+class Job:
+    """A named callable with its trigger and limits"""
+    
+    def __init__(self, name, fn, trigger, jitter_seconds=0, max_instances=1, timeout_seconds=3600):
+        self.name = name
+        self.fn = fn
+        self.trigger = trigger
+        self.jitter_seconds = jitter_seconds
+        self.max_instances = max_instances
+        self.timeout_seconds = timeout_seconds
+    
+    def jitter(self):
+        return random.uniform(0, self.jitter_seconds)
+
+
+class JobStateStore:
+    """Last-run state and running-instance leases per job, in SQLite"""
+    
+    def __init__(self, path=None):
+        self.path = path or settings.SCHEDULER_DB_PATH
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "name TEXT PRIMARY KEY, last_start REAL, last_end REAL, last_status TEXT, "
+            "last_error TEXT, last_seconds REAL, last_result TEXT, "
+            "runs INTEGER NOT NULL DEFAULT 0, failures INTEGER NOT NULL DEFAULT 0, "
+            "skipped INTEGER NOT NULL DEFAULT 0, running INTEGER NOT NULL DEFAULT 0, "
+            "lease_until REAL NOT NULL DEFAULT 0)"
+        )
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def claim(self, name, max_instances, lease_seconds):
+        """
+        Take a running slot for a job, across every scheduler process.
+        
+        Slots left by a crashed run are reclaimed once its lease expires.
+        
+        Returns:
+            bool: True when the run may start; False records a skipped run
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO jobs (name) VALUES (?)", (name,))
+            running, lease_until = conn.execute(
+                "SELECT running, lease_until FROM jobs WHERE name = ?", (name,)
+            ).fetchone()
+            if lease_until < now:
+                running = 0
+            claimed = running < max_instances
+            if claimed:
+                conn.execute(
+                    "UPDATE jobs SET running = ?, lease_until = ?, last_start = ? WHERE name = ?",
+                    (running + 1, max(lease_until, now + lease_seconds), now, name)
+                )
+            else:
+                conn.execute("UPDATE jobs SET skipped = skipped + 1 WHERE name = ?", (name,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimed
+    
+    def finish(self, name, seconds, result=None, error=None):
+        """Release a running slot and record how the run went"""
+        self._conn().execute(
+            "UPDATE jobs SET running = MAX(running - 1, 0), last_end = ?, last_seconds = ?, "
+            "last_status = ?, last_error = ?, last_result = COALESCE(?, last_result), "
+            "runs = runs + 1, failures = failures + ? WHERE name = ?",
+            (
+                time.time(), seconds, "failed" if error else "ok", error,
+                None if error else json.dumps(result, ensure_ascii=False, default=str),
+                1 if error else 0, name,
+            )
+        )
+    
+    def get(self, name):
+        """Stored state of one job, or an empty dict before its first run"""
+        conn = self._conn()
+        cursor = conn.execute("SELECT * FROM jobs WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        if row is None:
+            return {}
+        state = dict(zip([c[0] for c in cursor.description], row))
+        state["last_result"] = json.loads(state["last_result"]) if state["last_result"] else None
+        return state
+
+
+class Scheduler:
+    """Fires jobs on their triggers in a small thread pool"""
+    
+    def __init__(self, jobs, state=None, max_workers=None):
+        self.jobs = {job.name: job for job in jobs}
+        self.state = state or JobStateStore()
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or SCHEDULER_CONFIG["max_workers"],
+            thread_name_prefix="job"
+        )
+        self.next_run = {}
+        self.running = {name: 0 for name in self.jobs}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    def plan(self, now=None):
+        """Next run time of every job, resuming from the persisted last runs"""
+        now = now or time.time()
+        for name, job in self.jobs.items():
+            first = job.trigger.first_run(self.state.get(name).get("last_start"), now)
+            self.next_run[name] = max(first, now) + job.jitter()
+        return dict(self.next_run)
+    
+    def run_forever(self):
+        """Fire due jobs until stop() is called, then wait for running ones"""
+        self.plan()
+        for name in self.jobs:
+            logger.info(f"Job '{name}' ({self.jobs[name].trigger}) next at {datetime.fromtimestamp(self.next_run[name]):%Y-%m-%d %H:%M:%S}")
+        while not self._stop.is_set():
+            now = time.time()
+            for name, due in list(self.next_run.items()):
+                if due <= now:
+                    job = self.jobs[name]
+                    self.submit(job)
+                    self.next_run[name] = job.trigger.next_after(now) + job.jitter()
+            wait = min(self.next_run.values(), default=now + MAX_SLEEP_SECONDS) - time.time()
+            self._stop.wait(min(max(wait, 0.0), MAX_SLEEP_SECONDS))
+        logger.info("Scheduler stopping; waiting for running jobs")
+        self.pool.shutdown(wait=True)
+    
+    def stop(self):
+        self._stop.set()
+    
+    def submit(self, job):
+        """Start a run in the pool unless the job is at its instance limit"""
+        with self._lock:
+            # Checked locally first so an overlapping run does not even touch the store
+            if self.running[job.name] >= job.max_instances:
+                logger.warning(f"Job '{job.name}' still running, skipping this run")
+                return None
+            self.running[job.name] += 1
+        try:
+            claimed = self.state.claim(job.name, job.max_instances, job.timeout_seconds)
+        except Exception:
+            self._release(job)
+            raise
+        if not claimed:
+            self._release(job)
+            logger.warning(f"Job '{job.name}' is running in another scheduler, skipping this run")
+            return None
+        return self.pool.submit(self._run, job)
+    
+    def run_now(self, name):
+        """Run one job in the calling thread, honouring its instance limit"""
+        job = self.jobs[name]
+        if not self.state.claim(job.name, job.max_instances, job.timeout_seconds):
+            raise RuntimeError(f"Job '{name}' is already running")
+        with self._lock:
+            self.running[name] += 1
+        return self._run(job)
+    
+    def _release(self, job):
+        with self._lock:
+            self.running[job.name] -= 1
+    
+    def _run(self, job):
+        start = time.perf_counter()
+        last_result = self.state.get(job.name).get("last_result")
+        result = error = None
+        try:
+            logger.info(f"Job '{job.name}' started")
+            result = job.fn(last_result)
+            logger.info(f"Job '{job.name}' finished in {time.perf_counter() - start:.1f}s: {result}")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Job '{job.name}' failed: {error}\n{traceback.format_exc()}")
+            get_tracker(f"job.{job.name}").record_error()
+        finally:
+            seconds = time.perf_counter() - start
+            if error is None:
+                get_tracker(f"job.{job.name}").record(seconds)
+            try:
+                self.state.finish(job.name, seconds, result, error)
+            finally:
+                self._release(job)
+        return result
+
+
+def build_jobs(config=SCHEDULER_CONFIG):
+    """Job objects for every configured job"""
+    from modules import jobs as job_functions
+    built = []
+    for name, spec in config["jobs"].items():
+        fn = getattr(job_functions, name, None)
+        if fn is None:
+            raise ValueError(f"No job function named '{name}' in modules.jobs")
+        trigger = CronTrigger(spec["cron"]) if "cron" in spec else IntervalTrigger(spec["every_seconds"])
+        built.append(Job(
+            name,
+            fn,
+            trigger,
+            jitter_seconds=spec.get("jitter_seconds", 0),
+            max_instances=spec.get("max_instances", 1),
+            timeout_seconds=spec.get("timeout_seconds", 3600),
+        ))
+    return built
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run the background job scheduler")
+    parser.add_argument("--list", action="store_true", help="Show jobs, next runs and last results")
+    parser.add_argument("--run", metavar="JOB", help="Run one job now and exit")
+    args = parser.parse_args()
+    
+    # Every upstream call from here queues behind interactive traffic
+    set_default_priority(BATCH)
+    scheduler = Scheduler(build_jobs())
+    
+    if args.list:
+        next_run = scheduler.plan()
+        for name, job in scheduler.jobs.items():
+            state = scheduler.state.get(name)
+            print(json.dumps({
+                "job": name,
+                "trigger": str(job.trigger),
+                "next_run": datetime.fromtimestamp(next_run[name]).isoformat(timespec="seconds"),
+                "last_start": datetime.fromtimestamp(state["last_start"]).isoformat(timespec="seconds") if state.get("last_start") else None,
+                "last_status": state.get("last_status"),
+                "last_seconds": state.get("last_seconds"),
+                "runs": state.get("runs", 0),
+                "failures": state.get("failures", 0),
+                "skipped": state.get("skipped", 0),
+                "last_error": state.get("last_error"),
+            }, ensure_ascii=False))
+    elif args.run:
+        print(json.dumps(scheduler.run_now(args.run), indent=2, ensure_ascii=False, default=str))
+    else:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: scheduler.stop())
+        scheduler.run_forever()
@@ -0,0 +1,245 @@
+"""
+Government scheme eligibility from rules compiled into bitmasks.
+
+Each scheme is one bit. Every predicate value (a state, a crop, a category,
+a landholding interval) maps to the mask of schemes it satisfies, so matching
+a profile is one lookup and one AND per predicate. Rosters are matched in a
+single vectorized pass:
+    
+    python -m modules.schemes roster.csv --output eligibility.jsonl
+
+The roster is CSV or JSONL with farmer_id, location or state, crop,
+land_ha and category columns.
+"""
+import argparse
+import json
+import logging
+from bisect import bisect_right
+import numpy as np
+from config.constants import GOVERNMENT_SCHEMES, MANDIS
+from modules.knowledge_base import get_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# Profile field -> rule key of the set-valued predicates
+SET_FIELDS = {"state": "states", "crop": "crops", "category": "categories"}
+
+PROFILE_FIELDS = ("state", "crop", "category", "land_ha")
+
+
+def _text(value):
+    return " ".join(str(value or "").lower().split())
+
+
+def _land(value):
+    try:
+        land = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return land if land >= 0 else np.nan
+
+
+class SchemeMatcher:
+    """Bitmask-indexed eligibility over GOVERNMENT_SCHEMES rules"""
+    
+    def __init__(self, schemes=GOVERNMENT_SCHEMES, kb=None):
+        self.kb = kb or get_knowledge_base()
+        self.schemes = schemes
+        self.keys = tuple(schemes)
+        if len(self.keys) > 64:
+            raise ValueError("SchemeMatcher packs schemes into 64-bit masks; split the scheme table")
+        self.all = (1 << len(self.keys)) - 1
+        self._memo = {}
+        # District -> state from the mandi directory, for profiles that only give a location
+        self.district_states = {_text(m["district"]): _text(m["state"]) for m in MANDIS.values()}
+        rules = [schemes[key].get("rules") or {} for key in self.keys]
+        
+        # Set predicates: schemes with no restriction, and schemes accepting each value
+        self.open = {}
+        self.by_value = {}
+        for field, rule in SET_FIELDS.items():
+            open_mask = 0
+            by_value = {}
+            for bit, scheme_rules in enumerate(rules):
+                values = scheme_rules.get(rule)
+                if values is None:
+                    open_mask |= 1 << bit
+                    continue
+                for value in values:
+                    value = self._normalize(field, value)
+                    by_value[value] = by_value.get(value, 0) | 1 << bit
+            self.open[field] = open_mask
+            self.by_value[field] = by_value
+        
+        # Landholding: the rule bounds cut the line into intervals with one mask each
+        bounds = []
+        self.open["land_ha"] = 0
+        for bit, scheme_rules in enumerate(rules):
+            low, high = scheme_rules.get("land_ha") or (None, None)
+            if low is None and high is None:
+                self.open["land_ha"] |= 1 << bit
+            # Inclusive upper bound: the interval ends just after it
+            bounds.append((
+                -np.inf if low is None else float(low),
+                np.inf if high is None else float(np.nextafter(float(high), np.inf)),
+            ))
+        self.land_points = sorted({p for bound in bounds for p in bound if np.isfinite(p)})
+        self.land_masks = [
+            sum(1 << bit for bit, (low, high) in enumerate(bounds) if low <= start < high)
+            for start in [-np.inf] + self.land_points
+        ]
+        self.land_array = np.array(self.land_masks, dtype=np.uint64)
+    
+    def _normalize(self, field, value):
+        # Rosters repeat a few spellings; remember them rather than re-resolving per farmer
+        memo_key = (field, value)
+        normalized = self._memo.get(memo_key)
+        if normalized is None:
+            normalized = _text(value)
+            if field == "crop" and normalized:
+                record = self.kb.crop(normalized)
+                normalized = record.key if record else normalized
+            elif field == "state" and normalized and normalized not in self.by_value.get("state", {}):
+                normalized = self.state_for(value) or normalized
+            if len(self._memo) < 10000:
+                self._memo[memo_key] = normalized
+        return normalized
+    
+    def state_for(self, location):
+        """State of a "district" or "district, state" location, if known"""
+        parts = [_text(part) for part in str(location or "").split(",") if part.strip()]
+        if len(parts) > 1 and parts[-1] in self.by_value["state"]:
+            return parts[-1]
+        return self.district_states.get(parts[0]) if parts else None
+    
+    def _profile_values(self, profile):
+        crop = profile.get("crop")
+        return {
+            "state": self._normalize("state", profile.get("state") or profile.get("location")),
+            "crop": self._normalize("crop", crop if crop != "Select" else None),
+            "category": self._normalize("category", profile.get("category")),
+            "land_ha": _land(profile.get("land_ha")),
+        }
+    
+    def masks(self, field, value):
+        """
+        Schemes a single predicate value allows.
+        
+        Returns:
+            tuple: (definite, possible) masks; they differ only when the value
+            is unknown, where schemes restricting this field are possible
+        """
+        if field == "land_ha":
+            if np.isnan(value):
+                return self.open["land_ha"], self.all
+            mask = self.land_masks[bisect_right(self.land_points, value)]
+            return mask, mask
+        if not value:
+            return self.open[field], self.all
+        mask = self.open[field] | self.by_value[field].get(value, 0)
+        return mask, mask
+    
+    def match(self, profile):
+        """
+        Schemes a farmer qualifies for.
+        
+        Args:
+            profile (dict): Any of "state" (or "location"), "crop", "category"
+                and "land_ha"
+        
+        Returns:
+            dict: {"eligible": [scheme dicts], "needs_info": [scheme dicts with
+            "missing" profile fields that would decide them]}
+        """
+        values = self._profile_values(profile)
+        definite, possible = self.all, self.all
+        for field in PROFILE_FIELDS:
+            field_definite, field_possible = self.masks(field, values[field])
+            definite &= field_definite
+            possible &= field_possible
+        
+        eligible = [self.describe(key) for key in self.names(definite)]
+        needs_info = []
+        for key in self.names(possible & ~definite):
+            bit = 1 << self.keys.index(key)
+            missing = [
+                field for field in PROFILE_FIELDS
+                if not (self.open[field] & bit) and self._unknown(values[field])
+            ]
+            needs_info.append(dict(self.describe(key), missing=missing))
+        return {"eligible": eligible, "needs_info": needs_info}
+    
+    def match_roster(self, profiles):
+        """
+        Eligibility for a whole roster in one vectorized pass.
+        
+        Args:
+            profiles (list): Profile dicts as accepted by match()
+        
+        Returns:
+            tuple: (definite, possible) np.uint64 arrays with one scheme mask per farmer
+        """
+        values = [self._profile_values(profile) for profile in profiles]
+        definite = np.full(len(values), self.all, dtype=np.uint64)
+        possible = np.full(len(values), self.all, dtype=np.uint64)
+        
+        for field in SET_FIELDS:
+            # Rosters repeat a few states, crops and categories; mask each distinct value once
+            unique, inverse = np.unique(np.array([v[field] for v in values], dtype=str), return_inverse=True)
+            pairs = np.array([self.masks(field, value) for value in unique.tolist()], dtype=np.uint64).reshape(-1, 2)
+            definite &= pairs[inverse.reshape(-1), 0]
+            possible &= pairs[inverse.reshape(-1), 1]
+        
+        land = np.array([v["land_ha"] for v in values], dtype=np.float64)
+        known = ~np.isnan(land)
+        land_masks = self.land_array[np.searchsorted(self.land_points, np.where(known, land, 0.0), side="right")]
+        definite &= np.where(known, land_masks, np.uint64(self.open["land_ha"]))
+        possible &= np.where(known, land_masks, np.uint64(self.all))
+        return definite, possible
+    
+    def counts(self, masks):
+        """Farmers per scheme in an array of masks"""
+        bits = np.arange(len(self.keys), dtype=np.uint64)
+        hits = (masks[:, None] >> bits) & np.uint64(1)
+        return dict(zip(self.keys, hits.sum(axis=0).tolist()))
+    
+    def names(self, mask):
+        """Scheme keys set in a mask"""
+        mask = int(mask)
+        return [key for bit, key in enumerate(self.keys) if mask >> bit & 1]
+    
+    def describe(self, key):
+        scheme = self.schemes[key]
+        return {
+            "key": key,
+            "name": scheme["name"],
+            "amount": scheme["amount"],
+            "eligibility": scheme["eligibility"],
+            "website": scheme["website"],
+        }
+    
+    @staticmethod
+    def _unknown(value):
+        return isinstance(value, float) and np.isnan(value) or not value
+
+
+if __name__ == "__main__":
+    from modules.bulk_advisory import read_roster
+    
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Match a farmer roster against government schemes")
+    parser.add_argument("roster", help="CSV or JSONL roster")
+    parser.add_argument("--output", default="eligibility.jsonl", help="JSONL output path")
+    args = parser.parse_args()
+    
+    matcher = SchemeMatcher()
+    rows = list(read_roster(args.roster))
+    definite, possible = matcher.match_roster(rows)
+    with open(args.output, "w", encoding="utf-8") as out:
+        for i, row in enumerate(rows):
+            out.write(json.dumps({
+                "farmer_id": row.get("farmer_id") or str(i),
+                "eligible": matcher.names(definite[i]),
+                "needs_info": matcher.names(possible[i] & ~definite[i]),
+            }, ensure_ascii=False) + "\n")
+    print(json.dumps({"farmers": len(rows), "eligible": matcher.counts(definite)}, indent=2))
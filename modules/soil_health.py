@@ -0,0 +1,537 @@
+"""
+Soil Health Card ingestion and per-location soil parameters.
+
+Stream Soil Health Card exports (CSV or XLSX, millions of rows) into the
+soil store:
+    
+    python -m modules.soil_health cards_maharashtra.csv cards_punjab.xlsx
+
+Rows are validated and normalized, then averaged per geohash cell (plus
+coarser parent cells) and per village and district. The store directory
+holds one .npy file per nutrient column, memory-mapped on load, and a keys
+file that becomes a dict index, so resolving a location is one hash probe
+per fallback level.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import numpy as np
+from config import settings
+from config.constants import SOIL_HEALTH_CONFIG
+from utils.geo import geohash
+
+try:
+    import openpyxl
+except ImportError:  # XLSX ingestion is optional
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+
+NUTRIENTS = ("N", "P", "K", "pH", "OC")
+
+# Used where no soil card covers the farmer's location
+DEFAULT_SOIL_PARAMS = {"N": 200, "P": 40, "K": 300, "pH": 7.2}
+
+# Header spellings in SHC portal exports, lowercased with units and punctuation removed
+COLUMN_ALIASES = {
+    "N": ("n", "nitrogen", "availablen", "availablenitrogen"),
+    "P": ("p", "phosphorus", "phosphorous", "availablep", "availablephosphorus"),
+    "K": ("k", "potassium", "availablek", "availablepotassium"),
+    "pH": ("ph", "phvalue", "soilph"),
+    "OC": ("oc", "organiccarbon", "soilorganiccarbon"),
+    "lat": ("lat", "latitude"),
+    "lon": ("lon", "lng", "long", "longitude"),
+    "village": ("village", "villagename"),
+    "district": ("district", "districtname"),
+}
+
+
+def _header_key(header):
+    text = re.sub(r"\(.*?\)|\[.*?\]", "", str(header or "")).lower()
+    return re.sub(r"[^a-z0-9]", "", text)
+
+
+def map_columns(header):
+    """
+    Find the column index of every known field in a header row.
+    
+    Args:
+        header (list): Header cells as exported
+    
+    Returns:
+        dict: Field name -> column index, for the fields present
+    """
+    lookup = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    columns = {}
+    for i, cell in enumerate(header):
+        field = lookup.get(_header_key(cell))
+        if field and field not in columns:
+            columns[field] = i
+    return columns
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    # "1,234", "<0.5", " 7.2 "; anything else ("NA", "-") is missing
+    try:
+        return float(str(value).strip().replace(",", "").lstrip("<>"))
+    except ValueError:
+        return np.nan
+
+
+def _name(value):
+    return " ".join(str(value or "").lower().split())
+
+
+def read_rows(path):
+    """
+    Stream the header and data rows of a CSV or XLSX export.
+    
+    Yields:
+        list: Header first, then one list of cells per row
+    """
+    if str(path).lower().endswith((".xlsx", ".xlsm")):
+        if openpyxl is None:
+            raise RuntimeError("openpyxl is required to read XLSX soil card exports")
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            yield from csv.reader(f)
+
+
+def normalize_values(values, ranges=None):
+    """
+    Fix units and drop implausible readings in place.
+    
+    Args:
+        values (np.ndarray): (rows, len(NUTRIENTS)) raw readings, NaN where missing
+        ranges (dict): Nutrient -> (low, high), defaults to SOIL_HEALTH_CONFIG["ranges"]
+    
+    Returns:
+        np.ndarray: Per-nutrient count of rejected readings
+    """
+    ranges = ranges or SOIL_HEALTH_CONFIG["ranges"]
+    oc = values[:, NUTRIENTS.index("OC")]
+    # Some labs report organic carbon in g/kg rather than %
+    oc[(oc > ranges["OC"][1]) & (oc <= ranges["OC"][1] * 10)] /= 10
+    
+    rejected = np.zeros(len(NUTRIENTS), dtype=np.int64)
+    for j, nutrient in enumerate(NUTRIENTS):
+        low, high = ranges[nutrient]
+        column = values[:, j]
+        bad = (column < low) | (column > high)
+        rejected[j] = int(bad.sum())
+        column[bad] = np.nan
+    return rejected
+
+
+class SoilAggregator:
+    """Running per-key sums and counts, merged one chunk of rows at a time"""
+    
+    def __init__(self):
+        self.index = {}
+        self.sums = np.zeros((1024, len(NUTRIENTS)))
+        self.counts = np.zeros((1024, len(NUTRIENTS)), dtype=np.int64)
+    
+    def add(self, keys, values):
+        """Fold (len(keys), len(NUTRIENTS)) readings, NaN where missing, into the totals"""
+        if len(keys) == 0:
+            return
+        unique, inverse = np.unique(np.asarray(keys), return_inverse=True)
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        chunk_sums = np.stack([
+            np.bincount(inverse, weights=filled[:, j], minlength=len(unique))
+            for j in range(len(NUTRIENTS))
+        ], axis=1)
+        chunk_counts = np.stack([
+            np.bincount(inverse, weights=valid[:, j], minlength=len(unique))
+            for j in range(len(NUTRIENTS))
+        ], axis=1).astype(np.int64)
+        
+        rows = np.fromiter(
+            (self.index.setdefault(key, len(self.index)) for key in unique.tolist()),
+            dtype=np.int64,
+            count=len(unique)
+        )
+        if len(self.index) > len(self.sums):
+            grow = max(len(self.index), 2 * len(self.sums)) - len(self.sums)
+            self.sums = np.vstack([self.sums, np.zeros((grow, len(NUTRIENTS)))])
+            self.counts = np.vstack([self.counts, np.zeros((grow, len(NUTRIENTS)), dtype=np.int64)])
+        self.sums[rows] += chunk_sums
+        self.counts[rows] += chunk_counts
+    
+    def means(self, min_samples):
+        """Keys, per-nutrient means (NaN below min_samples) and sample counts"""
+        n = len(self.index)
+        counts = self.counts[:n]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.sums[:n] / counts
+        means[counts < min_samples] = np.nan
+        keep = ~np.all(np.isnan(means), axis=1)
+        keys = np.array(list(self.index), dtype=str)
+        return keys[keep], means[keep], counts.max(axis=1)[keep]
+
+
+_ALPHABET = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+
+
+def _geohash_codes(lat, lon, precision):
+    """Integer geohash codes for coordinate arrays, 5 * precision interleaved bits"""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    lat_q = np.clip(((lat + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+    lon_q = np.clip(((lon + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+    # Interleave from the most significant bit: longitude, latitude, longitude, ...
+    code = np.zeros(len(lat), dtype=np.int64)
+    for i in range(bits):
+        if i % 2 == 0:
+            bit = (lon_q >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_q >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+    return code
+
+
+def _geohash_strings(codes, precision):
+    chars = np.stack([
+        _ALPHABET[(codes >> (5 * (precision - 1 - i))) & 31] for i in range(precision)
+    ], axis=1)
+    return np.ascontiguousarray(chars).view(f"<U{precision}").ravel()
+
+
+def chunk_keys(lat, lon, districts, villages, precision, levels):
+    """
+    Store keys for a chunk of rows.
+    
+    Each row maps to its geohash cell and parent cells (when it has valid
+    coordinates), its village and its district.
+    
+    Returns:
+        tuple: (keys, row indices), parallel arrays
+    """
+    rows = np.arange(len(lat))
+    keys = []
+    owners = []
+    
+    geo = (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & ~((lat == 0) & (lon == 0))
+    if geo.any():
+        codes = _geohash_codes(lat[geo], lon[geo], precision)
+        for level in range(levels + 1):
+            cells = _geohash_strings(codes >> (5 * level), precision - level)
+            keys.append(np.char.add("gh:", cells))
+            owners.append(rows[geo])
+    
+    districts = np.asarray(districts, dtype=str)
+    villages = np.asarray(villages, dtype=str)
+    named = districts != ""
+    if named.any():
+        keys.append(np.char.add("d:", districts[named]))
+        owners.append(rows[named])
+        with_village = named & (villages != "")
+        if with_village.any():
+            keys.append(np.char.add(np.char.add(np.char.add("v:", districts[with_village]), "/"), villages[with_village]))
+            owners.append(rows[with_village])
+    
+    if not keys:
+        return np.array([], dtype=str), np.array([], dtype=np.int64)
+    return np.concatenate(keys), np.concatenate(owners)
+
+
+def ingest(paths, output_dir=None, config=SOIL_HEALTH_CONFIG):
+    """
+    Stream soil card exports into a new soil store.
+    
+    Args:
+        paths (list): CSV / XLSX export files
+        output_dir (str): Store directory, defaults to settings.SOIL_STORE_DIR
+        config (dict): Precision, chunk size, minimum samples and valid ranges
+    
+    Returns:
+        dict: Manifest of the written store (row, rejection and key counts)
+    """
+    output_dir = output_dir or settings.SOIL_STORE_DIR
+    precision = config["geohash_precision"]
+    levels = config["fallback_levels"]
+    chunk_rows = config["chunk_rows"]
+    aggregator = SoilAggregator()
+    stats = {"rows": 0, "rows_without_location": 0, "rows_without_values": 0}
+    rejected = np.zeros(len(NUTRIENTS), dtype=np.int64)
+    start = time.perf_counter()
+    
+    for path in paths:
+        rows = read_rows(path)
+        header = next(rows, None)
+        columns = map_columns(header or [])
+        missing = [n for n in NUTRIENTS if n not in columns]
+        if len(missing) == len(NUTRIENTS):
+            logger.warning(f"{path}: no soil nutrient columns found, skipped")
+            continue
+        if missing:
+            logger.info(f"{path}: no column for {', '.join(missing)}")
+        
+        fields = [columns.get(name) for name in NUTRIENTS + ("lat", "lon", "district", "village")]
+        width = max(i for i in fields if i is not None) + 1
+        
+        while True:
+            # Pull a chunk of rows, then validate, key and aggregate it vectorized
+            chunk = []
+            for row in rows:
+                if len(row) < width:
+                    row = list(row) + [None] * (width - len(row))
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    break
+            if not chunk:
+                break
+            stats["rows"] += len(chunk)
+            
+            def column(i, parse):
+                return [parse(row[i]) for row in chunk] if i is not None else [parse(None)] * len(chunk)
+            
+            values = np.array([column(i, _number) for i in fields[:len(NUTRIENTS)]], dtype=np.float64).T
+            lat, lon = (np.array(column(i, _number), dtype=np.float64) for i in fields[5:7])
+            rejected += normalize_values(values, config["ranges"])
+            
+            keys, owners = chunk_keys(lat, lon, column(fields[7], _name), column(fields[8], _name), precision, levels)
+            located = np.zeros(len(chunk), dtype=bool)
+            located[owners] = True
+            has_values = ~np.all(np.isnan(values), axis=1)
+            stats["rows_without_location"] += int((~located).sum())
+            stats["rows_without_values"] += int((located & ~has_values).sum())
+            
+            # One row counts towards every key it maps to: cell, parent cells, village, district
+            keep = has_values[owners]
+            aggregator.add(keys[keep], values[owners[keep]])
+            
+            if len(chunk) < chunk_rows:
+                break
+        logger.info(f"{path}: {stats['rows']} rows read so far")
+    
+    keys, means, samples = aggregator.means(config["min_samples"])
+    manifest = {
+        "version": STORE_VERSION,
+        "precision": precision,
+        "fallback_levels": levels,
+        "columns": list(NUTRIENTS),
+        "keys": int(len(keys)),
+        "rejected_values": dict(zip(NUTRIENTS, rejected.tolist())),
+        "sources": [os.path.basename(p) for p in paths],
+        "seconds": round(time.perf_counter() - start, 2),
+        **stats,
+    }
+    write_store(output_dir, keys, means, samples, manifest)
+    return manifest
+
+
+def write_store(output_dir, keys, means, samples, manifest):
+    """Write the columns to a staging directory, then swap it in whole"""
+    staging = output_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    
+    np.save(os.path.join(staging, "keys.npy"), keys)
+    np.save(os.path.join(staging, "samples.npy"), samples.astype(np.int32))
+    for j, nutrient in enumerate(NUTRIENTS):
+        np.save(os.path.join(staging, f"{nutrient}.npy"), np.ascontiguousarray(means[:, j], dtype=np.float32))
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    
+    previous = output_dir.rstrip(os.sep) + ".old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, previous)
+    os.replace(staging, output_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    logger.info(f"Soil store written to {output_dir}: {manifest['keys']} keys")
+
+
+class SoilStore:
+    """Averaged soil card values per geohash cell, village and district"""
+    
+    def __init__(self, store_dir=None, reload_seconds=None):
+        self.store_dir = store_dir or settings.SOIL_STORE_DIR
+        self.reload_seconds = settings.SOIL_STORE_RELOAD_SECONDS if reload_seconds is None else reload_seconds
+        self.index = {}
+        self.columns = {}
+        self.samples = None
+        self.precision = SOIL_HEALTH_CONFIG["geohash_precision"]
+        self.levels = SOIL_HEALTH_CONFIG["fallback_levels"]
+        self.manifest = {}
+        # Everything lookup() reads, swapped as one tuple so readers never mix two stores
+        self._tables = (self.index, self.columns, self.samples, self.precision, self.levels)
+        self._loaded_mtime = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self._load()
+    
+    @property
+    def available(self):
+        return bool(self._tables[0])
+    
+    def _manifest_mtime(self):
+        try:
+            return os.stat(os.path.join(self.store_dir, MANIFEST_FILE)).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _load(self):
+        self._checked_at = time.monotonic()
+        self._loaded_mtime = self._manifest_mtime()
+        if self._loaded_mtime is None:
+            logger.info("No soil store found, using default soil parameters")
+            return
+        try:
+            with open(os.path.join(self.store_dir, MANIFEST_FILE), encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != STORE_VERSION:
+                logger.info("Soil store has an old version, using default soil parameters")
+                return
+            
+            keys = np.load(os.path.join(self.store_dir, "keys.npy"))
+            columns = {
+                name: np.load(os.path.join(self.store_dir, f"{name}.npy"), mmap_mode="r")
+                for name in manifest["columns"]
+            }
+            samples = np.load(os.path.join(self.store_dir, "samples.npy"), mmap_mode="r")
+            index = {key: row for row, key in enumerate(keys.tolist())}
+        except Exception as e:
+            logger.warning(f"Could not load soil store: {e}")
+            return
+        
+        self.index, self.columns, self.samples = index, columns, samples
+        self.precision = manifest["precision"]
+        self.levels = manifest["fallback_levels"]
+        self.manifest = manifest
+        self._tables = (index, columns, samples, self.precision, self.levels)
+        logger.info(f"Soil store loaded: {len(index)} keys")
+    
+    def refresh(self):
+        """
+        Load the store again if it was rebuilt since it was loaded.
+        
+        The manifest is checked at most every reload_seconds; the old columns
+        stay mapped for lookups already running on them.
+        
+        Returns:
+            bool: True when a new store was loaded
+        """
+        if time.monotonic() - self._checked_at < self.reload_seconds:
+            return False
+        with self._reload_lock:
+            if time.monotonic() - self._checked_at < self.reload_seconds:
+                return False
+            self._checked_at = time.monotonic()
+            if self._manifest_mtime() == self._loaded_mtime:
+                return False
+            self._load()
+            return True
+    
+    def lookup(self, *locations):
+        """
+        Soil card averages for the first location the store covers.
+        
+        Args:
+            *locations: (lat, lon) tuples, dicts with "lat" / "lon", or
+                "village, district" / district strings, most precise first
+        
+        Returns:
+            dict: Nutrient values plus "samples" and "source" (the matched
+            key), or None when nothing matches
+        """
+        self.refresh()
+        index, columns, samples, precision, levels = self._tables
+        if not index:
+            return None
+        for location in locations:
+            for key in self._keys(location, precision, levels):
+                row = index.get(key)
+                if row is not None:
+                    params = {
+                        name: round(float(column[row]), 2)
+                        for name, column in columns.items()
+                        if not np.isnan(column[row])
+                    }
+                    params["samples"] = int(samples[row])
+                    params["source"] = key
+                    return params
+        return None
+    
+    @staticmethod
+    def _keys(location, precision, levels):
+        # Finest cell first, then parent cells, then administrative names
+        if isinstance(location, dict) and "lat" in location and "lon" in location:
+            location = (location["lat"], location["lon"])
+        if isinstance(location, (tuple, list)) and len(location) == 2:
+            code = geohash(float(location[0]), float(location[1]), precision)
+            return [f"gh:{code[:precision - level]}" for level in range(levels + 1)]
+        if isinstance(location, str) and location.strip():
+            parts = [_name(part) for part in location.split(",") if part.strip()]
+            keys = [f"v:{parts[1]}/{parts[0]}"] if len(parts) > 1 else []
+            return keys + [f"d:{part}" for part in parts]
+        return []
+
+
+def soil_params(measured=None):
+    """
+    Parameters for crop recommendations, measured where known.
+    
+    Args:
+        measured (dict): SoilStore.lookup() result, or None
+    
+    Returns:
+        dict: N, P, K and pH, falling back to DEFAULT_SOIL_PARAMS per nutrient
+    """
+    params = dict(DEFAULT_SOIL_PARAMS)
+    for name in params:
+        if measured and name in measured:
+            params[name] = measured[name]
+    return params
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_soil_store():
+    """
+    Process-wide soil store, loaded on first use and reloaded by lookup()
+    after the scheduler rebuilds it.
+    
+    Returns:
+        SoilStore: Shared instance (empty when no store has been ingested)
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SoilStore()
+    return _store
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Ingest Soil Health Card exports into the soil store")
+    parser.add_argument("paths", nargs="+", help="CSV or XLSX exports")
+    parser.add_argument("--output", help="Store directory", default=None)
+    args = parser.parse_args()
+    print(json.dumps(ingest(args.paths, args.output), indent=2))
@@ -0,0 +1,68 @@
+import logging
+from config.constants import DISEASES
+from modules.knowledge_base import get_knowledge_base
+from nlp.bm25 import BM25Index
+from nlp.text import analyze
+
+logger = logging.getLogger(__name__)
+
+# Field weights: names are strong evidence, descriptions weak
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "hindi_name": 3.0,
+    "symptoms": 2.0,
+    "description": 1.0,
+}
+
+
+class SymptomSearch:
+    """BM25 search over disease names, symptoms and descriptions"""
+    
+    def __init__(self, kb=None):
+        self.kb = kb or get_knowledge_base()
+        self.index = BM25Index()
+        
+        for key, disease in self.kb.diseases.items():
+            # The constants copy carries shorter symptom phrasings; index both
+            extra = DISEASES.get(key, {})
+            fields = []
+            for field, weight in FIELD_WEIGHTS.items():
+                values = [getattr(disease, field, None), extra.get(field)]
+                text = " ".join(
+                    " ".join(v) if isinstance(v, (list, tuple)) else v
+                    for v in values if v
+                )
+                fields.append((analyze(text), weight))
+            self.index.add(key, fields)
+        
+        self.index.build()
+    
+    def search(self, text, crop=None, k=3):
+        """
+        Rank diseases for a free-text symptom description.
+        
+        Args:
+            text (str): Farmer's description, English or Devanagari
+            crop (str): Optional crop to restrict results to its diseases
+            k (int): Number of results
+        
+        Returns:
+            list: {"disease", "name", "score"} dicts, best first
+        """
+        allowed = None
+        if crop and crop != "Select":
+            allowed = set(self.kb.diseases_for_crop(crop))
+        
+        return [
+            {"disease": key, "name": self.kb.diseases[key].name, "score": round(score, 3)}
+            for key, score in self.index.search(analyze(text), k, allowed)
+        ]
+    
+    def best_match(self, text, crop=None, min_score=2.0, min_margin=1.3):
+        """Top disease when it clearly beats the runner-up, else None"""
+        results = self.search(text, crop, k=2)
+        if not results or results[0]["score"] < min_score:
+            return None
+        if len(results) > 1 and results[0]["score"] < min_margin * results[1]["score"]:
+            return None
+        return results[0]["disease"]
@@ -1,18 +1,77 @@
 import requests
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from config import settings
+from utils.admission import admit
+from utils.cache import get_cache
+from utils.singleflight import get_flight
 
 logger = logging.getLogger(__name__)
 
 class WeatherAPI:
     """OpenWeather API integration"""
     
+    # Most recently used locations kept in latest; older ones are in the shared cache
+    LATEST_MAX = 1024
+    
     def __init__(self, api_key):
         self.api_key = api_key
         self.base_url = "https://api.openweathermap.org/data/2.5"
+        # Last good snapshot per normalized location, for batch consumers
+        self.latest = OrderedDict()
+        self._latest_lock = threading.Lock()
+        # Shared with the other worker processes
+        self.cache = get_cache("weather", settings.WEATHER_CACHE_HOURS * 3600)
     
     def get_weather(self, location):
-        """Get current weather"""
+        """Get current weather, sharing one upstream call per location"""
+        key = " ".join(str(location).lower().split())
+        weather = self.cache.get(key)
+        if weather is None:
+            weather = get_flight("weather").do(key, self._fetch_and_cache, key, location)
+        if "error" not in weather:
+            with self._latest_lock:
+                self.latest[key] = weather
+                self.latest.move_to_end(key)
+                if len(self.latest) > self.LATEST_MAX:
+                    self.latest.popitem(last=False)
+        return weather
+    
+    def snapshots(self):
+        """Copy of the recent good readings by location, e.g. for DiseaseRiskEngine.risk_table"""
+        with self._latest_lock:
+            return dict(self.latest)
+    
+    def refresh(self, location):
+        """Fetch and cache current weather even if a cached reading exists"""
+        key = " ".join(str(location).lower().split())
+        return get_flight("weather").do(key, self._fetch_and_cache, key, location)
+    
+    def _fetch_and_cache(self, key, location):
+        if not admit("openweather"):
+            return self._stale_weather(key)
+        weather = self._fetch_weather(location)
+        if "error" not in weather:
+            self.cache.set(key, weather)
+            self.cache.set(("stale", key), weather, settings.WEATHER_STALE_HOURS * 3600)
+        return weather
+    
+    def _stale_weather(self, key):
+        """Last good reading while the OpenWeather budget is spent"""
+        weather = self.cache.get(("stale", key))
+        if weather is None:
+            logger.warning("OpenWeather budget exhausted and no earlier reading to serve")
+            return {
+                "error": "Weather quota exhausted",
+                "temp": 25,
+                "humidity": 60
+            }
+        return dict(weather, stale=True)
+    
+    def _fetch_weather(self, location):
+        """Fetch current weather from OpenWeather"""
         try:
             # Geocode
             geo_url = f"{self.base_url}/weather"
@@ -30,9 +89,13 @@ class WeatherAPI:
                     "location": location,
                     "temp": data["main"]["temp"],
                     "humidity": data["main"]["humidity"],
-                    "description": data["weather"]["description"],
+                    "description": data["weather"][0]["description"],
                     "wind_speed": data["wind"]["speed"],
-                    "pressure": data["main"]["pressure"]
+                    "pressure": data["main"]["pressure"],
+                    "lat": data["coord"]["lat"],
+                    "lon": data["coord"]["lon"],
+                    "country": data.get("sys", {}).get("country"),
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
                 }
             else:
                 return {
@@ -1,3 +1,19 @@
-from .translator import MultilingualProcessor
-__all__ = ['MultilingualProcessor']
-translator = MultilingualProcessor()
+import importlib
+
+# Exports load on first access, so importing a leaf module such as nlp.bm25
+# does not pull in the router, the translator or their dependencies
+_EXPORTS = {
+    'MultilingualProcessor': 'translator',
+    'IntentRouter': 'intent_router',
+    'Localizer': 'localization',
+    'get_localizer': 'localization',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'nlp' has no attribute '{name}'")
+    return getattr(importlib.import_module(f".{module}", __name__), name)
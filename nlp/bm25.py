@@ -0,0 +1,76 @@
+import math
+from collections import defaultdict
+
+
+class BM25Index:
+    """Inverted index with precomputed BM25 impact scores per posting"""
+    
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self._docs = []
+        self.postings = {}
+    
+    def add(self, doc_id, weighted_tokens):
+        """
+        Queue a document for indexing.
+        
+        Args:
+            doc_id: Identifier returned by search()
+            weighted_tokens (list): (tokens, weight) pairs, one per field
+        """
+        tf = defaultdict(float)
+        length = 0.0
+        for tokens, weight in weighted_tokens:
+            for token in tokens:
+                tf[token] += weight
+                length += weight
+        self.doc_ids.append(doc_id)
+        self._docs.append((tf, length))
+    
+    def build(self):
+        """Compute per-posting scores so queries only sum and rank"""
+        n_docs = len(self._docs)
+        avg_length = sum(length for _, length in self._docs) / n_docs if n_docs else 0.0
+        df = defaultdict(int)
+        for tf, _ in self._docs:
+            for term in tf:
+                df[term] += 1
+        
+        postings = defaultdict(list)
+        for doc, (tf, length) in enumerate(self._docs):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1
+            for term, freq in tf.items():
+                idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+                postings[term].append((doc, idf * freq * (self.k1 + 1) / (freq + norm)))
+        
+        self.postings = dict(postings)
+        return self
+    
+    def search(self, query_tokens, k=5, allowed=None):
+        """
+        Rank documents for a tokenized query.
+        
+        Args:
+            query_tokens (list): Analyzed query tokens
+            k (int): Number of results
+            allowed (set): Optional doc_ids to restrict results to
+        
+        Returns:
+            list: (doc_id, score) pairs, best first
+        """
+        scores = defaultdict(float)
+        for term in set(query_tokens):
+            for doc, impact in self.postings.get(term, ()):
+                scores[doc] += impact
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for doc, score in ranked:
+            doc_id = self.doc_ids[doc]
+            if allowed is None or doc_id in allowed:
+                results.append((doc_id, score))
+                if len(results) == k:
+                    break
+        return results
@@ -0,0 +1,191 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config.constants import RETRIEVAL_CONFIG
+from nlp.text import normalize
+from utils.metrics import get_tracker
+from utils.threads import pin_torch_threads
+
+logger = logging.getLogger(__name__)
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def load_encoder(model_name):
+    """
+    Process-wide sentence-transformers model, loaded once per name.
+    
+    Args:
+        model_name (str): Hugging Face model id
+    
+    Returns:
+        SentenceTransformer: Shared model, or None when it cannot be loaded
+    """
+    with _encoders_lock:
+        if model_name not in _encoders:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _encoders[model_name] = SentenceTransformer(model_name, device="cpu")
+                logger.info(f"Embedding model loaded: {model_name}")
+            except Exception as e:
+                logger.warning(f"Embedding model '{model_name}' unavailable: {e}")
+                _encoders[model_name] = None
+        return _encoders[model_name]
+
+
+def is_english(language):
+    """True for English or an unknown language"""
+    return not language or str(language).lower() in ("en", "english")
+
+
+class _Request:
+    """Texts waiting for the batcher, with a slot for their vectors"""
+    
+    __slots__ = ("texts", "vectors", "error", "done")
+    
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingService:
+    """Micro-batching encoder with an LRU query cache, shared by all sessions"""
+    
+    def __init__(self, model_name, config=RETRIEVAL_CONFIG):
+        self.model_name = model_name
+        self.max_batch = config["embedding_batch_size"]
+        self.max_wait = config["embedding_batch_wait_ms"] / 1000.0
+        self.cache_size = config["embedding_cache_size"]
+        self.encoder = load_encoder(model_name)
+        
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.stats = {"requests": 0, "cache_hits": 0, "batches": 0, "encoded": 0}
+        
+        if self.encoder is not None:
+            # Shares the process-wide thread budget with a local LLM
+            pin_torch_threads()
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, name=f"embed-{model_name}", daemon=True).start()
+    
+    @property
+    def available(self):
+        return self.encoder is not None
+    
+    def encode(self, texts, cache=True):
+        """
+        Unit-normalized float32 embeddings, ready for inner-product search.
+        
+        Concurrent callers are coalesced into one encode call; query texts
+        are cached by their normalized form.
+        
+        Args:
+            texts (list): Strings to embed
+            cache (bool): Set False for bulk document indexing
+        
+        Returns:
+            np.ndarray: (len(texts), dim) C-contiguous array
+        """
+        if not self.available:
+            raise RuntimeError(f"Embedding model '{self.model_name}' is not loaded")
+        
+        keys = [normalize(text) for text in texts]
+        if not cache:
+            return self._encode_direct(keys)
+        
+        found = {}
+        with self._cache_lock:
+            self.stats["requests"] += len(keys)
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            self.stats["cache_hits"] += len(found)
+        
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing:
+            request = _Request(missing)
+            self._queue.put(request)
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+            with self._cache_lock:
+                for key, vector in zip(missing, request.vectors):
+                    found[key] = self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
+        return np.ascontiguousarray(np.stack([found[key] for key in keys]), dtype=np.float32)
+    
+    def _encode_direct(self, texts):
+        vectors = self.encoder.encode(
+            texts,
+            batch_size=self.max_batch,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+    
+    def _run(self):
+        tracker = get_tracker(f"embedding.{self.model_name}.batch")
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            # Wait a few milliseconds for concurrent callers to join the batch
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            
+            texts = list(dict.fromkeys(text for request in batch for text in request.texts))
+            start = time.monotonic()
+            try:
+                vectors = dict(zip(texts, self._encode_direct(texts)))
+                for request in batch:
+                    request.vectors = [vectors[text] for text in request.texts]
+            except Exception as e:
+                logger.warning(f"Embedding batch failed: {e}")
+                tracker.record_error()
+                for request in batch:
+                    request.error = e
+            else:
+                tracker.record(time.monotonic() - start)
+                self.stats["batches"] += 1
+                self.stats["encoded"] += len(texts)
+            finally:
+                for request in batch:
+                    request.done.set()
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name=None):
+    """
+    Process-wide embedding service for a model, created on first use.
+    
+    Args:
+        model_name (str): Hugging Face model id, defaults to RETRIEVAL_CONFIG["embedding_model"]
+    
+    Returns:
+        EmbeddingService: Shared service; check .available before encoding
+    """
+    model_name = model_name or RETRIEVAL_CONFIG["embedding_model"]
+    with _services_lock:
+        if model_name not in _services:
+            _services[model_name] = EmbeddingService(model_name)
+        return _services[model_name]
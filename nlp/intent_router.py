@@ -0,0 +1,263 @@
+import logging
+from datetime import datetime
+import numpy as np
+from config.constants import MANDIS, RETRIEVAL_CONFIG
+from modules.knowledge_base import get_knowledge_base
+from nlp.embeddings import get_embedding_service
+from nlp.text import ngrams, tokenize
+from utils.helpers import format_price_response, format_weather_response, get_disease_treatment
+
+logger = logging.getLogger(__name__)
+
+# Keyword and phrase weights per intent, in English and the supported Indic languages
+INTENT_KEYWORDS = {
+    "price": {
+        "price": 1.0, "prices": 1.0, "rate": 0.8, "rates": 0.8, "bhav": 1.0, "mandi": 1.0,
+        "market": 0.8, "sell": 0.6, "msp": 1.0, "cost of": 0.4, "per quintal": 0.8,
+        "भाव": 1.0, "दाम": 1.0, "कीमत": 1.0, "मंडी": 1.0, "बाजार": 0.8, "दर": 0.8, "बाजारभाव": 1.0,
+        "ભાવ": 1.0, "બજાર": 0.8, "விலை": 1.0, "சந்தை": 0.8,
+    },
+    "weather": {
+        "weather": 1.0, "rain": 0.8, "rainfall": 0.8, "temperature": 0.8, "forecast": 1.0,
+        "humidity": 0.8, "mausam": 1.0,
+        "मौसम": 1.0, "बारिश": 0.8, "तापमान": 0.8, "हवामान": 1.0, "पाऊस": 0.8,
+        "હવામાન": 1.0, "વરસાદ": 0.8, "வானிலை": 1.0, "மழை": 0.8,
+    },
+    "disease": {
+        "disease": 1.0, "treat": 1.0, "treatment": 1.0, "cure": 1.0, "control": 0.5,
+        "pest": 0.8, "fungus": 0.8, "infection": 0.8, "symptoms": 0.6, "rog": 1.0,
+        "रोग": 1.0, "बीमारी": 1.0, "इलाज": 1.0, "उपचार": 1.0, "कीड़": 0.8,
+        "રોગ": 1.0, "ઉપચાર": 1.0, "நோய்": 1.0, "சிகிச்சை": 1.0,
+    },
+    "scheme": {
+        "scheme": 1.0, "schemes": 1.0, "yojana": 1.0, "subsidy": 1.0, "eligible": 0.8,
+        "pension": 0.6, "loan": 0.6, "kisan credit card": 1.0, "pm kisan": 1.0, "insurance": 0.6,
+        "योजना": 1.0, "सब्सिडी": 1.0, "अनुदान": 1.0, "पात्र": 0.8, "कर्ज": 0.6, "ऋण": 0.6,
+        "યોજના": 1.0, "સબસિડી": 1.0, "திட்டம்": 1.0, "மானியம்": 1.0,
+    },
+}
+
+# English exemplars per intent; the multilingual encoder matches phrasings in
+# any supported language that the keyword tables miss
+INTENT_EXAMPLES = {
+    "price": [
+        "What is the market price of wheat today?",
+        "At what rate is cotton selling in the mandi?",
+        "How much will I get per quintal for my onions?",
+    ],
+    "weather": [
+        "What is the weather forecast for tomorrow?",
+        "Will it rain this week in my village?",
+        "How hot will it be today?",
+    ],
+    "disease": [
+        "How do I treat this disease on my crop?",
+        "There are spots on the leaves, what medicine should I spray?",
+        "Insects are eating my plants, how to control them?",
+    ],
+    "scheme": [
+        "Which government schemes can I apply for?",
+        "Am I eligible for any subsidy or farmer support money?",
+        "How do I get a crop loan from the government?",
+    ],
+}
+
+# Words that signal an open-ended question the templates cannot answer
+OPEN_ENDED = frozenset({"why", "should", "compare", "better", "explain", "plan", "क्यों", "चाहिए"})
+
+
+class IntentRouter:
+    """Keyword/n-gram intent classifier and entity extractor for structured questions"""
+    
+    def __init__(self, weather=None, market=None, min_score=0.8, min_similarity=0.6):
+        # The pipeline's WeatherAPI and MarketAPI, so fast-path answers share their
+        # cache, single-flight and quota; without them those intents go to the LLM
+        self.weather = weather
+        self.market = market
+        self.min_score = min_score
+        self.min_similarity = min_similarity
+        self.kb = get_knowledge_base()
+        self.crop_lexicon = self._build_lexicon(
+            (crop.key, [crop.key, crop.name, crop.hindi_name or ""] + list(crop.aliases or ()))
+            for crop in self.kb.crops.values()
+        )
+        self.disease_lexicon = self._build_lexicon(
+            (disease.key, [disease.key.replace("_", " "), disease.name, disease.hindi_name or ""])
+            for disease in self.kb.diseases.values()
+        )
+        # Imported here: symptom_search depends on nlp modules, so a module-level import is circular
+        from modules.symptom_search import SymptomSearch
+        self.symptoms = SymptomSearch(self.kb)
+        self.location_lexicon = {}
+        for market in MANDIS.values():
+            for place in (market["district"], market["state"]):
+                self.location_lexicon[" ".join(tokenize(place))] = place
+        
+        # Embedding fallback, only in multilingual mode
+        self.embedder = None
+        if RETRIEVAL_CONFIG.get("multilingual"):
+            self.embedder = get_embedding_service(RETRIEVAL_CONFIG["embedding_model"])
+        if self.embedder is not None and self.embedder.available:
+            self.example_intents = [i for i, examples in INTENT_EXAMPLES.items() for _ in examples]
+            self.example_vectors = self.embedder.encode(
+                [e for examples in INTENT_EXAMPLES.values() for e in examples],
+                cache=False
+            )
+        else:
+            self.embedder = None
+    
+    def route(self, text):
+        """
+        Classify a question and extract its entities.
+        
+        Returns:
+            dict: {"intent": "price" | "weather" | "disease" | "scheme" | "general",
+                   "confidence": float, "entities": {...}}
+        """
+        tokens = tokenize(text)
+        grams = list(ngrams(tokens, 3))
+        
+        scores = {
+            intent: sum(keywords.get(gram, 0.0) for gram in grams)
+            for intent, keywords in INTENT_KEYWORDS.items()
+        }
+        entities = {
+            "crop": self._match(grams, tokens, self.crop_lexicon),
+            "disease": self._match(grams, tokens, self.disease_lexicon),
+            "location": self._match(grams, tokens, self.location_lexicon),
+        }
+        # Described symptoms can identify the disease without naming it
+        if not entities["disease"] and scores["price"] == 0 and scores["weather"] == 0:
+            entities["disease"] = self.symptoms.best_match(text, entities["crop"])
+        # A named or clearly described disease is strong evidence on its own
+        if entities["disease"]:
+            scores["disease"] += 1.0
+        # No keyword hit: compare against the exemplars in embedding space
+        if not any(scores.values()):
+            intent, similarity = self._nearest_intent(text)
+            if intent and similarity >= self.min_similarity:
+                scores[intent] = 1.0
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+        total = sum(scores.values())
+        
+        intent = best
+        if best_score < self.min_score or runner_up > 0 or OPEN_ENDED.intersection(tokens):
+            intent = "general"
+        
+        return {
+            "intent": intent,
+            "confidence": round(best_score / total, 3) if total else 0.0,
+            "entities": entities,
+        }
+    
+    def respond(self, route, location=None, crop=None, language="en"):
+        """
+        Render a deterministic answer for a routed question.
+        
+        Args:
+            route (dict): Output of route()
+            location (str): Profile location used when the question names none
+            crop (str): Profile crop used when the question names none
+            language (str): Answer language; rendered from local templates
+        
+        Returns:
+            str: Answer, or None when the question should go to the LLM
+        """
+        entities = route["entities"]
+        intent = route["intent"]
+        location = entities["location"] or location
+        if entities["crop"]:
+            crop = self.kb.crops[entities["crop"]].name
+        elif crop == "Select":
+            crop = None
+        
+        try:
+            if intent == "price" and crop and location and self.market is not None:
+                prices = self._price_summary(crop, location)
+                return format_price_response(prices, language) if prices else None
+            
+            if intent == "weather" and location and self.weather is not None:
+                weather = self.weather.get_weather(location)
+                if "error" in weather:
+                    return None
+                return format_weather_response(self._weather_summary(weather), language)
+            
+            if intent == "disease" and entities["disease"]:
+                return get_disease_treatment(entities["disease"], language)
+        except Exception as e:
+            logger.warning(f"Intent handler failed, falling back to LLM: {e}")
+        
+        return None
+    
+    @staticmethod
+    def _weather_summary(weather):
+        """WeatherAPI reading in the shape the weather template expects"""
+        return {
+            "location": weather["location"],
+            "country": weather.get("country") or "IN",
+            "temperature": weather["temp"],
+            "humidity": weather["humidity"],
+            "pressure": weather.get("pressure", "-"),
+            "wind_speed": weather.get("wind_speed", "-"),
+            "description": weather.get("description", ""),
+            "timestamp": weather.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M"),
+        }
+    
+    def _price_summary(self, crop, location):
+        """Nearest mandi prices in the shape the price template expects, or None"""
+        markets = [
+            m for m in self.market.get_prices(crop, location=location).get("nearest_markets") or []
+            if m["price_per_quintal"] is not None
+        ]
+        if not markets:
+            return None
+        nearest = markets[0]
+        prices = [m["price_per_quintal"] for m in markets]
+        updated = [m["last_updated"] for m in markets if m["last_updated"]]
+        return {
+            "crop": crop,
+            "location": location,
+            "price_per_quintal": nearest["price_per_quintal"],
+            "price_per_kg": nearest["price_per_quintal"] / 100,
+            "min_price": min(prices),
+            "max_price": max(prices),
+            "avg_price": sum(prices) / len(prices),
+            # No price history is kept, so there is no trend to report
+            "trend": "-",
+            "market": ", ".join(f"{m['market']} ({m['distance_km']} km)" for m in markets),
+            "last_updated": max(updated) if updated else "-",
+        }
+    
+    def _nearest_intent(self, text):
+        """Intent of the most similar exemplar and its cosine similarity"""
+        if self.embedder is None:
+            return None, 0.0
+        similarities = self.example_vectors @ self.embedder.encode([text])[0]
+        best = int(np.argmax(similarities))
+        return self.example_intents[best], float(similarities[best])
+    
+    @staticmethod
+    def _build_lexicon(entries):
+        lexicon = {}
+        for key, names in entries:
+            for name in names:
+                phrase = " ".join(tokenize(name))
+                if phrase:
+                    lexicon[phrase] = key
+        return lexicon
+    
+    @staticmethod
+    def _match(grams, tokens, lexicon):
+        # Longest n-gram wins, so "leaf blight" beats "leaf"
+        for gram in sorted(grams, key=lambda g: g.count(" "), reverse=True):
+            if gram in lexicon:
+                return lexicon[gram]
+        # Indic scripts attach case markers to the word (ઘઉંનો = ઘઉં + નો)
+        for token in tokens:
+            if not token.isascii():
+                for end in range(len(token) - 1, 1, -1):
+                    if token[:end] in lexicon:
+                        return lexicon[token[:end]]
+        return None
@@ -0,0 +1,258 @@
+"""
+Localized rendering of structured answers.
+
+Weather, price and disease answers have a fixed shape, so instead of sending
+English markdown through DeepL they are rendered from per-language templates
+in data/locales/<code>.json. Knowledge-base terms (crop and disease names,
+weather conditions, trends) and the free-text disease fields come from the
+same file's glossary. A disease whose text is not all in a locale's glossary
+is left to the LLM rather than answered half in English. Entries are added
+by hand, or for the languages DeepL translates, with:
+    
+    python -m nlp.localization --build-glossary
+"""
+import argparse
+import json
+import logging
+import threading
+from pathlib import Path
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = "en"
+
+
+def format_number(value, decimals=0):
+    """
+    Format a number with Indian digit grouping (12,34,567.89).
+    
+    Args:
+        value (float): Number to format
+        decimals (int): Digits after the decimal point
+    
+    Returns:
+        str: Grouped number
+    """
+    sign = "-" if value < 0 else ""
+    whole, _, fraction = f"{abs(value):.{decimals}f}".partition(".")
+    # Last three digits, then groups of two
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    grouped = ",".join(groups + [tail])
+    return sign + grouped + (f".{fraction}" if fraction else "")
+
+
+class Localizer:
+    """Per-language templates, glossary and rupee formatting"""
+    
+    def __init__(self, locales_dir=None):
+        self.locales_dir = Path(locales_dir or settings.LOCALES_DIR)
+        self.locales = {}
+        for code in settings.SUPPORTED_LANGUAGES:
+            path = self.locales_dir / f"{code}.json"
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.locales[code] = json.load(f)
+            except FileNotFoundError:
+                logger.warning(f"Locale file not found: {path}")
+        # Accept both codes ("hi") and the names detect_language returns ("Hindi")
+        self.codes = {name.lower(): code for code, name in settings.SUPPORTED_LANGUAGES.items()}
+        self.codes.update({code: code for code in settings.SUPPORTED_LANGUAGES})
+    
+    def language_code(self, language):
+        """Locale code for a language code or name, English when unknown"""
+        code = self.codes.get(str(language or DEFAULT_LANGUAGE).lower(), DEFAULT_LANGUAGE)
+        return code if code in self.locales else DEFAULT_LANGUAGE
+    
+    def supports(self, language):
+        """True when answers can be rendered locally in this language"""
+        code = self.codes.get(str(language or "").lower())
+        return code in self.locales
+    
+    def term(self, text, language):
+        """Glossary translation of a knowledge-base term, or the term itself"""
+        if not text:
+            return text
+        glossary = self.locales[self.language_code(language)]["glossary"]
+        return glossary.get(" ".join(str(text).lower().split()), text)
+    
+    def has_terms(self, texts, language):
+        """True when every text has a glossary entry in the language (always for English)"""
+        code = self.language_code(language)
+        if code == DEFAULT_LANGUAGE:
+            return True
+        glossary = self.locales[code]["glossary"]
+        return all(" ".join(str(text).lower().split()) in glossary for text in texts if text)
+    
+    @staticmethod
+    def format_inr(amount, decimals=0):
+        """
+        Rupee amount with Indian grouping, e.g. ₹1,25,000.
+        
+        Args:
+            amount (float): Amount in rupees
+            decimals (int): Digits after the decimal point
+        
+        Returns:
+            str: Formatted amount
+        """
+        sign = "-" if amount < 0 else ""
+        return f"{sign}₹{format_number(abs(amount), decimals)}"
+    
+    def render(self, template, language, **values):
+        """Fill a named template in the given language"""
+        return self.locales[self.language_code(language)]["templates"][template].format(**values)
+    
+    def weather(self, weather, language=None):
+        """Localized weather answer for a get_weather_data() result"""
+        if not weather:
+            return self.render("weather_unavailable", language)
+        code = self.language_code(language)
+        condition = self.term(weather["description"], code)
+        return self.render(
+            "weather",
+            code,
+            location=weather["location"],
+            country=weather["country"],
+            temperature=format_number(weather["temperature"], 1),
+            humidity=weather["humidity"],
+            pressure=weather["pressure"],
+            wind_speed=weather["wind_speed"],
+            condition=condition.capitalize() if code == DEFAULT_LANGUAGE else condition,
+            timestamp=weather["timestamp"],
+        )
+    
+    def prices(self, prices, language=None):
+        """Localized price answer for a get_market_prices() result"""
+        if not prices:
+            return self.render("prices_unavailable", language)
+        code = self.language_code(language)
+        trend = self.term(prices["trend"], code)
+        return self.render(
+            "prices",
+            code,
+            crop=self.term(prices["crop"], code),
+            location=prices["location"],
+            price=self.format_inr(prices["price_per_quintal"]),
+            price_per_kg=self.format_inr(prices["price_per_kg"], decimals=2),
+            min_price=self.format_inr(prices["min_price"]),
+            max_price=self.format_inr(prices["max_price"]),
+            avg_price=self.format_inr(prices["avg_price"]),
+            trend=trend.capitalize() if code == DEFAULT_LANGUAGE else trend,
+            market=prices["market"],
+            last_updated=prices["last_updated"],
+        )
+    
+    def disease(self, name, info, language=None):
+        """Localized treatment answer for a knowledge-base disease entry, None if its text isn't in the glossary"""
+        if not info:
+            return self.render("disease_not_found", language, disease=name)
+        code = self.language_code(language)
+        texts = [info["description"]]
+        for field in ("symptoms", "treatment", "prevention"):
+            texts += list(info.get(field) or ())
+        if not self.has_terms(texts, code):
+            return None
+        
+        def bullets(items):
+            return "\n".join(f"• {self.term(item, code)}" for item in items or ())
+        
+        return self.render(
+            "disease",
+            code,
+            name=self.term(info["name"], code),
+            description=self.term(info["description"], code),
+            symptoms=bullets(info.get("symptoms")),
+            treatment=bullets(info.get("treatment")),
+            prevention=bullets(info.get("prevention")),
+        )
+
+
+_localizer = None
+_localizer_lock = threading.Lock()
+
+
+def get_localizer():
+    """
+    Process-wide localizer, loaded once on first use.
+    
+    Returns:
+        Localizer: Shared instance
+    """
+    global _localizer
+    if _localizer is None:
+        with _localizer_lock:
+            if _localizer is None:
+                _localizer = Localizer()
+    return _localizer
+
+
+def build_glossary(deepl_api_key, locales_dir=None):
+    """
+    Pre-translate free-text disease fields into every locale's glossary.
+    
+    Runs offline with DeepL so that rendering never calls it. Existing
+    glossary entries, including hand-written ones, are kept.
+    
+    Args:
+        deepl_api_key (str): DeepL API key
+        locales_dir (str): Directory with the <code>.json locale files
+    
+    Returns:
+        dict: Locale code -> number of entries added
+    """
+    from modules.knowledge_base import get_knowledge_base
+    from nlp.translator import MultilingualProcessor
+    
+    translator = MultilingualProcessor(deepl_api_key)
+    texts = set()
+    for disease in get_knowledge_base().diseases.values():
+        texts.add(disease.description)
+        for field in ("symptoms", "treatment", "prevention"):
+            texts.update(getattr(disease, field) or ())
+    texts.discard(None)
+    
+    locales_dir = Path(locales_dir or settings.LOCALES_DIR)
+    added = {}
+    for code, language in settings.SUPPORTED_LANGUAGES.items():
+        path = locales_dir / f"{code}.json"
+        if code == DEFAULT_LANGUAGE or not path.exists():
+            continue
+        with open(path, encoding="utf-8") as f:
+            locale = json.load(f)
+        glossary = locale["glossary"]
+        added[code] = 0
+        for text in sorted(texts):
+            key = " ".join(text.lower().split())
+            if key in glossary:
+                continue
+            translated = translator.translate_response(text, language)
+            # Unsupported DeepL targets come back unchanged
+            if translated and translated != text:
+                glossary[key] = translated
+                added[code] += 1
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(locale, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        logger.info(f"Glossary {code}: {added[code]} entries added")
+    return added
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Maintain localized answer templates")
+    parser.add_argument("--build-glossary", action="store_true", help="Pre-translate KB text with DeepL")
+    parser.add_argument("--locales-dir", default=None, help="Locale directory")
+    args = parser.parse_args()
+    if args.build_glossary:
+        if not settings.DEEPL_API_KEY:
+            parser.error("DEEPL_API_KEY is not configured")
+        print(json.dumps(build_glossary(settings.DEEPL_API_KEY, args.locales_dir), indent=2))
+    else:
+        parser.print_help()
@@ -0,0 +1,53 @@
+import re
+import unicodedata
+
+# Latin word characters plus every Brahmic script block from Devanagari to
+# Malayalam (minus the danda), so vowel signs stay inside their words
+TOKEN_PATTERN = re.compile("[0-9a-z\u0900-\u0963\u0966-\u0D7F]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "at", "be", "by", "do", "for", "from", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "what", "when",
+    "which", "with", "you", "your",
+    "का", "की", "के", "को", "में", "है", "हैं", "और", "से", "पर", "क्या",
+})
+
+
+def normalize(text):
+    """Lowercase, NFC-normalize and collapse whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+def tokenize(text, drop_stopwords=False):
+    """Split English and Indic-script text into word tokens"""
+    tokens = TOKEN_PATTERN.findall(normalize(text))
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in STOPWORDS]
+    return tokens
+
+
+def ngrams(tokens, max_n=3):
+    """All contiguous n-grams up to max_n, joined with spaces"""
+    for n in range(1, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            yield " ".join(tokens[i:i + n])
+
+
+def stem(token):
+    """Fold common English plurals (leaves -> leaf, spots -> spot)"""
+    if not token.isascii() or len(token) <= 3:
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith("ves"):
+        return token[:-3] + "f"
+    if token.endswith(("ches", "shes", "sses", "xes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def analyze(text):
+    """Tokens for search indexes: stopwords dropped, plurals folded"""
+    return [stem(token) for token in tokenize(text, drop_stopwords=True)]
@@ -1,6 +1,10 @@
 import deepl
 import langdetect
 import logging
+from config import settings
+from utils.admission import QuotaExceeded, admit
+from utils.cache import get_cache
+from utils.singleflight import get_flight
 
 logger = logging.getLogger(__name__)
 
@@ -12,15 +16,26 @@ class MultilingualProcessor:
         "hi": "Hindi",
         "mr": "Marathi",
         "gu": "Gujarati",
-        "ta": "Tamil"
+        "ta": "Tamil",
+        "kn": "Kannada",
+        "te": "Telugu",
+        "bn": "Bengali"
     }
     
-    def __init__(self, deepl_api_key):
+    # DeepL codes for the languages it translates; the rest pass through as-is
+    DEEPL_CODES = {
+        "English": "EN",
+        "Hindi": "HI",
+        "Tamil": "TA"
+    }
+    
+    def __init__(self, deepl_api_key=None):
         try:
-            self.translator = deepl.Translator(deepl_api_key)
+            self.translator = deepl.Translator(deepl_api_key) if deepl_api_key else None
         except Exception as e:
             logger.error(f"DeepL initialization failed: {e}")
             self.translator = None
+        self.cache = get_cache("translation", settings.TRANSLATION_CACHE_HOURS * 3600)
     
     def detect_language(self, text):
         """Detect language"""
@@ -32,40 +47,44 @@ class MultilingualProcessor:
     
     def translate_to_english(self, text, source_language):
         """Translate to English"""
-        if source_language == "English" or not self.translator:
+        source_code = self.DEEPL_CODES.get(source_language)
+        if source_code in (None, "EN") or not self.translator:
             return text
         
-        lang_map = {
-            "Hindi": "HI",
-            "Marathi": "EN",
-            "Tamil": "TA",
-            "Gujarati": "EN"
-        }
-        
         try:
-            source_code = lang_map.get(source_language, "EN")
-            result = self.translator.translate_text(text, source_lang=source_code, target_lang="EN")
-            return result.text
+            return self._translate(text, source_code, "EN")
         except Exception as e:
             logger.warning(f"Translation failed: {e}")
             return text
     
     def translate_response(self, text, target_language):
         """Translate response to target language"""
-        if target_language == "English" or not self.translator:
+        target_code = self.DEEPL_CODES.get(target_language)
+        if target_code in (None, "EN") or not self.translator:
             return text
         
-        lang_map = {
-            "Hindi": "HI",
-            "Marathi": "EN",
-            "Tamil": "TA",
-            "Gujarati": "EN"
-        }
-        
         try:
-            target_code = lang_map.get(target_language, "EN")
-            result = self.translator.translate_text(text, source_lang="EN", target_lang=target_code)
-            return result.text
+            return self._translate(text, "EN", target_code)
         except Exception as e:
             logger.warning(f"Translation failed: {e}")
             return text
+    
+    def _translate(self, text, source_code, target_code):
+        """DeepL call shared by concurrent identical requests and cached across workers"""
+        # Never pay DeepL to copy text into the language it is already in
+        if source_code == target_code:
+            return text
+        key = (source_code, target_code, " ".join(text.split()))
+        translated = self.cache.get(key)
+        if translated is None:
+            translated = get_flight("translation").do(key, self._translate_and_cache, key, text)
+        return translated
+    
+    def _translate_and_cache(self, key, text):
+        source_code, target_code, _ = key
+        # DeepL bills characters; callers fall back to the untranslated text
+        if not admit("deepl", len(text)):
+            raise QuotaExceeded("DeepL character budget exhausted")
+        translated = self.translator.translate_text(text, source_lang=source_code, target_lang=target_code).text
+        self.cache.set(key, translated)
+        return translated
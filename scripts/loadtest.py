@@ -0,0 +1,92 @@
+"""
+Closed-loop load test for the API service.
+
+Each of --concurrency threads sends requests back to back until --requests
+have completed, then throughput and latency percentiles are printed. Record
+the numbers from your own hardware; nothing here assumes a result.
+    
+    python scripts/loadtest.py --url http://localhost:8000 --endpoint chat --concurrency 16
+"""
+import argparse
+import json
+import threading
+import time
+import requests
+
+SCENARIOS = {
+    "chat": ("POST", "/v1/chat", {
+        "message": "What is the price of wheat in Nashik?",
+        "profile": {"location": "Nashik", "crop": "Wheat"},
+    }),
+    "chat_llm": ("POST", "/v1/chat", {
+        "message": "Should I irrigate my wheat this week?",
+        "profile": {"location": "Nashik", "crop": "Wheat"},
+    }),
+    "prices": ("GET", "/v1/prices?crop=Wheat&location=Nashik", None),
+    "weather": ("GET", "/v1/weather?location=Nashik", None),
+    "crops": ("POST", "/v1/crops/recommend", {"N": 200, "P": 40, "K": 300, "pH": 7.2}),
+}
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def run(url, endpoint, concurrency, total):
+    method, path, body = SCENARIOS[endpoint]
+    latencies = []
+    errors = [0]
+    remaining = [total]
+    lock = threading.Lock()
+    
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url + path, json=body, timeout=120)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+    
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    
+    ordered = sorted(latencies)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1) if ordered else None,
+        "p95_ms": round(percentile(ordered, 95) * 1000, 1) if ordered else None,
+        "p99_ms": round(percentile(ordered, 99) * 1000, 1) if ordered else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Farmer Copilot API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", choices=sorted(SCENARIOS), default="chat")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.url.rstrip("/"), args.endpoint, args.concurrency, args.requests), indent=2))
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+import utils.admission
+from config import settings
+from utils.admission import (
+    BATCH, INTERACTIVE, AdmissionController, SQLiteTokenBucket, TokenBucket, admission_priority,
+    admit, current_priority, get_admission,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+class TestTokenBucket:
+    def test_take_and_refill(self, clock):
+        bucket = TokenBucket("x", rate_per_minute=60, capacity=5)
+        assert all(bucket.take(1) == 0.0 for _ in range(5))
+        assert bucket.take(1) == pytest.approx(1.0)
+        clock[0] += 2
+        assert bucket.level() == pytest.approx(2.0)
+        clock[0] += 100
+        assert bucket.level() == pytest.approx(5.0)
+    
+    def test_floor_is_kept_for_higher_priorities(self, clock):
+        bucket = TokenBucket("x", rate_per_minute=60, capacity=10)
+        assert bucket.take(7, floor=3) == 0.0
+        assert bucket.take(1, floor=3) == pytest.approx(1.0)
+        assert bucket.take(3) == 0.0
+    
+    def test_oversized_call_goes_into_debt(self, clock):
+        bucket = TokenBucket("x", rate_per_minute=60, capacity=10)
+        assert bucket.take(25) == 0.0
+        assert bucket.level() == pytest.approx(-15.0)
+        # Refuses again until the debt is repaid and one full bucket is back
+        assert bucket.take(25) == pytest.approx(25.0)
+        assert bucket.take(1) == pytest.approx(16.0)
+    
+    def test_sqlite_bucket_is_shared(self, clock, tmp_path):
+        path = str(tmp_path / "quota.db")
+        first = SQLiteTokenBucket("deepl", 60, 4, path)
+        second = SQLiteTokenBucket("deepl", 60, 4, path)
+        assert first.take(3) == 0.0
+        assert second.level() == pytest.approx(1.0)
+        assert second.take(2) == pytest.approx(1.0)
+        assert SQLiteTokenBucket("hf", 60, 4, path).level() == pytest.approx(4.0)
+
+
+class TestAdmissionController:
+    def test_batch_cannot_spend_the_interactive_reserve(self):
+        controller = AdmissionController(TokenBucket("x", 1, 10), batch_reserve=0.3)
+        assert controller.acquire(7, BATCH, timeout=0)
+        assert not controller.acquire(1, BATCH, timeout=0)
+        assert controller.acquire(3, INTERACTIVE, timeout=0)
+        stats = controller.stats()
+        assert stats["admitted"] == {"interactive": 1, "batch": 1}
+        assert stats["rejected"] == {"interactive": 0, "batch": 1}
+        assert stats["units"] == 10
+    
+    def test_refuses_when_refill_outlasts_the_wait(self):
+        controller = AdmissionController(TokenBucket("x", 60, 1))
+        assert controller.acquire(1, INTERACTIVE, timeout=0)
+        start = time.monotonic()
+        assert not controller.acquire(1, INTERACTIVE, timeout=0.5)
+        assert time.monotonic() - start < 0.1
+    
+    def test_interactive_overtakes_queued_batch(self):
+        controller = AdmissionController(TokenBucket("x", 600, 1))
+        assert controller.acquire(1, INTERACTIVE, timeout=0)
+        order = []
+        
+        def call(priority):
+            if controller.acquire(1, priority, timeout=5):
+                order.append(priority)
+        
+        batch = threading.Thread(target=call, args=(BATCH,))
+        batch.start()
+        time.sleep(0.02)
+        interactive = threading.Thread(target=call, args=(INTERACTIVE,))
+        interactive.start()
+        batch.join()
+        interactive.join()
+        assert order == [INTERACTIVE, BATCH]
+    
+    def test_broken_bucket_admits(self):
+        class Broken(TokenBucket):
+            def take(self, cost, floor=0.0):
+                raise OSError("disk full")
+        assert AdmissionController(Broken("x", 60, 1)).acquire(timeout=0)
+
+
+class TestAdmit:
+    @pytest.fixture(autouse=True)
+    def controllers(self, monkeypatch):
+        monkeypatch.setattr(utils.admission, "_controllers", {})
+        monkeypatch.setattr(utils.admission, "_default_priority", INTERACTIVE)
+        monkeypatch.setattr(settings, "ADMISSION_DB_PATH", "")
+    
+    def test_unknown_upstream_is_always_admitted(self):
+        assert get_admission("nowhere") is None
+        assert admit("nowhere", cost=1e9)
+    
+    def test_configured_upstream_is_shared(self):
+        controller = get_admission("hf")
+        assert controller is get_admission("hf")
+        assert isinstance(controller.bucket, TokenBucket)
+        assert admit("hf")
+        assert controller.stats()["admitted"]["interactive"] == 1
+    
+    def test_priority_context(self):
+        assert current_priority() == INTERACTIVE
+        with admission_priority(BATCH):
+            assert current_priority() == BATCH
+        assert current_priority() == INTERACTIVE
@@ -0,0 +1,123 @@
+import time
+from collections import Counter
+
+import pytest
+
+from config import settings
+from utils.cache import Cache, MemoryCache, RedisCache, SQLiteCache, ShardedCache, create_backend
+
+
+class TestMemoryCache:
+    def test_expired_entries_are_misses(self, monkeypatch):
+        cache = MemoryCache()
+        cache.set("a", 1, 10)
+        assert cache.get("a") == 1
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 11)
+        assert cache.get("a") is None
+    
+    def test_evicts_least_recently_used(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", 1, 60)
+        cache.set("b", 2, 60)
+        cache.get("a")
+        cache.set("c", 3, 60)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+
+class TestSQLiteCache:
+    def test_round_trip_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "cache" / "shared.db")
+        SQLiteCache(path).set("k", {"price": [2310, "₹"]}, 60)
+        other = SQLiteCache(path)
+        assert other.get("k") == {"price": [2310, "₹"]}
+        other.delete("k")
+        assert other.get("k") is None
+    
+    def test_expired_entries_are_misses(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        cache.set("k", 1, -1)
+        assert cache.get("k") is None
+
+
+class TestCreateBackend:
+    @pytest.fixture
+    def unreachable_redis(self, monkeypatch, tmp_path):
+        def refuse(self, url):
+            raise ConnectionError(f"{url} refused")
+        monkeypatch.setattr(RedisCache, "__init__", refuse)
+        monkeypatch.setattr(settings, "DEFAULT_CACHE_URL", "sqlite://" + str(tmp_path / "shared.db"))
+    
+    def test_schemes(self, tmp_path):
+        assert isinstance(create_backend("memory://"), MemoryCache)
+        assert isinstance(create_backend(""), MemoryCache)
+        backend = create_backend("sqlite://" + str(tmp_path / "c.db"))
+        assert isinstance(backend, SQLiteCache)
+        assert backend.path == str(tmp_path / "c.db")
+    
+    def test_unknown_scheme(self):
+        with pytest.raises(ValueError):
+            create_backend("memcached://localhost:11211")
+    
+    def test_unreachable_redis_falls_back_to_sqlite(self, unreachable_redis, tmp_path):
+        backend = create_backend("redis://localhost:6379/0")
+        assert isinstance(backend, SQLiteCache)
+        assert backend.path == str(tmp_path / "shared.db")
+    
+    def test_shards_that_fell_back_share_one_node(self, unreachable_redis, tmp_path):
+        backend = create_backend("redis://a:6379/0, redis://b:6379/0")
+        assert isinstance(backend, SQLiteCache)
+        
+        backend = create_backend("redis://a:6379/0,redis://b:6379/0,memory://")
+        assert isinstance(backend, ShardedCache)
+        assert [node.name for node in backend.nodes] == ["sqlite:" + str(tmp_path / "shared.db"), "memory"]
+
+
+class TestShardedCache:
+    def nodes(self, count):
+        nodes = [MemoryCache() for _ in range(count)]
+        for i, node in enumerate(nodes):
+            node.name = f"node{i}"
+        return nodes
+    
+    def test_each_key_lives_on_one_node(self):
+        nodes = self.nodes(3)
+        cache = ShardedCache(nodes)
+        for i in range(300):
+            cache.set(f"k{i}", i, 60)
+        assert sum(len(node._entries) for node in nodes) == 300
+        assert all(cache.get(f"k{i}") == i for i in range(300))
+        owners = Counter(cache.node_for(f"k{i}").name for i in range(3000))
+        assert min(owners.values()) > 600
+    
+    def test_adding_a_node_moves_few_keys(self):
+        keys = [f"k{i}" for i in range(3000)]
+        nodes = self.nodes(4)
+        before = ShardedCache(nodes[:3])
+        after = ShardedCache(nodes)
+        moved = [k for k in keys if before.node_for(k) is not after.node_for(k)]
+        assert all(after.node_for(k) is nodes[3] for k in moved)
+        assert len(moved) < len(keys) / 2
+
+
+class TestCache:
+    def test_namespaces_and_stats(self):
+        backend = MemoryCache()
+        weather = Cache("weather", backend, 60)
+        market = Cache("market", backend, 60)
+        weather.set(("Nashik", 20.0), {"temp": 31})
+        assert weather.get(("Nashik", 20.0)) == {"temp": 31}
+        assert market.get(("Nashik", 20.0)) is None
+        assert weather.stats()["hits"] == 1
+        assert market.stats()["misses"] == 1
+    
+    def test_backend_errors_are_misses(self):
+        class Broken(MemoryCache):
+            def get(self, key):
+                raise ConnectionError("down")
+        cache = Cache("x", Broken(), 60)
+        cache.set("k", 1)
+        assert cache.get("k") is None
+        assert cache.stats()["errors"] == 1
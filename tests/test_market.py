@@ -0,0 +1,128 @@
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+
+import utils.cache
+from config.constants import CROP_DATA
+from modules.market import MandiIndex, MarketAPI
+from utils.cache import MemoryCache
+from utils.geo import haversine_km
+
+
+def brute_force(markets, lat, lon, crop, k):
+    found = sorted(
+        (haversine_km(lat, lon, m["lat"], m["lon"]), market_id)
+        for market_id, m in markets.items()
+        if crop in m["crops"]
+    )
+    return found[:k]
+
+
+def random_markets(count, seed=7):
+    rng = random.Random(seed)
+    return {
+        f"m{i}": {
+            "name": f"Market {i} APMC",
+            "district": f"District {i % 17}",
+            "state": "Test",
+            "lat": rng.uniform(8.0, 34.0),
+            "lon": rng.uniform(68.0, 97.0),
+            "crops": rng.sample(["wheat", "rice", "cotton", "soybean"], 2),
+        }
+        for i in range(count)
+    }
+
+
+AGMARK_HTML = """
+<table id="cphBody_GridPriceData">
+  <tr><th>Sl no.</th><th>District</th><th>Market</th><th>Commodity</th><th>Variety</th>
+      <th>Grade</th><th>Min</th><th>Max</th><th>Modal</th><th>Date</th></tr>
+  <tr><td>1</td><td>Nashik</td><td>Lasalgaon</td><td>Wheat</td><td>Lokwan</td>
+      <td>FAQ</td><td>2,150</td><td>2,480</td><td>2,310</td><td>18 Oct 2026</td></tr>
+  <tr><td>2</td><td>Nashik</td><td>Nashik(F&V)</td><td>Wheat</td><td>Other</td>
+      <td>FAQ</td><td>2,000</td><td>2,400</td><td>2,200</td><td>18 Oct 2026</td></tr>
+  <tr><td>3</td><td>Pune</td><td>Pune</td><td>Wheat</td><td>Other</td>
+      <td>FAQ</td><td>NR</td><td>2,400</td><td>2,200</td><td>18 Oct 2026</td></tr>
+  <tr><td colspan="10">Total</td></tr>
+</table>
+"""
+
+MARKETS = {
+    "lasalgaon": {"name": "Lasalgaon APMC", "district": "Nashik", "state": "Maharashtra",
+                  "lat": 20.15, "lon": 74.2333, "crops": ["wheat", "soybean"]},
+    "nashik": {"name": "Nashik APMC", "district": "Nashik", "state": "Maharashtra",
+               "lat": 19.9975, "lon": 73.7898, "crops": ["wheat", "rice"]},
+}
+
+
+class TestMandiIndex:
+    @pytest.mark.parametrize("crop", ["wheat", "rice", "cotton"])
+    def test_nearest_matches_brute_force(self, crop):
+        markets = random_markets(300)
+        index = MandiIndex(markets)
+        rng = random.Random(crop)
+        for _ in range(50):
+            lat, lon = rng.uniform(5.0, 37.0), rng.uniform(65.0, 100.0)
+            assert index.nearest(lat, lon, crop, 5) == brute_force(markets, lat, lon, crop, 5)
+    
+    def test_fewer_markets_than_k(self):
+        index = MandiIndex(MARKETS)
+        assert [m for _, m in index.nearest(20.0, 74.0, "Rice", 3)] == ["nashik"]
+        assert index.nearest(20.0, 74.0, "cotton", 3) == []
+        assert index.nearest(20.0, 74.0, "wheat", 0) == []
+    
+    def test_upsert_moves_and_remove_drops(self):
+        index = MandiIndex(MARKETS)
+        moved = dict(MARKETS["lasalgaon"], lat=28.6, lon=77.2)
+        index.upsert_market("lasalgaon", moved)
+        assert index.nearest(28.6, 77.2, "wheat", 1)[0][1] == "lasalgaon"
+        assert index.nearest(28.6, 77.2, "soybean", 1)[0][0] < 1.0
+        
+        index.update_price("lasalgaon", "wheat", 2300)
+        index.remove_market("lasalgaon")
+        assert index.nearest(28.6, 77.2, "soybean", 1) == []
+        assert "lasalgaon" not in index.prices
+        assert index.find("Lasalgaon", "Nashik") is None
+    
+    def test_find_normalises_agmark_names(self):
+        index = MandiIndex(MARKETS)
+        assert index.find("Lasalgaon", "Nashik") == "lasalgaon"
+        assert index.find("Nashik(F&V)", " nashik ") == "nashik"
+        assert index.find("Nashik", "Pune") is None
+
+
+class TestMarketAPI:
+    @pytest.fixture
+    def api(self, monkeypatch):
+        monkeypatch.setattr(utils.cache, "_backend", MemoryCache())
+        monkeypatch.setattr(utils.cache, "_caches", {})
+        return MarketAPI(markets=MARKETS)
+    
+    def test_parse_agmark(self):
+        rows = MarketAPI._parse_agmark(BeautifulSoup(AGMARK_HTML, "html.parser"))
+        assert len(rows) == 2
+        assert rows[0] == {
+            "district": "Nashik", "market": "Lasalgaon", "commodity": "Wheat",
+            "variety": "Lokwan", "grade": "FAQ", "min_price": 2150.0,
+            "max_price": 2480.0, "modal_price": 2310.0, "date": "2026-10-18",
+        }
+    
+    def test_parse_agmark_without_grid(self):
+        assert MarketAPI._parse_agmark(BeautifulSoup("<html></html>", "html.parser")) == []
+    
+    def test_apply_prices_updates_nearest_markets(self, api):
+        rows = MarketAPI._parse_agmark(BeautifulSoup(AGMARK_HTML, "html.parser"))
+        rows.append({"market": "Unknown", "district": "Nashik", "modal_price": 1.0})
+        assert api.apply_prices("Wheat", rows) == 2
+        
+        nearest = {m["market_id"]: m for m in api.get_nearest_markets("wheat", 20.1, 74.0)}
+        assert nearest["lasalgaon"]["price_per_quintal"] == 2310.0
+        assert nearest["lasalgaon"]["last_updated"] == "2026-10-18"
+        assert nearest["nashik"]["price_per_quintal"] == 2200.0
+    
+    def test_unpriced_market_uses_crop_default(self, api):
+        nearest = api.get_nearest_markets("soybean", 20.1, 74.0)
+        assert nearest[0]["market_id"] == "lasalgaon"
+        assert nearest[0]["last_updated"] is None
+        assert nearest[0]["price_per_quintal"] == CROP_DATA["soybean"]["price_per_quintal"]
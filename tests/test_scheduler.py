@@ -0,0 +1,121 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from modules.scheduler import CronTrigger, IntervalTrigger, JobStateStore
+
+
+def next_run(expression, *start):
+    ts = CronTrigger(expression).next_after(datetime(*start).timestamp())
+    return datetime.fromtimestamp(ts)
+
+
+class TestCronTrigger:
+    def test_next_minute_is_strictly_after(self):
+        assert next_run("* * * * *", 2026, 10, 19, 10, 0, 30) == datetime(2026, 10, 19, 10, 1)
+        assert next_run("30 10 * * *", 2026, 10, 19, 10, 30) == datetime(2026, 10, 20, 10, 30)
+    
+    def test_steps(self):
+        assert next_run("15 */4 * * *", 2026, 10, 19, 1, 20) == datetime(2026, 10, 19, 4, 15)
+        assert next_run("*/20 * * * *", 2026, 10, 19, 10, 41) == datetime(2026, 10, 19, 11, 0)
+        assert next_run("5/30 * * * *", 2026, 10, 19, 10, 6) == datetime(2026, 10, 19, 10, 35)
+    
+    def test_ranges_and_lists(self):
+        # Friday after the window -> Monday morning
+        assert next_run("*/20 8-9 * * 1-5", 2026, 10, 23, 9, 50) == datetime(2026, 10, 26, 8, 0)
+        assert next_run("0 6,18 * * *", 2026, 10, 19, 7) == datetime(2026, 10, 19, 18, 0)
+        assert next_run("0 0 1-10/3 * *", 2026, 10, 2) == datetime(2026, 10, 4, 0, 0)
+    
+    def test_weekday_only(self):
+        # 2026-10-19 is a Monday; 0 and 7 are both Sunday
+        assert next_run("0 4 * * 0", 2026, 10, 19, 5) == datetime(2026, 10, 25, 4, 0)
+        assert next_run("0 4 * * 7", 2026, 10, 19, 5) == datetime(2026, 10, 25, 4, 0)
+    
+    def test_day_of_month_or_weekday(self):
+        # Both restricted: the 1st or any Monday, whichever comes first
+        assert next_run("0 9 1 * 1", 2026, 10, 19, 10) == datetime(2026, 10, 26, 9, 0)
+        assert next_run("0 9 1 * 1", 2026, 10, 27, 10) == datetime(2026, 11, 1, 9, 0)
+    
+    def test_month_and_year_rollover(self):
+        assert next_run("0 0 1 * *", 2026, 10, 19) == datetime(2026, 11, 1, 0, 0)
+        assert next_run("0 0 1 1 *", 2026, 10, 19) == datetime(2027, 1, 1, 0, 0)
+        assert next_run("59 23 31 * *", 2026, 11, 1) == datetime(2026, 12, 31, 23, 59)
+        assert next_run("0 0 29 2 *", 2026, 3, 1) == datetime(2028, 2, 29, 0, 0)
+    
+    @pytest.mark.parametrize("expression", ["61 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * *", "5-1 * * * *"])
+    def test_invalid_expressions(self, expression):
+        with pytest.raises(ValueError):
+            CronTrigger(expression)
+    
+    def test_impossible_date_never_fires(self):
+        with pytest.raises(ValueError):
+            CronTrigger("0 0 31 2 *").next_after(time.time())
+    
+    def test_missed_slot_runs_once_on_start(self):
+        trigger = CronTrigger("0 3 * * *")
+        last = datetime(2026, 10, 17, 3, 0).timestamp()
+        now = datetime(2026, 10, 19, 12, 0).timestamp()
+        assert trigger.first_run(last, now) < now
+        assert trigger.first_run(None, now) > now
+
+
+class TestIntervalTrigger:
+    def test_resumes_from_last_start(self):
+        trigger = IntervalTrigger(600)
+        assert trigger.first_run(None, 1000.0) == 1000.0
+        assert trigger.first_run(700.0, 1000.0) == 1300.0
+
+
+class TestJobStateStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return JobStateStore(str(tmp_path / "scheduler.db"))
+    
+    def test_claim_respects_max_instances(self, store):
+        assert store.claim("job", 1, 60)
+        assert not store.claim("job", 1, 60)
+        assert store.get("job")["skipped"] == 1
+        assert store.get("job")["running"] == 1
+    
+    def test_finish_releases_the_slot(self, store):
+        assert store.claim("job", 1, 60)
+        store.finish("job", 0.5, result={"n": 1})
+        state = store.get("job")
+        assert state["running"] == 0
+        assert state["last_status"] == "ok"
+        assert state["last_result"] == {"n": 1}
+        assert store.claim("job", 1, 60)
+    
+    def test_several_instances(self, store):
+        assert store.claim("job", 2, 60)
+        assert store.claim("job", 2, 60)
+        assert not store.claim("job", 2, 60)
+        store.finish("job", 0.1)
+        assert store.claim("job", 2, 60)
+    
+    def test_expired_lease_is_reclaimed(self, store):
+        assert store.claim("job", 1, 0.05)
+        assert not store.claim("job", 1, 0.05)
+        time.sleep(0.1)
+        # The first run crashed without finishing; its lease has run out
+        assert store.claim("job", 1, 60)
+        assert store.get("job")["running"] == 1
+    
+    def test_failure_keeps_previous_result(self, store):
+        store.claim("job", 1, 60)
+        store.finish("job", 0.1, result={"n": 1})
+        store.claim("job", 1, 60)
+        store.finish("job", 0.1, error="RuntimeError: boom")
+        state = store.get("job")
+        assert state["last_status"] == "failed"
+        assert state["last_error"] == "RuntimeError: boom"
+        assert state["last_result"] == {"n": 1}
+        assert (state["runs"], state["failures"]) == (2, 1)
+    
+    def test_finish_never_goes_negative(self, store):
+        store.finish("job", 0.1)
+        store.claim("job", 1, 60)
+        store.finish("job", 0.1)
+        store.finish("job", 0.1)
+        assert store.get("job")["running"] == 0
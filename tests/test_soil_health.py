@@ -0,0 +1,122 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from config.constants import SOIL_HEALTH_CONFIG
+from modules.soil_health import (
+    MANIFEST_FILE, SoilStore, _geohash_codes, _geohash_strings, ingest, map_columns,
+    normalize_values, soil_params,
+)
+from utils.geo import geohash
+
+CONFIG = dict(SOIL_HEALTH_CONFIG, chunk_rows=4, min_samples=2)
+
+HEADER = ["Sample No", "District Name", "Village", "Latitude", "Longitude",
+          "Available N (kg/ha)", "Available P (kg/ha)", "Available K (kg/ha)", "pH", "OC (%)"]
+
+
+def write_cards(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+
+def cards(n=120, p=30, k=250, ph=7.0):
+    # Two farms near Lasalgaon, one with no coordinates, one outlier reading
+    return [
+        [1, "Nashik", "Lasalgaon", 20.1501, 74.2331, n, p, k, ph, 0.6],
+        [2, "Nashik", "Lasalgaon", 20.1502, 74.2332, n + 20, p + 10, k + 50, ph + 0.4, "6"],
+        [3, "Nashik", "Vinchur", "", "", n + 40, p, k, ph, 0.5],
+        [4, "Nashik", "Vinchur", 0, 0, n + 40, p, k, 14.5, "NA"],
+        [5, "", "", "", "", n, p, k, ph, 0.5],
+    ]
+
+
+class TestNormalization:
+    def test_map_columns_ignores_units_and_case(self):
+        columns = map_columns(HEADER)
+        assert columns == {"district": 1, "village": 2, "lat": 3, "lon": 4,
+                           "N": 5, "P": 6, "K": 7, "pH": 8, "OC": 9}
+    
+    def test_rejects_implausible_and_rescales_organic_carbon(self):
+        values = np.array([[120, 30, 250, 7.0, 6.0], [-1, 30, 250, 14.5, 60.0]], dtype=np.float64)
+        rejected = normalize_values(values)
+        assert values[0, 4] == pytest.approx(0.6)
+        assert np.isnan(values[1, 0]) and np.isnan(values[1, 3]) and np.isnan(values[1, 4])
+        assert rejected.tolist() == [1, 0, 0, 1, 1]
+    
+    def test_vectorized_geohash_matches_scalar(self):
+        lat = np.array([20.15, -33.86, 0.01, 89.9])
+        lon = np.array([74.23, 151.21, -0.01, -179.9])
+        cells = _geohash_strings(_geohash_codes(lat, lon, 6), 6)
+        assert cells.tolist() == [geohash(a, b, 6) for a, b in zip(lat, lon)]
+
+
+class TestIngest:
+    @pytest.fixture
+    def store_dir(self, tmp_path):
+        ingest([write_cards(tmp_path / "cards.csv", cards())], str(tmp_path / "store"), CONFIG)
+        return str(tmp_path / "store")
+    
+    def test_manifest_counts(self, tmp_path):
+        manifest = ingest([write_cards(tmp_path / "cards.csv", cards())], str(tmp_path / "store"), CONFIG)
+        assert manifest["rows"] == 5
+        assert manifest["rows_without_location"] == 1
+        assert manifest["rejected_values"]["pH"] == 1
+        assert os.path.exists(tmp_path / "store" / MANIFEST_FILE)
+        assert not os.path.exists(tmp_path / "store.tmp")
+    
+    def test_lookup_by_coordinates(self, store_dir):
+        params = SoilStore(store_dir).lookup((20.15, 74.233))
+        assert params["source"] == "gh:" + geohash(20.15, 74.233, CONFIG["geohash_precision"])
+        assert params["N"] == 130.0
+        assert params["OC"] == 0.6
+        assert params["samples"] == 2
+    
+    def test_falls_back_to_parent_cell_village_and_district(self, store_dir):
+        store = SoilStore(store_dir)
+        parent = geohash(20.15, 74.233, CONFIG["geohash_precision"] - 1)
+        # ~10 km away: a different cell, the same parent cell
+        assert store.lookup((20.10, 74.30))["source"] == "gh:" + parent
+        # Vinchur has two cards but one pH reading survived validation
+        assert store.lookup("Vinchur, Nashik")["source"] == "v:nashik/vinchur"
+        assert "pH" not in store.lookup("Vinchur, Nashik")
+        assert store.lookup((-33.86, 151.21), "Satara, nashik")["source"] == "d:nashik"
+        assert store.lookup((-33.86, 151.21), "Satara") is None
+    
+    def test_soil_params_fill_missing_nutrients(self, store_dir):
+        measured = SoilStore(store_dir).lookup("Vinchur, Nashik")
+        params = soil_params(measured)
+        assert params["N"] == 160.0
+        assert params["pH"] == 7.2
+        assert soil_params(None) == {"N": 200, "P": 40, "K": 300, "pH": 7.2}
+
+
+class TestReload:
+    def test_missing_store_is_unavailable(self, tmp_path):
+        store = SoilStore(str(tmp_path / "store"))
+        assert not store.available
+        assert store.lookup((20.15, 74.233)) is None
+    
+    def test_picks_up_a_rebuilt_store(self, tmp_path):
+        store_dir = str(tmp_path / "store")
+        store = SoilStore(store_dir, reload_seconds=0)
+        assert store.lookup((20.15, 74.233)) is None
+        
+        ingest([write_cards(tmp_path / "a.csv", cards())], store_dir, CONFIG)
+        assert store.lookup((20.15, 74.233))["N"] == 130.0
+        
+        ingest([write_cards(tmp_path / "b.csv", cards(n=300))], store_dir, CONFIG)
+        os.utime(os.path.join(store_dir, MANIFEST_FILE), ns=(0, 1))
+        assert store.lookup((20.15, 74.233))["N"] == 310.0
+    
+    def test_checks_at_most_every_reload_interval(self, tmp_path):
+        store_dir = str(tmp_path / "store")
+        store = SoilStore(store_dir, reload_seconds=3600)
+        ingest([write_cards(tmp_path / "a.csv", cards())], store_dir, CONFIG)
+        assert not store.refresh()
+        assert store.lookup((20.15, 74.233)) is None
@@ -27,6 +27,39 @@ from .helpers import (
     handle_api_error,
     log_error,
 )
+from .geo import (
+    haversine_km,
+    grid_cell,
+    geohash,
+    geohash_center,
+)
+from .metrics import (
+    LatencyTracker,
+    get_tracker,
+    latency_report,
+)
+from .singleflight import (
+    SingleFlight,
+    get_flight,
+    coalescing_report,
+)
+from .cache import (
+    Cache,
+    create_backend,
+    get_cache,
+    cache_report,
+)
+from .admission import (
+    INTERACTIVE,
+    BATCH,
+    QuotaExceeded,
+    AdmissionController,
+    admission_priority,
+    set_default_priority,
+    get_admission,
+    admission_report,
+)
+from .threads import pin_torch_threads
 
 __all__ = [
     # Weather
@@ -51,4 +84,33 @@ __all__ = [
     # Error
     'handle_api_error',
     'log_error',
+    # Geo
+    'haversine_km',
+    'grid_cell',
+    'geohash',
+    'geohash_center',
+    # Metrics
+    'LatencyTracker',
+    'get_tracker',
+    'latency_report',
+    # Request coalescing
+    'SingleFlight',
+    'get_flight',
+    'coalescing_report',
+    # Shared cache
+    'Cache',
+    'create_backend',
+    'get_cache',
+    'cache_report',
+    # Upstream quotas
+    'INTERACTIVE',
+    'BATCH',
+    'QuotaExceeded',
+    'AdmissionController',
+    'admission_priority',
+    'set_default_priority',
+    'get_admission',
+    'admission_report',
+    # Local models
+    'pin_torch_threads',
 ]
@@ -0,0 +1,290 @@
+import contextlib
+import heapq
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+INTERACTIVE, BATCH = 0, 1
+PRIORITY_NAMES = ("interactive", "batch")
+
+# Longest a queued caller sleeps before re-checking; other processes share the tokens
+POLL_SECONDS = 0.25
+
+_priority: ContextVar[Optional[int]] = ContextVar("admission_priority", default=None)
+_default_priority = INTERACTIVE
+
+_controllers: Dict[str, "AdmissionController"] = {}
+_controllers_lock = threading.Lock()
+
+
+class QuotaExceeded(Exception):
+    """An upstream budget could not admit a call in time"""
+
+
+class TokenBucket:
+    """Tokens refilled at a steady rate up to a burst capacity, in this process"""
+    
+    def __init__(self, name: str, rate_per_minute: float, capacity: float):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+    
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+    
+    def take(self, cost: float, floor: float = 0.0) -> float:
+        """
+        Take cost tokens if the bucket stays at or above floor.
+        
+        Calls costing more than the bucket holds are admitted from a full
+        bucket and leave it in debt, so they are delayed rather than refused.
+        
+        Args:
+            cost (float): Tokens for this call
+            floor (float): Tokens that must remain for higher priorities
+        
+        Returns:
+            float: 0.0 when taken, else seconds until enough tokens refill
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = self._refill(self._tokens, self._updated, now)
+            self._updated = now
+            return self._debit(cost, floor)
+    
+    def _debit(self, cost: float, floor: float) -> float:
+        needed = min(cost, self.capacity - floor)
+        if self._tokens - floor >= needed:
+            self._tokens -= cost
+            return 0.0
+        return (needed + floor - self._tokens) / self.rate
+    
+    def level(self) -> float:
+        """Tokens available now"""
+        with self._lock:
+            return self._refill(self._tokens, self._updated, time.time())
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token bucket whose level lives in SQLite, shared by every process on the host"""
+    
+    def __init__(self, name: str, rate_per_minute: float, capacity: float, path: str):
+        super().__init__(name, rate_per_minute, capacity)
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+            (name, self.capacity, time.time())
+        )
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def take(self, cost: float, floor: float = 0.0) -> float:
+        conn = self._conn()
+        # IMMEDIATE serializes the read-modify-write across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            self._tokens = self._refill(tokens, updated, now)
+            wait = self._debit(cost, floor)
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?", (self._tokens, now, self.name)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+    
+    def level(self) -> float:
+        tokens, updated = self._conn().execute(
+            "SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)
+        ).fetchone()
+        return self._refill(tokens, updated, time.time())
+
+
+class AdmissionController:
+    """Priority-ordered admission to one upstream's token bucket"""
+    
+    def __init__(self, bucket: TokenBucket, batch_reserve: float = 0.0, wait_seconds: Optional[Dict[str, float]] = None):
+        self.name = bucket.name
+        self.bucket = bucket
+        # Batch callers leave this much of the bucket for interactive ones
+        self.batch_floor = batch_reserve * bucket.capacity
+        wait_seconds = wait_seconds or {}
+        self.wait_seconds = [wait_seconds.get(name, 1.0) for name in PRIORITY_NAMES]
+        self.admitted = [0, 0]
+        self.rejected = [0, 0]
+        self.units = 0.0
+        self._waiters: list = []
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+    
+    def acquire(self, cost: float = 1.0, priority: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for budget for one upstream call.
+        
+        Callers queue by priority, then arrival; only the head of the queue
+        draws from the bucket, so interactive turns overtake queued batch work.
+        
+        Args:
+            cost (float): Units the call consumes, e.g. characters for DeepL
+            priority (int): INTERACTIVE or BATCH; defaults to current_priority()
+            timeout (float): Seconds to queue; defaults to the priority's wait
+        
+        Returns:
+            bool: True when admitted; False means degrade instead of calling
+        """
+        priority = current_priority() if priority is None else priority
+        timeout = self.wait_seconds[priority] if timeout is None else timeout
+        floor = self.batch_floor if priority == BATCH else 0.0
+        deadline = time.monotonic() + timeout
+        ticket = (priority, next(self._tickets))
+        
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = POLL_SECONDS
+                    if self._waiters[0] == ticket:
+                        try:
+                            wait = self.bucket.take(cost, floor)
+                        except Exception as e:
+                            # A broken quota store must not take the upstream down with it
+                            logger.warning(f"Admission '{self.name}' bucket failed, admitting: {e}")
+                            wait = 0.0
+                        if wait == 0.0:
+                            self.admitted[priority] += 1
+                            self.units += cost
+                            return True
+                    remaining = deadline - time.monotonic()
+                    # Tokens cannot refill faster than the rate; don't queue for a lost cause
+                    if remaining <= 0 or wait > remaining:
+                        self.rejected[priority] += 1
+                        return False
+                    self._cond.wait(min(wait, remaining, POLL_SECONDS))
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Live budget level and admission counts for this process"""
+        try:
+            available = self.bucket.level()
+        except Exception:
+            available = None
+        with self._cond:
+            waiting = [sum(1 for p, _ in self._waiters if p == i) for i in range(len(PRIORITY_NAMES))]
+        return {
+            "rate_per_minute": self.bucket.rate * 60.0,
+            "capacity": self.bucket.capacity,
+            "available": available,
+            "used_ratio": 1.0 - available / self.bucket.capacity if available is not None else None,
+            "units": self.units,
+            "admitted": dict(zip(PRIORITY_NAMES, self.admitted)),
+            "rejected": dict(zip(PRIORITY_NAMES, self.rejected)),
+            "waiting": dict(zip(PRIORITY_NAMES, waiting)),
+        }
+
+
+def current_priority() -> int:
+    """Priority of the running context, else this process's default"""
+    priority = _priority.get()
+    return _default_priority if priority is None else priority
+
+
+def set_default_priority(priority: int) -> None:
+    """Priority for every call in this process, e.g. BATCH in batch jobs"""
+    global _default_priority
+    _default_priority = priority
+
+
+@contextlib.contextmanager
+def admission_priority(priority: int):
+    """Run the enclosed upstream calls at a priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def get_admission(name: str) -> Optional[AdmissionController]:
+    """
+    Get the process-wide admission controller for an upstream.
+    
+    Buckets live in settings.ADMISSION_DB_PATH so every worker on the host
+    draws from the same quota; an empty path keeps them per process.
+    
+    Args:
+        name (str): Upstream key in ADMISSION_CONFIG["upstreams"], e.g. "deepl"
+    
+    Returns:
+        AdmissionController: Shared controller, or None for upstreams without a quota
+    """
+    with _controllers_lock:
+        controller = _controllers.get(name)
+        if controller is None:
+            from config import settings
+            from config.constants import ADMISSION_CONFIG
+            quota = ADMISSION_CONFIG["upstreams"].get(name)
+            if quota is None:
+                return None
+            bucket = None
+            if settings.ADMISSION_DB_PATH:
+                try:
+                    bucket = SQLiteTokenBucket(name, quota["rate_per_minute"], quota["burst"], settings.ADMISSION_DB_PATH)
+                except Exception as e:
+                    logger.warning(f"Shared quota store unavailable, '{name}' budget is per process: {e}")
+            if bucket is None:
+                bucket = TokenBucket(name, quota["rate_per_minute"], quota["burst"])
+            controller = _controllers[name] = AdmissionController(
+                bucket, ADMISSION_CONFIG["batch_reserve"], ADMISSION_CONFIG["wait_seconds"]
+            )
+        return controller
+
+
+def admit(name: str, cost: float = 1.0) -> bool:
+    """True when the upstream has no quota or admits the call"""
+    controller = get_admission(name)
+    return controller is None or controller.acquire(cost)
+
+
+def admission_report() -> Dict[str, Dict[str, Any]]:
+    """
+    Quota usage for every upstream seen by this process.
+    
+    Returns:
+        Dict: Upstream name -> stats
+    """
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return {c.name: c.stats() for c in controllers}
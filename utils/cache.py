@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from bisect import bisect
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_caches: Dict[str, "Cache"] = {}
+_caches_lock = threading.Lock()
+_backend: Optional["CacheBackend"] = None
+
+
+class CacheBackend:
+    """Key/value store with a TTL per entry; values must be JSON-serializable"""
+    
+    name = "backend"
+    
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+    
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU; the fallback when nothing shared is configured"""
+    
+    def __init__(self, max_entries: int = 10000):
+        self.name = "memory"
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteCache(CacheBackend):
+    """SQLite in WAL mode, shared by every worker process on the host"""
+    
+    PURGE_EVERY = 1000
+    
+    def __init__(self, path: str):
+        self.name = f"sqlite:{path}"
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        # WAL lets readers in other processes proceed while one process writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+    
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisCache(CacheBackend):
+    """Any Redis-protocol server (Redis, Valkey, KeyDB, Dragonfly)"""
+    
+    def __init__(self, url: str):
+        import redis
+        self.name = url
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        # Connecting is lazy; find out now rather than on every request
+        self.client.ping()
+    
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(key, json.dumps(value, ensure_ascii=False), px=max(1, int(ttl * 1000)))
+    
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
+class ShardedCache(CacheBackend):
+    """Consistent-hash ring over several nodes, so each key lives on exactly one"""
+    
+    def __init__(self, nodes: Sequence[CacheBackend], replicas: int = 64):
+        self.name = "sharded"
+        self.nodes = list(nodes)
+        # Virtual nodes smooth the key distribution; adding a node moves ~1/N of keys
+        ring = sorted(
+            (_hash(f"{node.name}#{replica}"), index)
+            for index, node in enumerate(self.nodes)
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [index for _, index in ring]
+    
+    def node_for(self, key: str) -> CacheBackend:
+        """Node that owns a key"""
+        position = bisect(self._points, _hash(key)) % len(self._points)
+        return self.nodes[self._owners[position]]
+    
+    def get(self, key: str) -> Optional[Any]:
+        return self.node_for(key).get(key)
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.node_for(key).set(key, value, ttl)
+    
+    def delete(self, key: str) -> None:
+        self.node_for(key).delete(key)
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def create_backend(url: str) -> CacheBackend:
+    """
+    Build a cache backend from a URL.
+    
+    Args:
+        url (str): "memory://", "sqlite:///path/cache.db", "shm://" (SQLite
+            on the host's shared-memory filesystem), "redis://host:6379/0", or
+            several comma-separated URLs to shard across
+    
+    Returns:
+        CacheBackend: Backend; an unavailable Redis falls back to the default
+        SQLite cache (settings.DEFAULT_CACHE_URL), shared by every node that
+        fell back
+    
+    Raises:
+        ValueError: For an unknown URL scheme
+    """
+    urls = [u.strip() for u in url.split(",") if u.strip()]
+    if len(urls) > 1:
+        # Unreachable Redis nodes all fall back to the same SQLite file; keep
+        # it once, or its ring points would collide with themselves
+        nodes = {}
+        for u in urls:
+            node = create_backend(u)
+            nodes.setdefault(node.name, node)
+        if len(nodes) == 1:
+            return next(iter(nodes.values()))
+        return ShardedCache(list(nodes.values()))
+    url = urls[0] if urls else "memory://"
+    
+    if url.startswith("sqlite://"):
+        return SQLiteCache(url[len("sqlite://"):] or os.path.join(tempfile.gettempdir(), "farmer-copilot-cache.db"))
+    if url.startswith("shm://"):
+        shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return SQLiteCache(os.path.join(shm_dir, url[len("shm://"):] or "farmer-copilot-cache.db"))
+    if url.startswith("memory://"):
+        return MemoryCache()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            return RedisCache(url)
+        except Exception as e:
+            from config import settings
+            logger.warning(f"Redis cache unavailable ({e}), using {settings.DEFAULT_CACHE_URL}")
+            return create_backend(settings.DEFAULT_CACHE_URL)
+    raise ValueError(f"Unknown cache URL scheme: {url}")
+
+
+class Cache:
+    """Namespaced view of the shared backend with hit/miss counters"""
+    
+    def __init__(self, namespace: str, backend: CacheBackend, default_ttl: float):
+        self.namespace = namespace
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+    
+    def _key(self, key: Hashable) -> str:
+        raw = key if isinstance(key, str) else json.dumps(key, ensure_ascii=False, default=str)
+        return f"{self.namespace}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Cached value for a key.
+        
+        Backend failures are logged and treated as misses.
+        
+        Args:
+            key (Hashable): String or JSON-serializable key
+        
+        Returns:
+            Any: Cached value, or None on a miss
+        """
+        try:
+            value = self.backend.get(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' read failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value; failures are logged, not raised"""
+        try:
+            self.backend.set(self._key(key), value, self.default_ttl if ttl is None else ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' write failed: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses and hit ratio for this process"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_cache(namespace: str, default_ttl: float = 3600.0) -> Cache:
+    """
+    Get the process-wide cache for a namespace on the configured backend.
+    
+    The backend comes from settings.CACHE_URL, so every worker on a host (or
+    across hosts, for Redis) reads and writes the same entries.
+    
+    Args:
+        namespace (str): Key prefix, e.g. "weather"
+        default_ttl (float): Seconds an entry lives unless set() says otherwise
+    
+    Returns:
+        Cache: Shared namespaced cache
+    """
+    global _backend
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            if _backend is None:
+                from config import settings
+                _backend = create_backend(settings.CACHE_URL)
+                logger.info(f"Cache backend: {_backend.name}")
+            cache = _caches[namespace] = Cache(namespace, _backend, default_ttl)
+        return cache
+
+
+def cache_report() -> Dict[str, Dict[str, Any]]:
+    """
+    Hit statistics for every cache namespace.
+    
+    Returns:
+        Dict: Namespace -> stats
+    """
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {c.namespace: c.stats() for c in caches}
@@ -0,0 +1,124 @@
+import math
+from typing import Tuple
+
+# Mean Earth radius used for all great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Length of one degree of latitude (and of longitude at the equator)
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points.
+    
+    Args:
+        lat1 (float): Latitude of first point in degrees
+        lon1 (float): Longitude of first point in degrees
+        lat2 (float): Latitude of second point in degrees
+        lon2 (float): Longitude of second point in degrees
+    
+    Returns:
+        float: Distance in kilometres
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def grid_cell(lat: float, lon: float, cell_deg: float) -> Tuple[int, int]:
+    """
+    Map a coordinate to its integer grid cell.
+    
+    Args:
+        lat (float): Latitude in degrees
+        lon (float): Longitude in degrees
+        cell_deg (float): Cell size in degrees
+    
+    Returns:
+        Tuple[int, int]: (row, col) of the cell
+    """
+    return (math.floor(lat / cell_deg), math.floor(lon / cell_deg))
+
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lon: float, precision: int = 5) -> str:
+    """
+    Encode a coordinate as a geohash.
+    
+    Each extra character narrows the cell; precision 5 is roughly 5 x 5 km,
+    about the size of a village and its fields. Prefixes of a geohash are the
+    enclosing coarser cells.
+    
+    Args:
+        lat (float): Latitude in degrees
+        lon (float): Longitude in degrees
+        precision (int): Number of characters
+    
+    Returns:
+        str: Geohash string
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate longitude, latitude, starting with longitude
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_center(code: str) -> Tuple[float, float]:
+    """
+    Decode a geohash to the centre of its cell.
+    
+    Args:
+        code (str): Geohash string
+    
+    Returns:
+        Tuple[float, float]: (lat, lon) of the cell centre
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for char in code:
+        value = _GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return ((lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2)
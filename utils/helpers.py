@@ -117,37 +117,21 @@ def get_weather_data(location: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def format_weather_response(weather_data: Dict[str, Any]) -> str:
+def format_weather_response(weather_data: Dict[str, Any], language: str = "en") -> str:
     """
     Format weather data into a readable response.
     
+    Rendered from the language's template without any translation call.
+    
     Args:
         weather_data (Dict): Weather data from get_weather_data()
+        language (str): Language code or name (e.g., "hi" or "Hindi")
     
     Returns:
         str: Formatted weather response
     """
-    if not weather_data:
-        return "Unable to fetch weather data. Please try again."
-    
-    response = f"""
-🌤️ **Weather in {weather_data['location']}, {weather_data['country']}**
-
-📊 Current Conditions:
-- Temperature: {weather_data['temperature']:.1f}°C
-- Humidity: {weather_data['humidity']}%
-- Pressure: {weather_data['pressure']} hPa
-- Wind Speed: {weather_data['wind_speed']} m/s
-- Condition: {weather_data['description'].capitalize()}
-
-⏰ Updated at: {weather_data['timestamp']}
-
-💡 **Agricultural Tips:**
-- For Kharif crops: Monitor humidity for disease prevention
-- For Rabi crops: Current temperature is suitable for most crops
-- For irrigation: Check humidity before watering
-"""
-    return response.strip()
+    from nlp.localization import get_localizer
+    return get_localizer().weather(weather_data, language)
 
 
 # ════════════════════════════════════════════════════════════════════════════
@@ -196,40 +180,21 @@ def get_market_prices(crop: str, location: str = "Maharashtra") -> Optional[Dict
         return None
 
 
-def format_price_response(price_data: Dict[str, Any]) -> str:
+def format_price_response(price_data: Dict[str, Any], language: str = "en") -> str:
     """
     Format market price data into readable response.
     
+    Rendered from the language's template without any translation call.
+    
     Args:
         price_data (Dict): Price data from get_market_prices()
+        language (str): Language code or name (e.g., "hi" or "Hindi")
     
     Returns:
         str: Formatted price response
     """
-    if not price_data:
-        return "Unable to fetch market prices. Please try again."
-    
-    response = f"""
-💰 **Market Prices for {price_data['crop']}** in {price_data['location']}
-
-📊 Price Information:
-- Current Price: ₹{price_data['price_per_quintal']:.0f}/quintal
-- Price per Kg: ₹{price_data['price_per_kg']:.2f}
-- Minimum Price: ₹{price_data['min_price']:.0f}/quintal
-- Maximum Price: ₹{price_data['max_price']:.0f}/quintal
-- Average Price: ₹{price_data['avg_price']:.0f}/quintal
-- Market Trend: {price_data['trend'].capitalize()}
-
-📍 Source: {price_data['market']}
-⏰ Last Updated: {price_data['last_updated']}
-
-💡 **Tips for Farmers:**
-- Compare prices across different mandis
-- Time your harvest when prices are favorable
-- Consider storage if prices are low
-- Monitor market trends for better planning
-"""
-    return response.strip()
+    from nlp.localization import get_localizer
+    return get_localizer().prices(price_data, language)
 
 
 # ════════════════════════════════════════════════════════════════════════════
@@ -413,36 +378,22 @@ def generate_crop_recommendation(
     return "🌾 **Unable to recommend crops.** Please provide more detailed information."
 
 
-def get_disease_treatment(disease: str) -> Optional[str]:
+def get_disease_treatment(disease: str, language: str = "en") -> Optional[str]:
     """
     Get treatment information for a disease.
     
     Args:
         disease (str): Disease name
+        language (str): Language code or name (e.g., "hi" or "Hindi")
     
     Returns:
-        str: Disease treatment information
+        str: Disease treatment information, or None when it can't be fully
+        rendered in the language
     """
+    from nlp.localization import get_localizer
     disease_key = disease.lower().replace(" ", "_")
     disease_info = CONSTANTS.get_disease_info(disease_key)
-    
-    if not disease_info:
-        return f"No information found for disease: {disease}"
-    
-    treatment_text = f"""
-🐛 **Disease:** {disease_info['name']}
-📖 **Description:** {disease_info['description']}
-
-🔍 **Symptoms:**
-{chr(10).join([f'• {symptom}' for symptom in disease_info.get('symptoms', [])])}
-
-💊 **Treatment Methods:**
-{chr(10).join([f'• {method}' for method in disease_info.get('treatment', [])])}
-
-🛡️ **Prevention Strategies:**
-{chr(10).join([f'• {prev}' for prev in disease_info.get('prevention', [])])}
-"""
-    return treatment_text.strip()
+    return get_localizer().disease(disease, disease_info, language)
 
 
 def format_llm_response(response_text: str, max_tokens: int = 300) -> str:
@@ -0,0 +1,80 @@
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+_registry: Dict[str, "LatencyTracker"] = {}
+_registry_lock = threading.Lock()
+
+
+class LatencyTracker:
+    """Rolling window of latency samples with percentile queries"""
+    
+    def __init__(self, name: str, window: int = 500):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float) -> None:
+        """Add one latency sample in seconds"""
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+    
+    def record_error(self) -> None:
+        """Count a failed call"""
+        with self._lock:
+            self.errors += 1
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile of the window, or None when empty"""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        rank = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+        return ordered[rank]
+    
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Summary statistics for dashboards and logs"""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "window": len(self.samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+def get_tracker(name: str) -> LatencyTracker:
+    """
+    Get the process-wide latency tracker for a name, creating it on first use.
+    
+    Args:
+        name (str): Metric name, e.g. "llm.hf.ttft"
+    
+    Returns:
+        LatencyTracker: Shared tracker
+    """
+    with _registry_lock:
+        tracker = _registry.get(name)
+        if tracker is None:
+            tracker = _registry[name] = LatencyTracker(name)
+        return tracker
+
+
+def latency_report(prefix: str = "") -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Snapshot every tracker whose name starts with prefix.
+    
+    Args:
+        prefix (str): Metric name prefix
+    
+    Returns:
+        Dict: Metric name -> snapshot
+    """
+    with _registry_lock:
+        trackers = [t for name, t in _registry.items() if name.startswith(prefix)]
+    return {t.name: t.snapshot() for t in trackers}
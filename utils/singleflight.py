@@ -0,0 +1,107 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+_groups: Dict[str, "SingleFlight"] = {}
+_groups_lock = threading.Lock()
+
+
+class _Call:
+    """An upstream call that other threads can wait on"""
+    
+    __slots__ = ("event", "result", "error")
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one upstream request"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self._in_flight: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn once per key at a time; concurrent callers share its result.
+        
+        Results are shared between threads and must be treated as read-only.
+        
+        Args:
+            key (Hashable): Normalized request key
+            fn (Callable): Upstream call
+        
+        Returns:
+            Any: Result of fn, or the exception it raised is re-raised
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.executions += 1
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.event.set()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Calls seen, upstream executions and the share that was coalesced"""
+        with self._lock:
+            calls, executions = self.calls, self.executions
+            in_flight = len(self._in_flight)
+        return {
+            "calls": calls,
+            "executions": executions,
+            "coalesced": calls - executions,
+            "coalescing_ratio": (calls - executions) / calls if calls else 0.0,
+            "in_flight": in_flight,
+        }
+
+
+def get_flight(name: str) -> SingleFlight:
+    """
+    Get the process-wide single-flight group for a name.
+    
+    Args:
+        name (str): Group name, e.g. "weather"
+    
+    Returns:
+        SingleFlight: Shared group
+    """
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+
+def coalescing_report() -> Dict[str, Dict[str, Any]]:
+    """
+    Coalescing statistics for every single-flight group.
+    
+    Returns:
+        Dict: Group name -> stats
+    """
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
@@ -0,0 +1,34 @@
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_pinned: Optional[int] = None
+_pin_lock = threading.Lock()
+
+
+def pin_torch_threads() -> Optional[int]:
+    """
+    Size torch's intra-op thread pool once for the whole process.
+    
+    torch.set_num_threads is process-global, so components must not each set
+    their own count; every local model calls this instead and the first call
+    applies settings.MODEL_THREADS.
+    
+    Returns:
+        int: Threads in use, or None when torch is unavailable
+    """
+    global _pinned
+    with _pin_lock:
+        if _pinned is None:
+            from config import settings
+            try:
+                import torch
+                torch.set_num_threads(settings.MODEL_THREADS)
+            except Exception as e:
+                logger.warning(f"Could not pin torch threads: {e}")
+                return None
+            _pinned = settings.MODEL_THREADS
+            logger.info(f"torch using {_pinned} threads")
+        return _pinned